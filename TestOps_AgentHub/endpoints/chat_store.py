@@ -0,0 +1,172 @@
+import os
+import re
+import asyncio
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+CHAT_HISTORY_DIR = "user_data"
+CHAT_HISTORY_DB = os.getenv("CHAT_HISTORY_DB", os.path.join(CHAT_HISTORY_DIR, "chat_history.db"))
+# Messages kept per user (0 = keep everything)
+CHAT_HISTORY_RETENTION = int(os.getenv("CHAT_HISTORY_RETENTION", "50"))
+# Trim in batches so appends stay O(1) amortized
+CHAT_HISTORY_TRIM_SLACK = int(os.getenv("CHAT_HISTORY_TRIM_SLACK", "25"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_user_time ON chat_messages (username, created_at, id);
+CREATE TABLE IF NOT EXISTS chat_users (
+    username TEXT PRIMARY KEY,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+def safe_username(username: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", username or "guest")
+
+class ChatHistoryStore:
+    """
+    SQLite (WAL) backed chat history.
+    Appends are single INSERTs indexed on (username, created_at); concurrent tabs and
+    workers write safely through SQLite locking instead of rewriting a JSON file.
+    Async code uses append_async/load_async, which run the blocking calls in a worker thread.
+    """
+
+    def __init__(self, db_path: str = CHAT_HISTORY_DB, retention: int = CHAT_HISTORY_RETENTION,
+                 trim_slack: int = CHAT_HISTORY_TRIM_SLACK):
+        self.db_path = db_path
+        self.retention = retention
+        self.trim_slack = trim_slack
+        self._local = threading.local()
+        self._known_users = set()
+        self._known_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _ensure_user(self, conn: sqlite3.Connection, user: str):
+        """Register the user, importing a legacy user_data/<user>_history.json once"""
+        with self._known_lock:
+            if user in self._known_users:
+                return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT 1 FROM chat_users WHERE username = ?", (user,)).fetchone()
+            if not row:
+                legacy = self._load_legacy_history(user)
+                now = time.time()
+                conn.executemany(
+                    "INSERT INTO chat_messages (username, sender, message, created_at) VALUES (?, ?, ?, ?)",
+                    [(user, msg.get("sender", "bot"), msg.get("message", ""), now) for msg in legacy]
+                )
+                conn.execute("INSERT INTO chat_users (username, message_count) VALUES (?, ?)", (user, len(legacy)))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not row:
+            self._retire_legacy_history(user)
+        with self._known_lock:
+            self._known_users.add(user)
+
+    def _legacy_path(self, user: str) -> str:
+        return os.path.join(CHAT_HISTORY_DIR, f"{user}_history.json")
+
+    def _load_legacy_history(self, user: str) -> List[Dict[str, Any]]:
+        path = self._legacy_path(user)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+            return history if isinstance(history, list) else []
+        except Exception as e:
+            print(f"Error importing legacy chat history for {user}: {e}")
+            return []
+
+    def _retire_legacy_history(self, user: str):
+        path = self._legacy_path(user)
+        if os.path.exists(path):
+            try:
+                os.replace(path, path + ".migrated")
+            except OSError as e:
+                print(f"Could not rename legacy chat history {path}: {e}")
+
+    def append(self, username: str, message: str, sender: str) -> int:
+        """Append one message and return its id"""
+        user = safe_username(username)
+        conn = self._connect()
+        self._ensure_user(conn, user)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(
+                "INSERT INTO chat_messages (username, sender, message, created_at) VALUES (?, ?, ?, ?)",
+                (user, sender, message, time.time())
+            )
+            message_id = cursor.lastrowid
+            conn.execute("UPDATE chat_users SET message_count = message_count + 1 WHERE username = ?", (user,))
+            count = conn.execute("SELECT message_count FROM chat_users WHERE username = ?", (user,)).fetchone()[0]
+            if self.retention and count > self.retention + self.trim_slack:
+                self._trim(conn, user)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return message_id
+
+    def _trim(self, conn: sqlite3.Connection, user: str):
+        """Drop everything older than the newest `retention` messages (inside the caller's transaction)"""
+        conn.execute(
+            """DELETE FROM chat_messages WHERE username = ? AND id < (
+                   SELECT id FROM chat_messages WHERE username = ?
+                   ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?
+               )""",
+            (user, user, self.retention - 1)
+        )
+        conn.execute(
+            "UPDATE chat_users SET message_count = (SELECT COUNT(*) FROM chat_messages WHERE username = ?) WHERE username = ?",
+            (user, user)
+        )
+
+    def load(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent messages of a user, oldest first"""
+        user = safe_username(username)
+        conn = self._connect()
+        self._ensure_user(conn, user)
+        limit = limit or self.retention or -1
+        rows = conn.execute(
+            """SELECT id, sender, message, created_at FROM chat_messages WHERE username = ?
+               ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (user, limit)
+        ).fetchall()
+        return [
+            {"id": row["id"], "sender": row["sender"], "message": row["message"], "timestamp": row["created_at"]}
+            for row in reversed(rows)
+        ]
+
+    async def append_async(self, username: str, message: str, sender: str) -> int:
+        return await asyncio.to_thread(self.append, username, message, sender)
+
+    async def load_async(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.load, username, limit)
+
+# Global instance
+chat_store = ChatHistoryStore()
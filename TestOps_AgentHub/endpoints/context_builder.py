@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Total tokens of dialogue sent to the agent per turn (history + new input)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Messages above this size are replaced by a compact note
+CONTEXT_MESSAGE_TOKEN_LIMIT = int(os.getenv("CONTEXT_MESSAGE_TOKEN_LIMIT", "200"))
+CONTEXT_MAX_MESSAGES = int(os.getenv("CONTEXT_MAX_MESSAGES", "20"))
+CONTEXT_TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "cl100k_base")
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "2000"))
+
+LIST_ITEM = re.compile(r"^\s*(?:[•\-*]|\d+[.)])\s+\S")
+TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$")
+TABLE_SEPARATOR = re.compile(r"^\s*\|[\s:|-]+\|\s*$")
+KEY_VALUE = re.compile(r"^[^\w]*\**([A-Za-z][\w /-]{1,30}?)\**\s*:\s*\**\s*(.{1,80}?)\**\s*$")
+MARKDOWN = re.compile(r"[*`_#]+")
+NON_TEXT = re.compile(r"^[^\w'\"]+")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """tiktoken encoding, loaded once; None when unavailable (e.g. no network for the BPE file)"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(CONTEXT_TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"tiktoken unavailable, estimating tokens from length: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _clean(line: str) -> str:
+    return NON_TEXT.sub("", MARKDOWN.sub("", line)).strip()
+
+
+def summarize_tool_output(message: str) -> str:
+    """
+    Compact structured note for a long bot reply, e.g.
+    "[BULK MODE EXECUTION ACTIVATED for 'X' | 412 list items | Datasheet: Suppliers.xlsx]"
+    """
+    lines = [line for line in message.splitlines() if line.strip()]
+    title = _clean(lines[0]) if lines else ""
+
+    list_items = sum(1 for line in lines if LIST_ITEM.match(line))
+    table_rows = sum(1 for line in lines if TABLE_ROW.match(line) and not TABLE_SEPARATOR.match(line))
+
+    fields = []
+    for line in lines[1:]:
+        match = KEY_VALUE.match(line)
+        if match and not LIST_ITEM.match(line):
+            label, value = _clean(match.group(1)), _clean(match.group(2))
+            if label and value and not value.startswith("http"):
+                fields.append(f"{label}: {value}")
+        if len(fields) >= 4:
+            break
+
+    parts = [title[:120]]
+    if table_rows:
+        parts.append(f"table with {max(table_rows - 1, 1)} rows")
+    if list_items:
+        parts.append(f"{list_items} list items")
+    parts.extend(fields)
+    return "[" + " | ".join(part for part in parts if part) + "]"
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4] + " ..."
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + " ..."
+
+
+class ContextCache:
+    """LRU of compacted messages, keyed by chat message id"""
+
+    def __init__(self, max_size: int = CONTEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self._items: "OrderedDict[Any, Tuple[str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key, item: Tuple[str, int]):
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+context_cache = ContextCache()
+
+
+def compact_message(msg: Dict[str, Any]) -> Tuple[str, int]:
+    """Prompt line for a history message and its token count (cached per message)"""
+    key = msg.get("id")
+    if key is None:
+        key = (msg.get("sender"), hash(msg.get("message", "")))
+    cached = context_cache.get(key)
+    if cached is not None:
+        return cached
+
+    role = "You" if msg.get("sender") == "user" else "Assistant"
+    text = msg.get("message", "")
+    if count_tokens(text) > CONTEXT_MESSAGE_TOKEN_LIMIT:
+        text = _truncate(text, CONTEXT_MESSAGE_TOKEN_LIMIT) if role == "You" else summarize_tool_output(text)
+    line = f"{role}: {text}\n"
+    item = (line, count_tokens(line))
+    context_cache.put(key, item)
+    return item
+
+
+def build_context_prompt(history: List[Dict[str, Any]], new_input: str, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """Newest history that fits in token_budget, long tool outputs replaced by compact notes"""
+    tail = f"You: {new_input}\nAssistant:"
+    remaining = token_budget - count_tokens(tail)
+
+    lines = []
+    for msg in reversed(history[-CONTEXT_MAX_MESSAGES:]):
+        line, tokens = compact_message(msg)
+        if tokens > remaining:
+            break
+        lines.append(line)
+        remaining -= tokens
+
+    return "".join(reversed(lines)) + tail
@@ -0,0 +1,91 @@
+import zlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from fastapi import Request
+
+try:
+    import zstandard
+except ImportError:  # optional - gzip is always available
+    zstandard = None
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+# Appended to a resource's ETag per content coding (each representation needs its own ETag)
+ENCODING_ETAG_SUFFIXES = {"gzip": "-gz", "zstd": "-zst"}
+# Already compressed formats
+INCOMPRESSIBLE_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp", "application/zip",
+                        "application/gzip", "font/woff", "font/woff2", "video/", "audio/")
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+def cache_headers(etag: str, last_modified: float) -> Dict[str, str]:
+    """Validators for a response; no-cache makes browsers revalidate (and get a 304) on every view"""
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "no-cache",
+    }
+
+def encoding_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag of the representation sent with this content coding ('"abc"' -> '"abc-gz"' for gzip)"""
+    if encoding is None:
+        return etag
+    return f'"{etag.strip(chr(34))}{ENCODING_ETAG_SUFFIXES[encoding]}"'
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """True if the client's cached copy is current (If-None-Match wins over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def negotiate_encoding(request: Request, media_type: str, size: Optional[int] = None) -> Optional[str]:
+    """Pick zstd or gzip from Accept-Encoding; None means send as-is"""
+    if size is not None and size < MIN_COMPRESS_SIZE:
+        return None
+    if media_type.startswith(INCOMPRESSIBLE_TYPES):
+        return None
+
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+
+    if zstandard is not None and accepted.get("zstd", 0) > 0:
+        return "zstd"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def compress_stream(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Compress a byte stream chunk by chunk (constant memory)"""
+    if encoding is None:
+        yield from chunks
+        return
+
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,60 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from tools.job_queue import job_manager
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+def get_job_or_404(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@router.get("")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """List background jobs, newest first"""
+    jobs = job_manager.list_jobs(status)
+    return {
+        "jobs": [job.to_dict() for job in jobs[:limit]],
+        "total_count": len(jobs),
+        **job_manager.stats()
+    }
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and final result of a background job"""
+    return get_job_or_404(job_id).to_dict()
+
+@router.get("/{job_id}/events")
+async def get_job_events(job_id: str, after: int = 0):
+    """Progress events of a job; pass `after` (last seen seq) to poll incrementally"""
+    job = get_job_or_404(job_id)
+    events = job.events_after(after)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "events": events,
+        "next_after": events[-1]["seq"] if events else after,
+        "done": job.done
+    }
+
+@router.get("/{job_id}/result-file")
+async def get_job_result_file(job_id: str):
+    """Download the file a finished job produced (e.g. the workbook updated by a TDM edit)"""
+    job = get_job_or_404(job_id)
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is still {job.status}")
+    if not job.result_file:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' did not produce a file")
+
+    result_file = job.result_file
+    try:
+        stat = os.stat(result_file["path"])
+    except OSError:
+        raise HTTPException(status_code=410, detail="Result file no longer exists")
+    if (stat.st_size, stat.st_mtime) != (result_file["size"], result_file["mtime"]):
+        raise HTTPException(status_code=410, detail="Result file was replaced by a later job or generation")
+
+    return FileResponse(result_file["path"], filename=os.path.basename(result_file["path"]))
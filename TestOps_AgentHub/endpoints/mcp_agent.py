@@ -1,13 +1,21 @@
 import os
-import re
 import json
+import asyncio
 from typing import Dict, Any
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from datetime import datetime
+from langchain_core.callbacks import AsyncCallbackHandler
+from endpoints.chat_store import chat_store
+from endpoints.context_builder import build_context_prompt
+from tools.job_queue import collect_submitted_jobs
+from tools.progress import progress_listener
 
 router = APIRouter(tags=["agent"])
 
+STREAM_JOB_POLL_SECONDS = float(os.getenv("STREAM_JOB_POLL_SECONDS", "0.5"))
+
 class UserRequest(BaseModel):
     user_input: str
     username: str
@@ -17,10 +25,12 @@ class ChatResponse(BaseModel):
     tool_used: str = "llm_selected"
     reasoning: str = ""
     test_category: str = ""
+    job_id: str = ""
 
 # These will be set by the main app
 agent = None
 categorizer = None
+command_router = None
 
 def set_agent_and_categorizer(app_agent, app_categorizer):
     """Set the agent and categorizer from main app"""
@@ -28,123 +38,228 @@ def set_agent_and_categorizer(app_agent, app_categorizer):
     agent = app_agent
     categorizer = app_categorizer
 
-# Utility functions
-def get_user_history_path(username: str) -> str:
-    safe_username = re.sub(r"[^a-zA-Z0-9_-]", "_", username)
-    os.makedirs("user_data", exist_ok=True)
-    return os.path.join("user_data", f"{safe_username}_history.json")
+def set_command_router(app_router):
+    """Set the fast-path command router from main app"""
+    global command_router
+    command_router = app_router
 
-def load_chat_history(username: str):
+# Utility functions
+async def load_chat_history(username: str, limit: int = None):
     try:
-        path = get_user_history_path(username)
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+        return await chat_store.load_async(username, limit)
     except Exception as e:
         print(f"Error loading chat history for {username}: {e}")
     return []
 
-def save_chat_message(username: str, message: str, sender: str):
+async def save_chat_message(username: str, message: str, sender: str):
     try:
-        path = get_user_history_path(username)
-        history = load_chat_history(username)
-        history.append({"sender": sender, "message": message})
-        # Auto-trim to last 50 messages
-        if len(history) > 50:
-            history = history[-50:]
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=2)
+        return await chat_store.append_async(username, message, sender)
     except Exception as e:
         print(f"Error saving chat message for {username}: {e}")
 
-def build_context_prompt(history, new_input, keep_last=10):
-    dialogue = ""
-    for msg in history[-keep_last:]:
-        role = "You" if msg['sender'] == "user" else "Assistant"
-        dialogue += f"{role}: {msg['message']}\n"
-    dialogue += f"You: {new_input}\nAssistant:"
-    return dialogue
+# Pending history writes for finished jobs (referenced so they are not garbage collected)
+_job_result_saves = set()
 
-@router.post("/mcp-agent", response_model=ChatResponse)
-async def mcp_agent_endpoint(req: UserRequest):
-    """Process user queries with enhanced LLM-driven tool selection and chat context."""
+def save_job_result(username: str, job):
+    """Job done-callback: post the job's final result to the user's history without blocking the loop"""
+    message = job.result or f"❌ Job {job.id} failed: {job.error}"
+    task = asyncio.get_running_loop().create_task(save_chat_message(username, message, "bot"))
+    _job_result_saves.add(task)
+    task.add_done_callback(_job_result_saves.discard)
+
+def infer_tool_used(result: str):
+    """Infer which tool produced a response from its banner text"""
+    tool_used = "llm_selected"
+    test_category = ""
+    
+    if "TEST MANAGER OVERVIEW" in result:
+        tool_used = "test_manager_overview"
+    elif "RUN MANAGER - TEST CASE SELECTION REQUIRED" in result:
+        tool_used = "execute_run_manager_mode"
+        test_category = "runManager"
+    elif "RUN MANAGER EXECUTION COMPLETED" in result or "RUN MANAGER EXECUTION STARTED" in result:
+        tool_used = "execute_run_manager_mode"
+        test_category = "runManager"
+    elif "HEALING MODE ACTIVATED" in result:
+        tool_used = "execute_heal_mode"
+    elif "TDM DATA EDITOR" in result:
+        tool_used = "tdm_data_editor"
+    elif "TDM/ESAN Generator" in result:
+        tool_used = "tdm_data_generator"
+    elif "DATA RECONCILIATION MODULE ACTIVATED" in result:
+        tool_used = "data_reconciliation"
+    elif "TEST DATA FILE MANAGER ACTIVATED" in result:
+        tool_used = "test_data_file_manager"
+    elif "PATCH VERSION REPORT GENERATED" in result or "PATCH VERSION REPORT GENERATOR" in result:
+        tool_used = "patch_version_generator"
+    elif "Bulk Test Execution Completed" in result:
+        tool_used = "execute_bulk_mode_with_selection"
+        test_category = "bulkTests"
+    elif "EXECUTION COMPLETED" in result and "Selected Supplier" in result:
+        tool_used = "execute_standard_mode_with_selection"
+    elif "STANDARD MODE EXECUTION ACTIVATED" in result:
+        tool_used = "execute_standard_mode"
+        test_category = "standardTests"
+    elif "BULK MODE EXECUTION ACTIVATED" in result:
+        tool_used = "execute_bulk_mode"
+        test_category = "bulkTests"
+    elif "END-TO-END MODE EXECUTION ACTIVATED" in result:
+        tool_used = "execute_e2e_mode"
+        test_category = "endToEndFlows"
+    elif "Test Data Query Result" in result:
+        tool_used = "test_data_query"
+    
+    return tool_used, test_category
+
+async def process_chat_turn(req: UserRequest, callbacks=None):
+    """Run one chat turn (fast path or LLM agent) and return the ChatResponse plus any queued job"""
+    username = req.username or "guest"
     try:
         # Save user message to history FIRST
-        username = req.username or "guest"
-        save_chat_message(username, req.user_input, "user")
-        
-        # Load recent history for context
-        history = load_chat_history(username)
-        
-        # Build prompt with last 10 turns
-        context_prompt = build_context_prompt(history, req.user_input)
+        await save_chat_message(username, req.user_input, "user")
         
-        # Pass the context-rich prompt to the LLM agent
-        result = await agent.arun(context_prompt)
-        
-        # Heuristic tool inference
-        tool_used = "llm_selected"
-        reasoning = "LLM agent analyzed the context and selected the most appropriate tool"
-        test_category = ""
-        
-        if "TEST MANAGER OVERVIEW" in result:
-            tool_used = "test_manager_overview"
-        elif "RUN MANAGER - TEST CASE SELECTION REQUIRED" in result:
-            tool_used = "execute_run_manager_mode"
-            test_category = "runManager"
-        elif "RUN MANAGER EXECUTION COMPLETED" in result:
-            tool_used = "execute_run_manager_mode"
-            test_category = "runManager"
-        elif "HEALING MODE ACTIVATED" in result:
-            tool_used = "execute_heal_mode"
-        elif "TDM DATA EDITOR" in result:
-            tool_used = "tdm_data_editor"
-        elif "TDM/ESAN Generator" in result:
-            tool_used = "tdm_data_generator"
-        elif "DATA RECONCILIATION MODULE ACTIVATED" in result:
-            tool_used = "data_reconciliation"
-        elif "TEST DATA FILE MANAGER ACTIVATED" in result:
-            tool_used = "test_data_file_manager"
-        elif "PATCH VERSION REPORT GENERATED" in result or "PATCH VERSION REPORT GENERATOR" in result:
-            tool_used = "patch_version_generator"
-        elif "Bulk Test Execution Completed" in result:
-            tool_used = "execute_bulk_mode_with_selection"
-            test_category = "bulkTests"
-        elif "EXECUTION COMPLETED" in result and "Selected Supplier" in result:
-            tool_used = "execute_standard_mode_with_selection"
-        elif "STANDARD MODE EXECUTION ACTIVATED" in result:
-            tool_used = "execute_standard_mode"
-            test_category = "standardTests"
-        elif "BULK MODE EXECUTION ACTIVATED" in result:
-            tool_used = "execute_bulk_mode"
-            test_category = "bulkTests"
-        elif "END-TO-END MODE EXECUTION ACTIVATED" in result:
-            tool_used = "execute_e2e_mode"
-            test_category = "endToEndFlows"
-        elif "Test Data Query Result" in result:
-            tool_used = "test_data_query"
+        with collect_submitted_jobs() as jobs:
+            # Fully specified commands go straight to their tool (no LLM round trip)
+            route = command_router.match(req.user_input) if command_router else None
+            if route:
+                for handler in callbacks or []:
+                    if hasattr(handler, "on_fast_path"):
+                        await handler.on_fast_path(route)
+                result = await command_router.dispatch(route)
+                tool_used = route.tool_name
+                reasoning = f"Fast-path rule '{route.rule}' matched the command; LLM skipped"
+                test_category = route.test_category
+            else:
+                # Load recent history for context
+                history = await load_chat_history(username)
+                
+                # Build prompt with as many recent turns as fit the token budget
+                context_prompt = build_context_prompt(history, req.user_input)
+                
+                # Pass the context-rich prompt to the LLM agent
+                result = await agent.arun(context_prompt, callbacks=callbacks)
+                
+                # Heuristic tool inference
+                tool_used, test_category = infer_tool_used(result)
+                reasoning = "LLM agent analyzed the context and selected the most appropriate tool"
         
         # Save bot response to history AFTER processing
-        save_chat_message(username, result, "bot")
+        await save_chat_message(username, result, "bot")
+        
+        # Long-running tools answer with a job ID; post their final result to history when done
+        job = jobs[-1] if jobs else None
+        if job:
+            job.add_done_callback(lambda job: save_job_result(username, job))
         
         return ChatResponse(
             response=result,
             tool_used=tool_used,
             reasoning=reasoning,
-            test_category=test_category
-        )
+            test_category=test_category,
+            job_id=job.id if job else ""
+        ), job
     except Exception as e:
         error_msg = f"I encountered an error while processing your request: {str(e)}"
-        username = req.username or "guest"
-        save_chat_message(username, error_msg, "bot")
+        await save_chat_message(username, error_msg, "bot")
         return ChatResponse(
             response=error_msg,
             tool_used="error",
             reasoning=f"Error occurred: {str(e)}"
-        )
+        ), None
+
+@router.post("/mcp-agent", response_model=ChatResponse)
+async def mcp_agent_endpoint(req: UserRequest):
+    """Process user queries with enhanced LLM-driven tool selection and chat context."""
+    response, _ = await process_chat_turn(req)
+    return response
+
+# ---------------------------
+# Streaming (Server-Sent Events)
+# ---------------------------
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class StreamEventHandler(AsyncCallbackHandler):
+    """Forwards LLM tokens and tool selection of one agent run to an SSE queue"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def on_llm_new_token(self, token: str, **kwargs):
+        if token:
+            self.queue.put_nowait(("token", {"token": token}))
+
+    async def on_agent_action(self, action, **kwargs):
+        self.queue.put_nowait(("tool", {"tool": action.tool, "tool_input": action.tool_input, "fast_path": False}))
+
+    async def on_fast_path(self, route):
+        self.queue.put_nowait(("tool", {"tool": route.tool_name, "tool_input": route.tool_input,
+                                        "fast_path": True, "rule": route.rule}))
+
+async def stream_chat_turn(req: UserRequest):
+    queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    
+    def on_progress(message, data):
+        # Tools may report from worker threads - hop back onto the event loop
+        loop.call_soon_threadsafe(queue.put_nowait, ("progress", {"message": message, **data}))
+    
+    async def run_turn():
+        try:
+            with progress_listener(on_progress):
+                response, job = await process_chat_turn(req, callbacks=[StreamEventHandler(queue)])
+            queue.put_nowait(("final", response.model_dump()))
+            queue.put_nowait(("job", job))
+        finally:
+            queue.put_nowait(None)
+    
+    yield sse_event("start", {"username": req.username or "guest"})
+    turn = asyncio.create_task(run_turn())
+    
+    job = None
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        event, data = item
+        if event == "job":
+            job = data
+            continue
+        yield sse_event(event, data)
+    await turn
+    
+    # Background job started by the tool: relay its progress until it finishes
+    if job:
+        seq = 0
+        while True:
+            for job_event in job.events_after(seq):
+                seq = job_event["seq"]
+                yield sse_event("progress", {"job_id": job.id, "message": job_event["message"], **job_event["data"]})
+            if job.done and not job.events_after(seq):
+                break
+            await asyncio.sleep(STREAM_JOB_POLL_SECONDS)
+        yield sse_event("job_result", job.to_dict())
+    
+    yield sse_event("done", {})
+
+@router.post("/mcp-agent/stream")
+async def mcp_agent_stream_endpoint(req: UserRequest):
+    """Streaming variant of /mcp-agent: LLM tokens, tool selection, tool progress and the final message as SSE"""
+    return StreamingResponse(
+        stream_chat_turn(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/chat-history/{username}")
-async def get_chat_history(username: str):
+async def get_chat_history(username: str, limit: int = None):
     """Get chat history for a specific user"""
-    history = load_chat_history(username)
+    history = await load_chat_history(username, limit)
     return {"messages": history}
+
+@router.get("/mcp-agent/fast-path/stats")
+async def get_fast_path_stats():
+    """Hit/miss report for the deterministic fast-path router"""
+    if not command_router:
+        return {"enabled": False, "message": "Fast-path router not configured"}
+    return command_router.stats()
@@ -0,0 +1,238 @@
+import os
+import json
+import zlib
+import struct
+import hashlib
+import zipfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+REPORT_INDEX_FILE = ".report_index.json"
+REPORT_INDEX_VERSION = 3
+HASH_CHUNK_SIZE = 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Local file header: signature ... file name length (offset 26), extra field length (offset 28)
+LOCAL_HEADER = struct.Struct("<4s22xHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+def report_id_for(sha256: str) -> str:
+    """Content-addressed report ID - stable across new ZIPs arriving or the folder reordering"""
+    return f"report_{sha256[:16]}"
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def find_report_member(zip_ref: zipfile.ZipFile) -> Optional[zipfile.ZipInfo]:
+    """Shallowest Report.html (case insensitive) listed in the central directory"""
+    candidates = [info for info in zip_ref.infolist()
+                  if not info.is_dir() and os.path.basename(info.filename).lower() == "report.html"]
+    return min(candidates, key=lambda info: info.filename.count("/")) if candidates else None
+
+def member_location(zipfile_path: str, info: zipfile.ZipInfo) -> Dict[str, Any]:
+    """Where a member's raw data lives inside the archive, so it can be read without the central directory"""
+    with open(zipfile_path, "rb") as f:
+        f.seek(info.header_offset)
+        signature, name_length, extra_length = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+    if signature != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    return {
+        "member": info.filename,
+        "data_offset": info.header_offset + LOCAL_HEADER.size + name_length + extra_length,
+        "compress_type": info.compress_type,
+        "compress_size": info.compress_size,
+        "file_size": info.file_size,
+    }
+
+def iter_member(zipfile_path: str, location: Dict[str, Any], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream one member straight from the archive bytes.
+    Stored members are a plain byte-range copy; deflated ones are inflated chunk by chunk.
+    """
+    compress_type = location["compress_type"]
+    if compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        # Rare codecs (bzip2/lzma) - let zipfile handle them
+        with zipfile.ZipFile(zipfile_path) as zip_ref, zip_ref.open(location["member"]) as member:
+            for chunk in iter(lambda: member.read(chunk_size), b""):
+                yield chunk
+        return
+
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS) if compress_type == zipfile.ZIP_DEFLATED else None
+    with open(zipfile_path, "rb") as f:
+        f.seek(location["data_offset"])
+        remaining = location["compress_size"]
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {location['member']}")
+            remaining -= len(chunk)
+            yield inflater.decompress(chunk) if inflater else chunk
+        if inflater:
+            tail = inflater.flush()
+            if tail:
+                yield tail
+
+def read_member(zipfile_path: str, location: Dict[str, Any]) -> bytes:
+    return b"".join(iter_member(zipfile_path, location))
+
+def asset_location(zipfile_path: str, member: str) -> Optional[Dict[str, Any]]:
+    """Location of any other member (CSS, images, JS linked from the report)"""
+    with zipfile.ZipFile(zipfile_path) as zip_ref:
+        try:
+            info = zip_ref.getinfo(member)
+        except KeyError:
+            return None
+        if info.is_dir():
+            return None
+    return member_location(zipfile_path, info)
+
+class ReportIndex:
+    """
+    Persistent index of the recon report ZIPs in data_Recon_Op.
+    Entries are keyed by ZIP name and validated by (size, mtime); a ZIP is hashed and
+    re-scanned only when it is new or its content changed. Nothing is extracted - the index
+    records where Report.html sits inside each archive and it is read from there.
+    """
+
+    def __init__(self, base_folder: str):
+        self.base_folder = base_folder
+        self.index_path = os.path.join(base_folder, REPORT_INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    if data.get("version") == REPORT_INDEX_VERSION:
+                        self._entries = data.get("entries", {})
+                except Exception as e:
+                    print(f"Report index unreadable, rebuilding: {e}")
+            self._rebuild_ids()
+        return self._entries
+
+    def _rebuild_ids(self):
+        by_id = {}
+        for name in sorted(self._entries):
+            report = self._entries[name].get("report")
+            if report:
+                by_id.setdefault(report["id"], report)
+        self._by_id = by_id
+
+    def _save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": REPORT_INDEX_VERSION, "entries": self._entries}, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _index_zip(self, zipfile_name: str, stat: os.stat_result, sha256: str, log: List[str]) -> Dict[str, Any]:
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256, "report": None}
+        zipfile_path = os.path.join(self.base_folder, zipfile_name)
+        if not zipfile.is_zipfile(zipfile_path):
+            log.append(f"ERROR: {zipfile_name} is not a valid ZIP file")
+            return entry
+
+        with zipfile.ZipFile(zipfile_path, 'r') as zip_ref:
+            info = find_report_member(zip_ref)
+            member_count = len(zip_ref.infolist())
+        if not info:
+            log.append(f"No Report.html found in {zipfile_name}")
+            return entry
+        log.append(f"Indexed {member_count} entries of {zipfile_name}, report at {info.filename}")
+
+        zip_basename = zipfile_name.replace('.zip', '')
+        entry["report"] = {
+            "id": report_id_for(sha256),
+            "name": zip_basename,  # Display full ZIP name without .zip
+            "filename": os.path.basename(info.filename),  # Keep original filename
+            "path": zipfile_path,  # Archive the report is read from
+            "location": member_location(zipfile_path, info),
+            "folder": zip_basename,  # Display as-is
+            "original_zip": zipfile_name,  # For downloads
+            "modified": stat.st_mtime,
+            "modified_date": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+        }
+        log.append(f"Successfully processed {zipfile_name}")
+        return entry
+
+    def refresh(self) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Sync the index with the ZIPs on disk; returns (reports in folder order, log)"""
+        log: List[str] = []
+        with self._lock:
+            entries = self._load()
+            changed = False
+            zipfiles = [f for f in os.listdir(self.base_folder) if f.endswith('.zip')]
+
+            for zipfile_name in zipfiles:
+                try:
+                    stat = os.stat(os.path.join(self.base_folder, zipfile_name))
+                    entry = entries.get(zipfile_name)
+                    if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+                        continue
+
+                    sha256 = file_sha256(os.path.join(self.base_folder, zipfile_name))
+                    if entry and entry.get("sha256") == sha256:
+                        # Touched but identical content - no need to scan again
+                        entry.update({"size": stat.st_size, "mtime": stat.st_mtime})
+                        log.append(f"Unchanged content for {zipfile_name}")
+                    else:
+                        log.append(f"Processing {zipfile_name}")
+                        entries[zipfile_name] = self._index_zip(zipfile_name, stat, sha256, log)
+                    changed = True
+                except Exception as e:
+                    log.append(f"Error processing {zipfile_name}: {str(e)}")
+
+            for zipfile_name in set(entries) - set(zipfiles):
+                del entries[zipfile_name]
+                log.append(f"Removed {zipfile_name} from index")
+                changed = True
+
+            if changed:
+                self._rebuild_ids()
+                self._save()
+
+            reports = [self._public(entries[name]["report"]) for name in zipfiles
+                       if name in entries and entries[name].get("report")]
+        return reports, log
+
+    def _public(self, report: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in report.items() if key != "location"}
+
+    def _is_current(self, report: Dict[str, Any]) -> bool:
+        """One stat: the archive still matches what the member offsets were recorded for"""
+        try:
+            stat = os.stat(report["path"])
+        except OSError:
+            return False
+        entry = self._entries.get(report["original_zip"], {})
+        return entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """Report by ID from the index; refreshes once on a miss (e.g. a ZIP that just arrived)"""
+        with self._lock:
+            self._load()
+            report = self._by_id.get(report_id)
+            current = report is not None and self._is_current(report)
+        if not current:
+            self.refresh()
+            with self._lock:
+                report = self._by_id.get(report_id)
+        return dict(report) if report else None
+
+_indexes: Dict[str, ReportIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_report_index(base_folder: str) -> ReportIndex:
+    with _indexes_lock:
+        if base_folder not in _indexes:
+            _indexes[base_folder] = ReportIndex(base_folder)
+        return _indexes[base_folder]
@@ -1,10 +1,13 @@
 import os
-import zipfile
-import shutil
-from datetime import datetime
+import asyncio
+import posixpath
+import hashlib
+import mimetypes
 from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from endpoints.http_cache import cache_headers, compress_stream, encoding_etag, is_not_modified, negotiate_encoding
+from endpoints.report_index import get_report_index, read_member, iter_member, asset_location
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -14,88 +17,20 @@ def get_base_dir():
 
 @router.get("/list")
 async def list_reports() -> Dict[str, Any]:
-    """Extract ZIP files and return sorted reports list"""
+    """Return sorted reports list from the report index (ZIPs are read in place and rescanned only when new or changed)"""
     try:
         BASE_DIR = get_base_dir()
         base_folder = os.path.join(BASE_DIR, "data_Recon_Op")
-        reports = []
-        extraction_log = []
         
         if not os.path.exists(base_folder):
             return {"reports": [], "message": "Reports folder not found", "debug_path": base_folder}
         
-        # Get ZIP files directly from base folder
-        all_items = os.listdir(base_folder)
-        zipfiles = [f for f in all_items if f.endswith('.zip')]
-        
-        extraction_log.append(f"Found ZIP files: {zipfiles}")
-        
-        if not zipfiles:
-            return {"reports": [], "message": "No ZIP files found", "all_items": all_items}
-        
-        for zipfile_name in zipfiles:
-            try:
-                zipfile_path = os.path.join(base_folder, zipfile_name)
-                
-                # Create extraction folder per ZIP file (use simple naming)
-                zip_basename = zipfile_name.replace('.zip', '')
-                extract_folder = os.path.join(base_folder, f"{zip_basename}_extracted")
-                
-                extraction_log.append(f"Processing {zipfile_name}")
-                
-                # Remove existing extraction folder
-                if os.path.exists(extract_folder):
-                    shutil.rmtree(extract_folder)
-                
-                os.makedirs(extract_folder, exist_ok=True)
-                
-                # Validate ZIP file
-                if not zipfile.is_zipfile(zipfile_path):
-                    extraction_log.append(f"ERROR: {zipfile_name} is not a valid ZIP file")
-                    continue
-                
-                # Extract ZIP file
-                with zipfile.ZipFile(zipfile_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_folder)
-                    extracted_files = zip_ref.namelist()
-                    extraction_log.append(f"Extracted {len(extracted_files)} files from {zipfile_name}")
-                
-                # Find Report.html (case insensitive) - keep original name
-                report_html_path = None
-                for root, dirs, files in os.walk(extract_folder):
-                    for file in files:
-                        if file.lower() == "report.html":
-                            report_html_path = os.path.join(root, file)
-                            extraction_log.append(f"Found Report.html at: {report_html_path}")
-                            break
-                    if report_html_path:
-                        break
-                
-                if not report_html_path:
-                    extraction_log.append(f"No Report.html found in {zipfile_name}")
-                    continue
-                
-                # Get file modification time for sorting
-                mod_time = os.path.getmtime(report_html_path)
-                
-                # Use simple ID without special characters
-                simple_id = f"report_{len(reports)}"
-                
-                reports.append({
-                    "id": simple_id,  # Simple, unique ID
-                    "name": zip_basename,  # Display full ZIP name without .zip
-                    "filename": os.path.basename(report_html_path),  # Keep original filename
-                    "path": report_html_path,  # Keep original path
-                    "folder": zip_basename,  # Display as-is
-                    "original_zip": zipfile_name,  # For downloads
-                    "modified": mod_time,
-                    "modified_date": datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
-                })
-                
-                extraction_log.append(f"Successfully processed {zipfile_name}")
-                
-            except Exception as e:
-                extraction_log.append(f"Error processing {zipfile_name}: {str(e)}")
+        indexed_reports, extraction_log = await asyncio.to_thread(get_report_index(base_folder).refresh)
+        
+        if not indexed_reports and not any(f.endswith('.zip') for f in os.listdir(base_folder)):
+            return {"reports": [], "message": "No ZIP files found", "all_items": os.listdir(base_folder)}
+        
+        reports = indexed_reports
         
         # Sort reports by modification time (latest first)
         reports.sort(key=lambda x: x["modified"], reverse=True)
@@ -103,7 +38,7 @@ async def list_reports() -> Dict[str, Any]:
         return {
             "reports": reports,
             "total_count": len(reports),
-            "message": f"Extracted and found {len(reports)} reports",
+            "message": f"Found {len(reports)} reports",
             "extraction_log": extraction_log
         }
         
@@ -116,27 +51,56 @@ async def list_reports() -> Dict[str, Any]:
             "traceback": traceback.format_exc()
         }
 
+def member_response(request: Request, report: Dict[str, Any], location: Dict[str, Any], etag: str):
+    """Stream a ZIP member with ETag/Last-Modified validation and gzip/zstd negotiation"""
+    media_type = mimetypes.guess_type(location["member"])[0] or "application/octet-stream"
+    encoding = negotiate_encoding(request, media_type, location["file_size"])
+    etag = encoding_etag(etag, encoding)
+    headers = cache_headers(etag, report["modified"])
+    headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request, etag, report["modified"]):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    else:
+        headers["Content-Length"] = str(location["file_size"])
+    return StreamingResponse(
+        compress_stream(iter_member(report["path"], location), encoding),
+        media_type=media_type,
+        headers=headers
+    )
+
+async def get_report_or_404(report_id: str) -> Dict[str, Any]:
+    # Stable, content-addressed ID -> direct index lookup
+    BASE_DIR = get_base_dir()
+    report_index = get_report_index(os.path.join(BASE_DIR, "data_Recon_Op"))
+    report = await asyncio.to_thread(report_index.get, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail=f"Report with ID '{report_id}' not found")
+    return report
+
 @router.get("/content/{report_id}")
-async def get_report_content(report_id: str):
-    """Get HTML content of a specific report"""
+async def get_report_content(report_id: str, request: Request, format: str = "json"):
+    """
+    Get HTML content of a specific report.
+    format=html streams the raw (compressed) HTML; the default JSON keeps the old payload.
+    """
     try:
-        # Get reports list to find the specific report
-        reports_response = await list_reports()
-        reports = reports_response.get("reports", [])
+        report = await get_report_or_404(report_id)
         
-        # Find the report by its ID
-        report = next((r for r in reports if r["id"] == report_id), None)
-        if not report:
-            raise HTTPException(status_code=404, detail=f"Report with ID '{report_id}' not found")
+        if format == "html":
+            return member_response(request, report, report["location"], f'"{report_id}"')
         
-        # Check if report file exists
-        if not os.path.exists(report["path"]):
-            raise HTTPException(status_code=404, detail=f"Report file not found at {report['path']}")
+        # Report IDs are content hashes, so they double as the ETag
+        etag = f'"{report_id}-json"'
+        if is_not_modified(request, etag, report["modified"]):
+            return Response(status_code=304, headers=cache_headers(etag, report["modified"]))
         
-        # Read HTML content
+        # Read HTML content straight out of the archive
         try:
-            with open(report["path"], 'r', encoding='utf-8') as file:
-                html_content = file.read()
+            html_bytes = await asyncio.to_thread(read_member, report["path"], report["location"])
+            html_content = html_bytes.decode('utf-8', errors='replace')
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Could not read report file: {str(e)}")
         
@@ -144,15 +108,34 @@ async def get_report_content(report_id: str):
             "id": report_id,
             "name": report["name"],
             "content": html_content,
+            "asset_base_url": f"/reports/view/{report_id}/",
             "modified_date": report["modified_date"],
             "folder": report.get("folder"),
             "original_zip": report.get("original_zip")
-        })
+        }, headers=cache_headers(etag, report["modified"]))
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading report: {str(e)}")
 
+@router.get("/view/{report_id}/{asset_path:path}")
+async def view_report_file(report_id: str, request: Request, asset_path: str = ""):
+    """Stream Report.html (empty path) or an asset it links to, straight from the ZIP"""
+    report = await get_report_or_404(report_id)
+    
+    location = report["location"]
+    if asset_path:
+        # Assets resolve relative to Report.html inside the archive
+        member = posixpath.normpath(posixpath.join(posixpath.dirname(location["member"]), asset_path))
+        if member.startswith("../") or member == ".." or member.startswith("/"):
+            raise HTTPException(status_code=400, detail="Invalid asset path")
+        location = await asyncio.to_thread(asset_location, report["path"], member)
+        if not location:
+            raise HTTPException(status_code=404, detail=f"'{asset_path}' not found in {report['original_zip']}")
+    
+    member_tag = hashlib.sha1(location["member"].encode("utf-8")).hexdigest()[:8]
+    return member_response(request, report, location, f'"{report_id}-{member_tag}"')
+
 @router.get("/download/{zip_name}")
 def download_zip(zip_name: str):
     """Download the original ZIP file with enhanced debugging"""
@@ -1,7 +1,16 @@
 import os
-import pandas as pd
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException
+import io
+import csv
+import orjson
+from typing import Dict, Any, Iterator, List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from endpoints.http_cache import compress_stream, negotiate_encoding
+from tools.sheet_query import run_query
+from tools.tdm_store import tdm_store
+from tools.workbook_diff import diff_workbooks
+from tools.workbook_cache import workbook_cache, read_sheet_window, load_sheet_frame, to_records, iter_sheet_rows
 
 router = APIRouter(prefix="/testdata", tags=["testdata"])
 
@@ -29,12 +38,8 @@ def list_excel_files() -> Dict[str, Any]:
         for file in files:
             path = os.path.join(EXCEL_FOLDER, file)
             try:
-                xls = pd.ExcelFile(path)
-                result[file] = {
-                    "sheets": xls.sheet_names,
-                    "size": os.path.getsize(path),
-                    "modified": os.path.getmtime(path)
-                }
+                # Cached per (path, mtime, size); a miss only reads xl/workbook.xml
+                result[file] = dict(workbook_cache.get(path))
             except Exception as e:
                 print(f"Error reading {file}: {e}")
                 result[file] = {
@@ -44,34 +49,54 @@ def list_excel_files() -> Dict[str, Any]:
                     "error": str(e)
                 }
         
+        workbook_cache.prune(os.path.join(EXCEL_FOLDER, file) for file in files)
         return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing Excel files: {str(e)}")
 
 @router.get("/sheet-data/{filename}/{sheetname}")
-def get_sheet_data(filename: str, sheetname: str) -> Dict[str, Any]:
-    """Get data from a specific sheet in an Excel file"""
+def get_sheet_data(filename: str, sheetname: str, offset: int = 0, limit: Optional[int] = None,
+                   columns: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get data from a specific sheet in an Excel file.
+    offset/limit select a window of rows and columns (comma-separated) projects them;
+    rows are streamed from the workbook, so memory is bounded by the window, not the sheet.
+    """
     try:
         EXCEL_FOLDER = get_excel_folder()
         path = os.path.join(EXCEL_FOLDER, filename)
         
         if not os.path.exists(path):
             raise HTTPException(status_code=404, detail="File not found")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise HTTPException(status_code=400, detail="offset and limit must not be negative")
         
-        df = pd.read_excel(path, sheet_name=sheetname)
-        data = df.fillna("").to_dict(orient="records")
-        columns = list(df.columns)
+        requested_columns = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+        try:
+            selected_columns, data, total_rows, total_columns = read_sheet_window(
+                path, sheetname, offset, limit, requested_columns
+            )
+        except KeyError as e:
+            message = str(e).strip("'\"")
+            if message.startswith("Worksheet"):
+                raise HTTPException(status_code=404, detail=f"Sheet '{sheetname}' not found in file '{filename}'")
+            raise HTTPException(status_code=400, detail=message)
         
         return {
-            "columns": columns, 
+            "columns": selected_columns, 
             "data": data,
-            "total_rows": len(data),
-            "total_columns": len(columns),
+            "total_rows": total_rows,
+            "total_columns": total_columns,
+            "offset": offset,
+            "limit": limit,
+            "returned_rows": len(data),
             "filename": filename,
             "sheetname": sheetname
         }
         
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File '{filename}' not found")
     except ValueError as e:
@@ -81,3 +106,189 @@ def get_sheet_data(filename: str, sheetname: str) -> Dict[str, Any]:
             raise HTTPException(status_code=400, detail=f"Error reading Excel file: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing sheet data: {str(e)}")
+
+class ColumnFilter(BaseModel):
+    column: str
+    op: str = "eq"
+    value: Any = None
+
+class SortKey(BaseModel):
+    column: str
+    direction: str = "asc"
+
+class SheetQuery(BaseModel):
+    filters: List[ColumnFilter] = []
+    search: Optional[str] = None
+    sort: List[SortKey] = []
+    columns: Optional[List[str]] = None
+    distinct: List[str] = []
+    aggregates: Dict[str, List[str]] = {}
+    offset: int = 0
+    limit: Optional[int] = 100
+
+@router.post("/query/{filename}/{sheetname}")
+def query_sheet_data(filename: str, sheetname: str, query: SheetQuery) -> Dict[str, Any]:
+    """
+    Filter, sort, distinct values and aggregates (count/min/max/sum) over a sheet, computed
+    server-side on the cached columnar copy; only the requested page of rows is returned.
+    """
+    try:
+        EXCEL_FOLDER = get_excel_folder()
+        path = os.path.join(EXCEL_FOLDER, filename)
+        
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="File not found")
+        if query.offset < 0 or (query.limit is not None and query.limit < 0):
+            raise HTTPException(status_code=400, detail="offset and limit must not be negative")
+        
+        try:
+            df = load_sheet_frame(path, sheetname)
+            result = run_query(
+                df,
+                filters=[f.model_dump() for f in query.filters],
+                search=query.search,
+                sort=[s.model_dump() for s in query.sort],
+                columns=query.columns,
+                distinct=query.distinct,
+                aggregates=query.aggregates,
+                offset=query.offset,
+                limit=query.limit
+            )
+        except KeyError as e:
+            message = str(e).strip("'\"")
+            if message.startswith("Worksheet"):
+                raise HTTPException(status_code=404, detail=f"Sheet '{sheetname}' not found in file '{filename}'")
+            raise HTTPException(status_code=400, detail=message)
+        except ValueError as e:
+            if "Worksheet" in str(e):
+                raise HTTPException(status_code=404, detail=f"Sheet '{sheetname}' not found in file '{filename}'")
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        data = to_records(result["page"])
+        return {
+            "columns": result["columns"],
+            "data": data,
+            "total_rows": len(df),
+            "matched_rows": result["matched_rows"],
+            "total_columns": len(df.columns),
+            "offset": query.offset,
+            "limit": query.limit,
+            "returned_rows": len(data),
+            "distinct": result["distinct"],
+            "aggregates": result["aggregates"],
+            "filename": filename,
+            "sheetname": sheetname
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying sheet data: {str(e)}")
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+# Rows serialized per yielded chunk
+EXPORT_BATCH_ROWS = 1000
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def iter_ndjson(columns: List[str], rows: Iterator[tuple]) -> Iterator[bytes]:
+    batch = []
+    for row in rows:
+        batch.append(orjson.dumps(dict(zip(columns, row)), default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY))
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+def iter_csv(columns: List[str], rows: Iterator[tuple]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        count += 1
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+@router.get("/export/{filename}/{sheetname}")
+def export_sheet_data(filename: str, sheetname: str, request: Request, format: str = "ndjson",
+                      columns: Optional[str] = None):
+    """
+    Stream a whole sheet as NDJSON (one object per row) or CSV.
+    Rows are serialized in batches as they are read, so memory stays flat for any sheet size.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}' (use ndjson or csv)")
+    
+    EXCEL_FOLDER = get_excel_folder()
+    path = os.path.join(EXCEL_FOLDER, filename)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    requested_columns = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    try:
+        selected_columns, rows = iter_sheet_rows(path, sheetname, requested_columns)
+    except KeyError as e:
+        message = str(e).strip("'\"")
+        if message.startswith("Worksheet"):
+            raise HTTPException(status_code=404, detail=f"Sheet '{sheetname}' not found in file '{filename}'")
+        raise HTTPException(status_code=400, detail=message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting sheet data: {str(e)}")
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    body = iter_ndjson(selected_columns, rows) if format == "ndjson" else iter_csv(selected_columns, rows)
+    encoding = negotiate_encoding(request, media_type)
+    
+    export_name = f"{os.path.splitext(filename)[0]}_{sheetname}.{extension}"
+    headers = {"Content-Disposition": f'attachment; filename="{export_name}"', "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(compress_stream(body, encoding), media_type=media_type, headers=headers)
+
+@router.get("/versions/{template_name}")
+def list_versions(template_name: str) -> Dict[str, Any]:
+    """Stored versions of a template's workbook, newest first"""
+    versions = tdm_store.versions(template_name)
+    if versions is None:
+        raise HTTPException(status_code=404, detail=f"No versions stored for '{template_name}'")
+    return versions
+
+@router.post("/rollback/{template_name}")
+def rollback_version(template_name: str, version: Optional[str] = None) -> Dict[str, Any]:
+    """Make an earlier version current: the previous one, or the version whose sha starts with `version`"""
+    try:
+        result = tdm_store.rollback(template_name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'\""))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"template": template_name, "current": result["sha"], "filename": os.path.basename(result["path"])}
+
+@router.get("/diff/{template_name}")
+def diff_versions(template_name: str, base: str = "previous", target: str = "current") -> Dict[str, Any]:
+    """
+    Added/removed rows and changed cells between two versions of a template's workbook.
+    base/target are "previous", "current" or a version sha (prefix).
+    """
+    try:
+        base_sha, base_path = tdm_store.version_path(template_name, base)
+        target_sha, target_path = tdm_store.version_path(template_name, target)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e).strip("'\""))
+    try:
+        diff = diff_workbooks(base_path, target_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error comparing versions: {str(e)}")
+    return {"template": template_name, "base": base_sha, "target": target_sha, **diff}
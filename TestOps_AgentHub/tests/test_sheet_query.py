@@ -0,0 +1,15 @@
+# tests/test_sheet_query.py
+
+import pandas as pd
+
+from tools.sheet_query import run_query
+
+def test_sort_mixed_object_column():
+    df = pd.DataFrame({"Value": pd.Series([5, "abc", 7.5, None, 1], dtype=object)})
+
+    ascending = run_query(df, sort=[{"column": "Value"}])["page"]["Value"].tolist()
+    assert ascending[:4] == [1, 5, 7.5, "abc"]
+    assert pd.isna(ascending[4])
+
+    descending = run_query(df, sort=[{"column": "Value", "direction": "desc"}])["page"]["Value"].tolist()
+    assert descending[:4] == ["abc", 7.5, 5, 1]
@@ -1,11 +1,14 @@
 # tools/DataRecon_tool.py
 
 import os
-import requests
+import httpx
 import re
 from langchain.tools import Tool
 import os
 from dotenv import load_dotenv
+from tools.http_client import get_async_client, run_sync
+from tools.job_queue import job_manager, format_job_ack
+from tools.progress import report_progress
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
@@ -23,10 +26,10 @@ class DataReconProcessor:
         os.makedirs(self.input_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
 
-    def get_payables_csv_from_invoice(self) -> dict:
+    async def get_payables_csv_from_invoice(self) -> dict:
         """Get payables.csv from invoicedata.xlsx processing endpoint and save to data_Recon_In"""
         try:
-            response = requests.get(self.process_invoice_url, timeout=60)
+            response = await get_async_client().get(self.process_invoice_url, timeout=60)
             response.raise_for_status()
             
             # Save the CSV content to INPUT directory (data_Recon_In)
@@ -40,7 +43,7 @@ class DataReconProcessor:
                 "message": "Payables CSV generated from invoicedata.xlsx and saved to data_Recon_In"
             }
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return {"status": "error", "message": f"Failed to process invoice data: {e}"}
 
     def file_exists(self, file_id: str) -> str:
@@ -48,28 +51,28 @@ class DataReconProcessor:
         path = os.path.join(self.input_dir, f"{file_id}.csv")
         return path if os.path.exists(path) else None
 
-    def upload_file_to_server(self, file_name: str, file_path: str) -> dict:
+    async def upload_file_to_server(self, file_name: str, file_path: str) -> dict:
         """Upload file to the server using /upload_file/ endpoint"""
         try:
             with open(file_path, 'rb') as f:
-                files = {'file': (f"{file_name}.csv", f, 'text/csv')}
-                params = {'file_name': file_name}
-                response = requests.post(self.upload_url, files=files, params=params, timeout=60)
-                response.raise_for_status()
+                files = {'file': (f"{file_name}.csv", f.read(), 'text/csv')}
+            params = {'file_name': file_name}
+            response = await get_async_client().post(self.upload_url, files=files, params=params, timeout=60)
+            response.raise_for_status()
 
             return {
                 "status": "success",
                 "message": f"File {file_name}.csv uploaded successfully"
             }
 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             return {"status": "error", "message": f"Failed to upload file: {e}"}
 
-    def call_testcase_and_save_result(self, test_case_id: str) -> dict:
+    async def call_testcase_and_save_result(self, test_case_id: str) -> dict:
         """Execute test case and save result to data_Recon_Op"""
         url = f"{self.testcase_url}/{test_case_id}"
         try:
-            resp = requests.get(url, timeout=60)
+            resp = await get_async_client().get(url, timeout=60)
             resp.raise_for_status()
 
             # Extract filename from Content-Disposition
@@ -104,26 +107,29 @@ class DataReconProcessor:
                 "message": f"Test case executed and result saved to {output_path}"
             }
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return {"status": "error", "message": f"Failed to call test case API: {e}"}
 
-    def process_data_recon(self, file_id: str) -> dict:
+    async def process_data_recon(self, file_id: str) -> dict:
         """Process data reconciliation with correct folder structure"""
         
         if file_id.lower() == "payables":
             # Step 1: Generate payables.csv from invoicedata.xlsx and save to data_Recon_In
             print(f"Processing payables from invoicedata.xlsx using {self.process_invoice_url}")
-            csv_result = self.get_payables_csv_from_invoice()
+            report_progress("Generating payables.csv from invoicedata.xlsx")
+            csv_result = await self.get_payables_csv_from_invoice()
             if csv_result["status"] != "success":
                 return csv_result
             
             # Step 2: Upload the CSV from data_Recon_In to the recon server
-            upload_result = self.upload_file_to_server("payables", csv_result["file_path"])
+            report_progress("Uploading payables.csv to recon server")
+            upload_result = await self.upload_file_to_server("payables", csv_result["file_path"])
             if upload_result["status"] != "success":
                 return upload_result
             
             # Step 3: Execute test case and save result to data_Recon_Op
-            result = self.call_testcase_and_save_result("payables")
+            report_progress("Executing reconciliation test case")
+            result = await self.call_testcase_and_save_result("payables")
             return result
         
         else:
@@ -133,18 +139,23 @@ class DataReconProcessor:
                 return {"status": "error", "message": f"No {file_id}.csv file exists in data_Recon_In"}
 
             # Step 2: Upload file from data_Recon_In to server
-            upload_result = self.upload_file_to_server(file_id, file_path)
+            report_progress(f"Uploading {file_id}.csv to recon server")
+            upload_result = await self.upload_file_to_server(file_id, file_path)
             if upload_result["status"] != "success":
                 return upload_result
 
             # Step 3: Call test case API and save result to data_Recon_Op
-            result = self.call_testcase_and_save_result(file_id)
+            report_progress("Executing reconciliation test case")
+            result = await self.call_testcase_and_save_result(file_id)
             return result
 
 # LangChain/LLM integration wrapper for the tool
 data_recon_instance = DataReconProcessor()
 
 def data_recon_func(query: str) -> str:
+    return run_sync(adata_recon_func, query)
+
+async def adata_recon_func(query: str) -> str:
     try:
         query_lower = query.lower().strip()
         file_name = None
@@ -173,7 +184,20 @@ def data_recon_func(query: str) -> str:
         if not file_name:
             return f"Could not extract file name from query: '{query}'. Please specify a file name like 'payables', 'suppliers', etc."
 
-        result = data_recon_instance.process_data_recon(file_name)
+        # Upload + ERP test case can take minutes - run it as a background job
+        job = job_manager.submit("data_reconciliation", run_data_recon, file_name, metadata={"file_name": file_name})
+        return format_job_ack(job, "DATA RECONCILIATION MODULE ACTIVATED", {
+            "📁 **Input File**": f"{file_name}.csv (data_Recon_In)",
+            "📄 **Output Folder**": "data_Recon_Op",
+        })
+
+    except Exception as e:
+        return f"❌ Data reconciliation error: {type(e).__name__}: {e}"
+
+async def run_data_recon(file_name: str) -> str:
+    """Run the reconciliation for file_name and format the chat reply (background job body)"""
+    try:
+        result = await data_recon_instance.process_data_recon(file_name)
 
         if result.get("status") == "success":
             # Different process info based on file type
@@ -207,7 +231,6 @@ def data_recon_func(query: str) -> str:
 
         else:
             return f"❌ {result.get('message')}"
-
     except Exception as e:
         return f"❌ Data reconciliation error: {type(e).__name__}: {e}"
 
@@ -215,5 +238,6 @@ def data_recon_func(query: str) -> str:
 data_recon_tool = Tool(
     name="data_reconciliation",
     description="Processes payables from invoicedata.xlsx or uploads existing files from data_Recon_In, triggers ERP test case, saves results in data_Recon_Op. Input files in data_Recon_In, output files in data_Recon_Op.",
-    func=data_recon_func
+    func=data_recon_func,
+    coroutine=adata_recon_func
 )
@@ -1,6 +1,6 @@
 # tools/TDM_editor.py
 
-import requests
+import asyncio
 import json
 import os
 import re
@@ -8,64 +8,40 @@ from langchain.tools import tool
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from tools.http_client import download_to_file, run_sync
+from tools.job_queue import job_manager, format_job_ack, attach_result_file, release_submitted_job
+from tools.progress import report_progress
+from tools.tdm_rules import parse_rules, apply_rules
+from tools.tdm_store import tdm_store
+from tools.template_catalog import template_catalog
+from tools.workbook_diff import diff_workbooks, format_diff_summary
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 
-# Base URL and cached templates
+# Base URL and last used template
 TDM_BASE_URL = BASE_URL = os.getenv("TDM_BASE_URL")
-_cached_templates = []
 _last_used_template = ""
+# Local rule edits finishing within this many seconds are answered inline instead of with a job ID
+TDM_INLINE_EDIT_SECONDS = float(os.getenv("TDM_INLINE_EDIT_SECONDS", "30"))
 
-def _get_available_templates() -> list:
-    """Get and cache available templates"""
-    global _cached_templates
+async def _match_template(template_name: str):
+    """(matched template or None, available templates) from the shared template catalog"""
     try:
-        templates_url = f"{TDM_BASE_URL}/templates/TDM User"
-        response = requests.get(templates_url, timeout=10)
-        
-        if response.status_code == 200:
-            _cached_templates = response.json().get("templates", [])
-            return _cached_templates
-        return _cached_templates
-    except:
-        return _cached_templates
-
-def _validate_template(template_name: str) -> bool:
-    """Validate if template exists"""
-    available_templates = _get_available_templates()
-    return _find_matching_template(template_name, available_templates) is not None
-
-def _get_matched_template(template_name: str) -> str:
-    """Get the actual matched template name"""
-    available_templates = _get_available_templates()
-    matched = _find_matching_template(template_name, available_templates)
-    return matched if matched else template_name
-
-def _find_matching_template(template_name: str, available_templates: list) -> str:
-    """Find matching template"""
-    template_lower = template_name.lower()
-    
-    # Exact match
-    for template in available_templates:
-        if template.lower() == template_lower:
-            return template
-    
-    # Partial match
-    for template in available_templates:
-        if template_lower in template.lower() or template.lower() in template_lower:
-            return template
-    
-    return None
+        return await template_catalog.match(template_name)
+    except Exception as e:
+        print(f"Cannot fetch available templates: {e}")
+        return None, []
 
-def _get_template_error(template_name: str) -> str:
+def _get_template_error(template_name: str, available_templates: list) -> str:
     """Get template error message with available templates"""
-    available_templates = _get_available_templates()
     templates_list = ", ".join(available_templates)
+    suggestions = template_catalog.suggest(template_name)
+    did_you_mean = f"💡 **Did you mean**: {', '.join(suggestions)}\n" if suggestions else ""
     
     return f"""❌ **TEMPLATE NOT FOUND**
 
 🔍 **Searched for**: {template_name}
-📋 **Available Templates**: {templates_list}
+{did_you_mean}📋 **Available Templates**: {templates_list}
 
 ❗ Please use an available template."""
 
@@ -75,6 +51,10 @@ def tdm_data_editor(query: str) -> str:
     TDM DATA EDITOR - Modifies existing test data based on field specifications
     Handles: Template editing requests with field modifications
     """
+    return run_sync(atdm_data_editor, query)
+
+async def atdm_data_editor(query: str) -> str:
+    """Async implementation of tdm_data_editor"""
     global _last_used_template
     
     try:
@@ -88,17 +68,38 @@ def tdm_data_editor(query: str) -> str:
             return "❌ **MODIFICATION REQUEST NOT CLEAR**\n\nPlease specify what changes you want to make."
         
         # Simple validation
-        if not _validate_template(template_name):
-            return _get_template_error(template_name)
+        matched_template, available_templates = await _match_template(template_name)
+        if not matched_template:
+            return _get_template_error(template_name, available_templates)
         
-        matched_template = _get_matched_template(template_name)
         _last_used_template = matched_template
         
-        return _apply_feedback(matched_template, feedback_text)
+        filename, filepath = _tdm_file_path(matched_template)
+        key = f"TDM workbook {filename}"
+        
+        # /apply-feedback can take up to 10 minutes - run it as a background job
+        # Edits of the same workbook are serialized; different templates run in parallel
+        job = job_manager.submit("tdm_data_editor", _apply_edit, matched_template, feedback_text,
+                                 metadata={"template_name": matched_template, "feedback_text": feedback_text},
+                                 key=key)
+        
+        # Mechanical field rules are applied locally in seconds - wait for them and answer inline,
+        # unless an earlier edit of the same workbook is still ahead in the queue
+        if parse_rules(feedback_text) and os.path.exists(filepath) and not job.queued_behind:
+            if await job.wait(TDM_INLINE_EDIT_SECONDS):
+                release_submitted_job(job)
+                return job.result or f"❌ **TDM EDITOR ERROR**: {job.error}"
+        
+        return format_job_ack(job, "TDM DATA EDITOR - UPDATE QUEUED", {
+            "🎯 **Template**": matched_template,
+            "🔄 **Requested Changes**": feedback_text,
+        })
         
     except Exception as e:
         return f"❌ **TDM EDITOR ERROR**: {str(e)}"
 
+tdm_data_editor.coroutine = atdm_data_editor
+
 def _extract_template_name(query: str) -> str:
     """Extract template name from various query patterns"""
     query_lower = query.lower()
@@ -156,7 +157,47 @@ def _extract_feedback_text(query: str) -> str:
     
     return feedback if feedback else query
 
-def _apply_feedback(template_name: str, feedback_text: str) -> str:
+async def _apply_edit(template_name: str, feedback_text: str) -> str:
+    """Job body: local rule engine when it understands the feedback, otherwise the TDM service"""
+    rules = parse_rules(feedback_text)
+    if rules and os.path.exists(_tdm_file_path(template_name)[1]):
+        local_result = await _apply_local_rules(template_name, feedback_text, rules)
+        if local_result is not None:
+            return local_result
+    return await _apply_feedback(template_name, feedback_text)
+
+async def _apply_local_rules(template_name: str, feedback_text: str, rules: list):
+    """Apply parsed field rules to the workbook in TDM_files; None if a field is not in the workbook"""
+    filename, filepath = _tdm_file_path(template_name)
+    report_progress(f"Applying {len(rules)} field rule(s) to {filename} locally")
+    try:
+        result = await asyncio.to_thread(apply_rules, os.path.splitext(filename)[0], rules)
+    except Exception as e:
+        print(f"Local rule engine failed for {filename}, using the TDM service: {e}")
+        return None
+    if result is None:
+        return None
+    
+    attach_result_file(filepath)
+    changes = await _diff_summary(os.path.splitext(filename)[0], result["store"])
+    rule_lines = "\n".join(
+        f"- **{rule['field']}** ({rule['type']}): {rule['changed_cells']} cells changed"
+        for rule in result["rules"]
+    )
+    return f"""✅ **TEMPLATE DATA UPDATED SUCCESSFULLY**
+
+🎯 **Template**: {template_name}
+🔄 **Changes Applied**: {feedback_text}
+{rule_lines}
+⚡ **Applied Locally**: {result['changed_cells']} cells in {result['edit_ms']} ms ({result['total_ms']} ms including save){changes}
+📁 **File**: {filename}
+📂 **Location**: TDM_files folder
+
+🔍 **Review**: Check the updated data in TDM data sub app
+
+[FILE_ATTACHMENT:{filepath}]"""
+
+async def _apply_feedback(template_name: str, feedback_text: str) -> str:
     """Apply feedback modifications via API"""
     try:
         feedback_url = f"{TDM_BASE_URL}/apply-feedback"
@@ -166,15 +207,23 @@ def _apply_feedback(template_name: str, feedback_text: str) -> str:
             "feedback_text": feedback_text
         }
         
-        response = requests.post(feedback_url, json=payload, timeout=600)
+        report_progress(f"Applying feedback to {template_name} via TDM service")
+        # Stream the updated workbook to a staging file (flat memory), then commit it as a new version
+        filename, filepath = _tdm_file_path(template_name)
+        store_name = os.path.splitext(filename)[0]
+        staging_path = tdm_store.staging_path(store_name)
+        result = await download_to_file("POST", feedback_url, staging_path, json=payload, timeout=600)
         
-        if response.status_code == 200:
-            filename = _save_file(response, template_name)
+        if "path" in result:
+            commit = await asyncio.to_thread(tdm_store.commit, store_name, staging_path, "TDM service edit")
+            attach_result_file(filepath)
+            report_progress("Saved updated workbook to TDM_files", bytes=result["bytes"], sha256=result["sha256"])
+            changes = await _diff_summary(store_name, commit)
             
             return f"""✅ **TEMPLATE DATA UPDATED SUCCESSFULLY**
 
 🎯 **Template**: {template_name}
-🔄 **Changes Applied**: {feedback_text}
+🔄 **Changes Applied**: {feedback_text}{changes}
 📁 **File**: {filename}
 📂 **Location**: TDM_files folder
 
@@ -185,31 +234,37 @@ def _apply_feedback(template_name: str, feedback_text: str) -> str:
 - "Update {template_name} - Date fields should be recent"
 - "Modify {template_name} - Amount values should be between 1000-5000" """
         else:
-            return f"❌ **UPDATE FAILED**: {response.text}"
+            return f"❌ **UPDATE FAILED**: {result.get('text', '')}"
             
     except Exception as e:
         return f"❌ **UPDATE ERROR**: {str(e)}"
 
-def _save_file(response, template_name: str) -> str:
-    """Save file to TDM_files folder with template name (overwriting if exists)"""
+async def _diff_summary(store_name: str, commit: dict) -> str:
+    """Reply lines comparing a committed edit with the version it replaced ("" if there is none)"""
+    if commit["unchanged"]:
+        return "\n📊 **What Changed**: nothing - the workbook is identical to the previous version"
+    if not commit["previous"]:
+        return ""
+    report_progress("Comparing with the previous version")
     try:
-        os.makedirs("TDM_files", exist_ok=True)
-        
-        # Clean the template name - remove common processing suffixes
-        clean_template_name = template_name
-        suffixes_to_remove = ["_processed", "_modified", "_updated", "_edited"]
-        
-        for suffix in suffixes_to_remove:
-            clean_template_name = clean_template_name.replace(suffix, "")
-        
-        # Use clean template name to overwrite existing file
-        filename = f"{clean_template_name}.xlsx"
-        filepath = os.path.join("TDM_files", filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        
-        return filename
+        _, old_path = tdm_store.version_path(store_name, commit["previous"])
+        _, new_path = tdm_store.version_path(store_name, commit["sha"])
+        diff = await asyncio.to_thread(diff_workbooks, old_path, new_path)
     except Exception as e:
-        clean_name = clean_template_name if 'clean_template_name' in locals() else template_name
-        return f"file_save_error_{clean_name}.xlsx"
+        print(f"Cannot diff {store_name} against its previous version: {e}")
+        return ""
+    
+    lines = format_diff_summary(diff) or ["- No cell values changed"]
+    return f"\n📊 **What Changed** (vs previous version {commit['previous'][:12]}, diffed in {diff['diff_ms']} ms):\n" + "\n".join(lines)
+
+def _tdm_file_path(template_name: str) -> tuple:
+    """Filename and filepath in the TDM_files folder for a template (a new version replaces the current one)"""
+    # Clean the template name - remove common processing suffixes
+    clean_template_name = template_name
+    suffixes_to_remove = ["_processed", "_modified", "_updated", "_edited"]
+    
+    for suffix in suffixes_to_remove:
+        clean_template_name = clean_template_name.replace(suffix, "")
+    
+    filename = f"{clean_template_name}.xlsx"
+    return filename, os.path.join("TDM_files", filename)
@@ -1,29 +1,66 @@
 # tools/TDM_generator.py
-import requests
+import asyncio
 import json
 import os
+import re
+import shutil
+import time
+import uuid
 from langchain.tools import tool
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from tools.http_client import download_to_file, run_sync
+from tools.progress import report_progress
+from tools.tdm_store import tdm_store
+from tools.tdm_synth import local_templates, synthesize
+from tools.template_catalog import template_catalog, find_matching_template, normalize_template_name
+from tools.workbook_merge import merge_workbooks
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 
-# Base URL and cached templates
+# Base URL and last used template
 TDM_BASE_URL = BASE_URL = os.getenv("TDM_BASE_URL")
 _last_used_template = ""
+# Requests above this many rows are split into shards generated concurrently
+TDM_SHARD_ROWS = int(os.getenv("TDM_SHARD_ROWS", "5000"))
+TDM_SHARD_CONCURRENCY = int(os.getenv("TDM_SHARD_CONCURRENCY", "4"))
+TDM_SHARD_TIMEOUT = float(os.getenv("TDM_SHARD_TIMEOUT", "300"))
+# Templates generated at the same time by one batch command
+TDM_BATCH_CONCURRENCY = int(os.getenv("TDM_BATCH_CONCURRENCY", "4"))
+TDM_MANIFEST_DIR = os.path.join("TDM_files", ".manifests")
+# "supplier 200, invoice 500" / "supplier; invoice" ("100,000" is not a separator)
+BATCH_SEPARATOR = re.compile(r"\s*;\s*|,\s+")
+# "supplier 200 and invoice" / "supplier and invoice" - only after a row count or before a known template
+AND_SEPARATOR = re.compile(r"\s+and\s+")
+ROW_COUNT_END = re.compile(r"\d[\d,]*(?:\s+rows?)?$")
+# "remote" uses the TDM service unless the query says offline; "local" always uses the offline engine
+TDM_GENERATION_MODE = os.getenv("TDM_GENERATION_MODE", "remote").lower()
+OFFLINE_WORDS = re.compile(r"\b(?:offline|locally|local|synthetic)\b")
+MODE_WORDS = re.compile(r"\s+(?:as\s+|in\s+)?(?:offline|locally|local|synthetic|csv|xlsx)\b")
 
 @tool("tdm_data_generator", return_direct=True)
 def tdm_data_generator(query: str) -> str:
     """
     TDM DATA GENERATOR - Generates new test data
     Handles: "generate test data for template_name" or "generate test data for template_name X rows"
+    Batch: "generate test data for template_a 200, template_b 500" (generated concurrently)
+    Offline: "generate test data for template_name 1000000 rows offline csv" (learned from the existing workbook)
     """
+    return run_sync(atdm_data_generator, query)
+
+async def atdm_data_generator(query: str) -> str:
+    """Async implementation of tdm_data_generator"""
     global _last_used_template
     
     try:
         query_lower = query.lower().strip()
         
+        offline, output_format = _generation_options(query)
+        batch = _extract_batch(query, await _known_templates(offline))
+        if len(batch) > 1:
+            return await _generate_batch(query, batch, offline, output_format)
+        
         # Extract template and row count
         template_name = _extract_template_name(query)
         row_count = _extract_row_count(query)
@@ -31,20 +68,25 @@ def tdm_data_generator(query: str) -> str:
         if not template_name:
             return "❌ **TEMPLATE NOT SPECIFIED**\n\nPlease specify: 'generate test data for [template_name]'"
         
-        # Validate template exists
-        if not _validate_template(template_name):
-            return _get_template_error(template_name)
+        # Validate template exists (one catalog lookup, usually served from cache)
+        try:
+            matched_template, available_templates = await _resolve_template(template_name, offline)
+        except Exception:
+            return f"❌ **API ERROR**: Cannot fetch available templates"
+        if not matched_template:
+            return _get_template_error(template_name, available_templates)
         
         # Store last used template
-        matched_template = _get_matched_template(template_name)
         _last_used_template = matched_template
         
         # Generate data directly (always has row count now - default 50)
-        return _generate_test_data(matched_template, row_count)
+        return await _generate_test_data(matched_template, row_count, offline, output_format)
         
     except Exception as e:
         return f"❌ **TDM GENERATOR ERROR**: {str(e)}"
 
+tdm_data_generator.coroutine = atdm_data_generator
+
 def _extract_template_name(query: str) -> str:
     """Extract template name from query"""
     try:
@@ -59,108 +101,172 @@ def _extract_template_name(query: str) -> str:
                 if suffix in template_part:
                     template_part = template_part.split(suffix)[0]
             
-            return template_part.strip()
+            # Generation options ("offline", "as csv") and any other trailing row count ("... 75000", "... 100,000")
+            template_part = MODE_WORDS.sub("", f" {template_part.strip()}")
+            return re.sub(r"\s+\d[\d,]*$", "", template_part.strip()).strip()
         
         return ""
     except Exception as e:
         print(f"Error extracting template name: {e}")
         return ""
 
+def _extract_batch(query: str, known_templates: list = ()) -> list:
+    """[(template name, row count), ...] from "generate test data for a 200, b 500" (one entry if not a batch)"""
+    query_lower = query.lower().strip()
+    if " for " not in query_lower:
+        return []
+    
+    entries = []
+    for part in BATCH_SEPARATOR.split(query_lower.split(" for ", 1)[1]):
+        for piece in _split_on_and(part.strip(), known_templates):
+            if piece:
+                entries.append((_extract_template_name(f"generate test data for {piece}"), _extract_row_count(piece)))
+    return [(name, rows) for name, rows in entries if name]
+
+def _split_on_and(part: str, known_templates: list) -> list:
+    """Split on "and" that ends a row count or starts a known template ("Procure and Pay 100" stays whole)"""
+    known = [normalize_template_name(name) for name in known_templates]
+    pieces = AND_SEPARATOR.split(part)
+    entries = [pieces[0]]
+    for piece in pieces[1:]:
+        previous = MODE_WORDS.sub("", f" {entries[-1]}").strip()
+        following = normalize_template_name(piece)
+        if ROW_COUNT_END.search(previous) or any(following == name or following.startswith(f"{name} ") for name in known):
+            entries.append(piece)
+        else:
+            entries[-1] = f"{entries[-1]} and {piece}"
+    return entries
+
+async def _known_templates(offline: bool) -> list:
+    """Template names used to tell batch separators from names containing "and" (empty if unavailable)"""
+    if offline:
+        return local_templates()
+    try:
+        return await template_catalog.get_templates()
+    except Exception:
+        return []
+
+def _generation_options(query: str) -> tuple:
+    """(offline, output format) requested by the query"""
+    query_lower = query.lower()
+    offline = TDM_GENERATION_MODE == "local" or bool(OFFLINE_WORDS.search(query_lower))
+    output_format = "csv" if offline and re.search(r"\bcsv\b", query_lower) else "xlsx"
+    return offline, output_format
+
+async def _resolve_template(template_name: str, offline: bool) -> tuple:
+    """(matched template or None, available templates) - offline generation needs a workbook in TDM_files"""
+    if offline:
+        available_templates = local_templates()
+        return find_matching_template(template_name, available_templates), available_templates
+    return await template_catalog.match(template_name)
+
+async def _generate_batch(query: str, batch: list, offline: bool = False, output_format: str = "xlsx") -> str:
+    """Generate several templates concurrently and write a manifest of the produced files"""
+    global _last_used_template
+    
+    try:
+        resolved = [await _resolve_template(name, offline) for name, _ in batch]
+    except Exception:
+        return "❌ **API ERROR**: Cannot fetch available templates"
+    missing = [name for (name, _), (matched, _) in zip(batch, resolved) if not matched]
+    if missing:
+        return _get_template_error(", ".join(missing), resolved[0][1])
+    
+    semaphore = asyncio.Semaphore(TDM_BATCH_CONCURRENCY)
+    # A template listed twice writes the same workbook - its generations run one after another
+    template_locks = {matched: asyncio.Lock() for matched, _ in resolved}
+    
+    async def _one(template_name: str, row_count: int) -> dict:
+        async with template_locks[template_name], semaphore:
+            started = time.perf_counter()
+            try:
+                filename, filepath, result = await _generate_workbook(template_name, row_count, offline, output_format)
+            except Exception as e:
+                filename, filepath, result = None, None, {"text": str(e)}
+            seconds = round(time.perf_counter() - started, 2)
+        report_progress(f"Generated {template_name} ({row_count} rows) in {seconds}s")
+        entry = {"template": template_name, "rows": row_count, "seconds": seconds}
+        if "path" in result:
+            entry.update(status="success", file=filename, path=filepath, bytes=os.path.getsize(filepath))
+            if "shards" in result:
+                entry["shards"] = result["shards"]
+        else:
+            entry.update(status="failed", error=result.get("text", ""))
+        return entry
+    
+    started = time.perf_counter()
+    report_progress(f"Generating {len(batch)} templates ({TDM_BATCH_CONCURRENCY} at a time)")
+    entries = await asyncio.gather(*[_one(matched, rows) for (matched, _), (_, rows) in zip(resolved, batch)])
+    total_seconds = round(time.perf_counter() - started, 2)
+    
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "query": query,
+        "total_seconds": total_seconds,
+        "files": entries,
+    }
+    os.makedirs(TDM_MANIFEST_DIR, exist_ok=True)
+    manifest_path = os.path.join(TDM_MANIFEST_DIR, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    
+    succeeded = [e for e in entries if e["status"] == "success"]
+    if succeeded:
+        _last_used_template = succeeded[-1]["template"]
+    
+    lines = []
+    for e in entries:
+        if e["status"] == "success":
+            lines.append(f"- ✅ **{e['template']}**: {e['rows']} rows → {e['file']} ({e['seconds']}s)")
+        else:
+            lines.append(f"- ❌ **{e['template']}**: {e['error']} ({e['seconds']}s)")
+    attachments = "\n".join(f"[FILE_ATTACHMENT:{e['path']}]" for e in succeeded)
+    title = "✅ **BATCH TEST DATA GENERATED**" if len(succeeded) == len(entries) else "⚠️ **BATCH TEST DATA PARTIALLY GENERATED**"
+    
+    return f"""{title}
+📦 **Templates**: {len(succeeded)}/{len(entries)} succeeded
+⏱️ **Total Time**: {total_seconds}s (sum of templates: {round(sum(e['seconds'] for e in entries), 2)}s)
+{chr(10).join(lines)}
+🧾 **Manifest**: {manifest_path}
+📂 **Location**: TDM_files folder
+
+{attachments}"""
+
 def _extract_row_count(query: str) -> int:
     """Extract row count from query. Default to 50 if none specified."""
     try:
-        import re
-        # Try to find any number in the query
-        matches = re.findall(r'\b(\d+)\b', query)
+        # Try to find any number in the query ("100000" or "100,000")
+        matches = re.findall(r'\b(\d{1,3}(?:,\d{3})+|\d+)\b', query)
         if matches:
             # Take the first number found that looks like a row count
-            return int(matches[0])
+            return int(matches[0].replace(",", ""))
         # Default row count
         return 50
     except Exception as e:
         print(f"Error extracting row count: {e}")
         return 50
 
-def _validate_template(template_name: str) -> bool:
-    """Validate if template exists"""
-    try:
-        templates_url = f"{TDM_BASE_URL}/templates/TDM User"
-        response = requests.get(templates_url, timeout=10)
-        
-        if response.status_code == 200:
-            available_templates = response.json().get("templates", [])
-            return _find_matching_template(template_name, available_templates) is not None
-        return False
-    except:
-        return False
-
-def _get_matched_template(template_name: str) -> str:
-    """Get the actual matched template name"""
-    try:
-        templates_url = f"{TDM_BASE_URL}/templates/TDM User"
-        response = requests.get(templates_url, timeout=10)
-        
-        if response.status_code == 200:
-            available_templates = response.json().get("templates", [])
-            return _find_matching_template(template_name, available_templates)
-        return template_name
-    except:
-        return template_name
-
-def _find_matching_template(template_name: str, available_templates: list) -> str:
-    """Find matching template"""
-    template_lower = template_name.lower()
-    
-    # Exact match
-    for template in available_templates:
-        if template.lower() == template_lower:
-            return template
-    
-    # Partial match
-    for template in available_templates:
-        if template_lower in template.lower() or template.lower() in template_lower:
-            return template
-    
-    return None
-
-def _get_template_error(template_name: str) -> str:
+def _get_template_error(template_name: str, available_templates: list) -> str:
     """Get template error message with available templates"""
-    try:
-        templates_url = f"{TDM_BASE_URL}/templates/TDM User"
-        response = requests.get(templates_url, timeout=10)
-        
-        if response.status_code == 200:
-            available_templates = response.json().get("templates", [])
-            templates_list = ", ".join(available_templates)
-            
-            return f"""❌ **TEMPLATE NOT FOUND**
+    templates_list = ", ".join(available_templates)
+    suggestions = template_catalog.suggest(template_name)
+    did_you_mean = f"💡 **Did you mean**: {', '.join(suggestions)}\n" if suggestions else ""
+    
+    return f"""❌ **TEMPLATE NOT FOUND**
 🔍 **Searched for**: {template_name}
-📋 **Available Templates for data generation**: {templates_list}
+{did_you_mean}📋 **Available Templates for data generation**: {templates_list}
 ❗ Please ask the admin to add the template '{template_name}' or use an available template."""
-        else:
-            return f"❌ **TEMPLATE ERROR**: Cannot validate template '{template_name}'"
-    except:
-        return f"❌ **API ERROR**: Cannot fetch available templates"
 
-def _generate_test_data(template_name: str, row_count: int) -> str:
-    """Generate test data via API"""
+async def _generate_test_data(template_name: str, row_count: int, offline: bool = False, output_format: str = "xlsx") -> str:
+    """Generate test data via API (or the offline engine)"""
     try:
-        generate_url = f"{TDM_BASE_URL}/generate-test-data"
-        payload = {
-            "username": "TDM User",
-            "template_name": template_name,
-            "num_records": str(row_count)
-        }
+        filename, filepath, result = await _generate_workbook(template_name, row_count, offline, output_format)
         
-        response = requests.post(generate_url, json=payload, timeout=30)
-        
-        if response.status_code == 200:
-            filename, filepath = _save_file(response, template_name)
-            
+        if "path" in result:
             # Create response with file attachment capability
             response_text = f"""✅ **TEST DATA GENERATED SUCCESSFULLY**
 🎯 **Template**: {template_name}
-📊 **Records**: {row_count}
+📊 **Records**: {row_count}{_generation_summary(result)}
 📁 **File**: {filename}
 📂 **Location**: TDM_files folder
 🔍 **Review**: Check the data in TDM data sub app
@@ -173,22 +279,105 @@ def _generate_test_data(template_name: str, row_count: int) -> str:
             
             return response_text
         else:
-            return f"❌ **GENERATION FAILED**: {response.text}"
+            return f"❌ **GENERATION FAILED**: {result.get('text', '')}{_offline_hint(template_name, offline)}"
             
     except Exception as e:
-        return f"❌ **GENERATION ERROR**: {str(e)}"
+        return f"❌ **GENERATION ERROR**: {str(e)}{_offline_hint(template_name, offline)}"
 
-def _save_file(response, filename_prefix: str) -> tuple:
-    """Save file to TDM_files folder and return filename and filepath"""
+def _offline_hint(template_name: str, offline: bool) -> str:
+    """Suggest the offline engine when the TDM service failed and a workbook exists to learn from"""
+    if offline or template_name not in local_templates():
+        return ""
+    return f"\n💡 **Tip**: 'generate test data for {template_name} offline' generates locally from the existing workbook"
+
+async def _generate_workbook(template_name: str, row_count: int, offline: bool = False, output_format: str = "xlsx") -> tuple:
+    """(filename, filepath, download result) - sharded above TDM_SHARD_ROWS rows"""
+    if offline:
+        report_progress(f"Generating {row_count} rows for {template_name} offline")
+        synth = await asyncio.to_thread(synthesize, template_name, row_count, output_format)
+        filepath = synth["files"][0]
+        return os.path.basename(filepath), filepath, {"status_code": 200, "path": filepath, "synth": synth}
+    
+    generate_url = f"{TDM_BASE_URL}/generate-test-data"
+    payload = {
+        "username": "TDM User",
+        "template_name": template_name,
+        "num_records": str(row_count)
+    }
+    
+    filename, filepath = _tdm_file_path(template_name)
+    # Written to a staging file first, then committed to the versioned store (atomic swap)
+    staging_path = tdm_store.staging_path(template_name)
+    if row_count > TDM_SHARD_ROWS:
+        result = await _generate_sharded(generate_url, payload, row_count, staging_path)
+    else:
+        # Stream the workbook straight to disk (flat memory for any num_records)
+        result = await download_to_file("POST", generate_url, staging_path, json=payload, timeout=30)
+    
+    if "path" in result:
+        result["store"] = await asyncio.to_thread(tdm_store.commit, template_name, staging_path, "TDM service")
+        result["path"] = filepath
+    return filename, filepath, result
+
+async def _generate_sharded(generate_url: str, payload: dict, row_count: int, filepath: str) -> dict:
+    """
+    Generate a large row count as TDM_SHARD_ROWS-sized shards (at most TDM_SHARD_CONCURRENCY
+    requests in flight) and merge the shard workbooks into filepath.
+    Returns download_to_file-style results, plus "shards" and merge "stats" on success.
+    """
+    shard_sizes = [TDM_SHARD_ROWS] * (row_count // TDM_SHARD_ROWS)
+    if row_count % TDM_SHARD_ROWS:
+        shard_sizes.append(row_count % TDM_SHARD_ROWS)
+    shard_dir = os.path.join(os.path.dirname(filepath) or ".", f".shards_{uuid.uuid4().hex[:12]}")
+    semaphore = asyncio.Semaphore(TDM_SHARD_CONCURRENCY)
+    done = 0
+
+    async def _shard(number: int, size: int) -> dict:
+        nonlocal done
+        async with semaphore:
+            shard_path = os.path.join(shard_dir, f"shard_{number:04d}.xlsx")
+            result = await download_to_file("POST", generate_url, shard_path, timeout=TDM_SHARD_TIMEOUT,
+                                            json={**payload, "num_records": str(size)})
+        if "path" not in result:
+            raise RuntimeError(f"Shard {number + 1}/{len(shard_sizes)} failed: {result.get('text', '')}")
+        done += 1
+        report_progress(f"Generated shard {done}/{len(shard_sizes)}", shards_done=done, shards_total=len(shard_sizes))
+        return result
+
+    report_progress(f"Generating {row_count} rows as {len(shard_sizes)} shards")
+    tasks = [asyncio.create_task(_shard(number, size)) for number, size in enumerate(shard_sizes)]
     try:
-        os.makedirs("TDM_files", exist_ok=True)
-        filename = f"{filename_prefix}.xlsx"
-        filepath = os.path.join("TDM_files", filename)
-        
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
-        
-        return filename, filepath
-    except Exception as e:
-        error_filename = f"file_save_error_{filename_prefix}.xlsx"
-        return error_filename, ""
+        try:
+            results = await asyncio.gather(*tasks)
+        except Exception as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            return {"status_code": 500, "text": str(e)}
+
+        report_progress(f"Merging {len(shard_sizes)} shards into {os.path.basename(filepath)}")
+        try:
+            stats = await asyncio.to_thread(merge_workbooks, [r["path"] for r in results], filepath)
+        except ValueError as e:
+            return {"status_code": 500, "text": f"Merging shards failed: {e}"}
+        return {"status_code": 200, "path": filepath, "shards": len(shard_sizes), "stats": stats}
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+def _generation_summary(result: dict) -> str:
+    """Extra result lines for a sharded or offline generation"""
+    if "synth" in result:
+        synth = result["synth"]
+        summary = f"\n⚡ **Generated Offline**: {synth['generate_ms']} ms to generate, {synth['total_ms']} ms including the {synth['format']} write"
+        if synth["format"] == "csv":
+            summary += f"\n📄 **CSV Files**: {', '.join(synth['files'])}"
+        return summary
+    if "shards" not in result:
+        return ""
+    merged = [name for name, sheet in result["stats"]["sheets"].items() if sheet["merged"]]
+    return f"\n🧩 **Shards**: {result['shards']} of up to {TDM_SHARD_ROWS} rows, merged ({', '.join(merged)})"
+
+def _tdm_file_path(filename_prefix: str) -> tuple:
+    """Filename and filepath of a template's workbook in the TDM_files folder"""
+    filename = f"{filename_prefix}.xlsx"
+    return filename, os.path.join("TDM_files", filename)
@@ -0,0 +1,186 @@
+# tools/command_router.py
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Tool name -> test category reported back to the UI (mirrors the /mcp-agent heuristics)
+TOOL_TEST_CATEGORIES = {
+    "execute_run_manager_mode": "runManager",
+    "execute_standard_mode": "standardTests",
+    "execute_bulk_mode": "bulkTests",
+    "execute_bulk_mode_with_selection": "bulkTests",
+    "execute_e2e_mode": "endToEndFlows",
+}
+
+RUN_MANAGER_ENTRY = r"(?:run|trigger|execute)\s+(?:test|run)\s+manager"
+EXECUTION_VERBS = r"(?:execute|run|trigger)"
+
+
+class FastPathRule:
+    """A compiled command pattern mapped to a single tool"""
+
+    def __init__(self, priority: int, name: str, tool_name: str, pattern: str,
+                 build_input: Callable[[re.Match, str], Optional[str]]):
+        self.priority = priority
+        self.name = name
+        self.tool_name = tool_name
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.build_input = build_input
+
+
+class RouteMatch:
+    """Result of a fast-path hit: which tool to call and with what input"""
+
+    def __init__(self, rule: FastPathRule, tool_name: str, tool_input: str):
+        self.rule = rule.name
+        self.priority = rule.priority
+        self.tool_name = tool_name
+        self.tool_input = tool_input
+        self.test_category = TOOL_TEST_CATEGORIES.get(tool_name, "")
+
+
+class CommandRouter:
+    """
+    Deterministic fast path in front of the LLM agent.
+    Fully specified commands (the fixed patterns from the system message priority rules)
+    are dispatched straight to their tool; everything else falls through to agent.arun.
+    """
+
+    def __init__(self, tools: List[Any], categorizer=None):
+        self.tools = {tool.name: tool for tool in tools}
+        self.categorizer = categorizer
+        self.enabled = os.getenv("FAST_PATH_ROUTER", "true").lower() != "false"
+        self.rules = [rule for rule in self._build_rules() if not rule.tool_name or rule.tool_name in self.tools]
+        self.rules.sort(key=lambda rule: rule.priority)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "rules": {}, "dispatch_ms_total": 0.0}
+
+    # ---------------------------
+    # Rule table (same order as TOOL SELECTION PRIORITY)
+    # ---------------------------
+    def _build_rules(self) -> List[FastPathRule]:
+        return [
+            FastPathRule(0, "run_manager_entry", "execute_run_manager_mode",
+                         rf"^{RUN_MANAGER_ENTRY}$",
+                         lambda m, q: q.lower()),
+            FastPathRule(0, "run_manager_selection", "execute_run_manager_mode",
+                         rf"^({RUN_MANAGER_ENTRY})\s+with\s+(\S.*)$",
+                         lambda m, q: f"{' '.join(m.group(1).lower().split())} with {m.group(2)}"),
+            FastPathRule(2, "heal_mode", "execute_heal_mode",
+                         rf"^{EXECUTION_VERBS}\s+(.+?)\s+(?:in|with|using)\s+(?:heal|healing)\s+mode$",
+                         lambda m, q: self._known_test(m.group(1), "standardTests")),
+            FastPathRule(3, "standard_with_selection", "execute_standard_mode_with_selection",
+                         r"^execute\s+(.+?)\s+with\s+(\S+)$",
+                         self._build_standard_selection),
+            FastPathRule(5, "tdm_generate", "tdm_data_generator",
+                         r"^generate\s+test\s+data\s+for\s+\S+(?:\s+\d[\d,]*(?:\s+rows?)?)?"
+                         r"(?:(?:\s*;\s*|,\s+|\s+and\s+)\S+(?:\s+\d[\d,]*(?:\s+rows?)?)?)*"
+                         r"(?:\s+(?:as\s+|in\s+)?(?:offline|locally|local|synthetic|csv|xlsx))*$",
+                         lambda m, q: q),
+            FastPathRule(7, "data_recon", "data_reconciliation",
+                         r"^(?:data\s+recon(?:\s+for)?|recon\s+for|reconcile|reconciliation\s+for)\s+\w+$",
+                         lambda m, q: q),
+            FastPathRule(8, "patch_report", "patch_version_generator",
+                         r"^(?:execute\s+)?patch(?:\s+report)?(?:\s+version\s+\w+)?$",
+                         lambda m, q: q.lower()),
+            FastPathRule(9, "bulk_selection", "execute_bulk_mode_with_selection",
+                         r"^execute\s+bulk\s+(\S+)\s+(all|first\s+\d+|random\s+\d+|range\s+\d+\s+\d+|custom\s+\S+)$",
+                         lambda m, q: f"execute bulk {m.group(1)} {m.group(2)}"),
+            FastPathRule(10, "normal_mode", "",
+                         rf"^{EXECUTION_VERBS}\s+(.+)$",
+                         None),
+        ]
+
+    def _categorize(self, name: str) -> Optional[Dict[str, Any]]:
+        """Exact (case-insensitive) lookup of a test case / flow name"""
+        if not self.categorizer:
+            return None
+        categorization = self.categorizer.categorize_test_case(name.strip())
+        if categorization.get("category") == "unknown":
+            return None
+        return categorization
+
+    def _known_test(self, name: str, category: str) -> Optional[str]:
+        categorization = self._categorize(name)
+        if categorization and categorization["category"] == category:
+            return categorization["test_name"]
+        return None
+
+    def _build_standard_selection(self, match: re.Match, query: str) -> Optional[str]:
+        test_name = self._known_test(match.group(1), "standardTests")
+        if not test_name:
+            return None
+        return f"execute {test_name} with {match.group(2)}"
+
+    # ---------------------------
+    # Matching and dispatch
+    # ---------------------------
+    def match(self, query: str) -> Optional[RouteMatch]:
+        """Return the first rule that fully matches the command, recording hit/miss stats"""
+        route = self._match(query) if self.enabled else None
+        with self._lock:
+            if route:
+                self._stats["hits"] += 1
+                self._stats["rules"][route.rule] = self._stats["rules"].get(route.rule, 0) + 1
+            else:
+                self._stats["misses"] += 1
+        return route
+
+    def _match(self, query: str) -> Optional[RouteMatch]:
+        normalized = " ".join((query or "").split())
+        if not normalized:
+            return None
+
+        # Healing keywords anywhere win over every plain execution rule (priority 2)
+        mentions_healing = re.search(r"\bheal(?:ing)?\b", normalized, re.IGNORECASE)
+
+        for rule in self.rules:
+            match = rule.regex.match(normalized)
+            if not match:
+                continue
+            if mentions_healing and rule.tool_name != "execute_heal_mode":
+                continue
+
+            if rule.name == "normal_mode":
+                categorization = self._categorize(match.group(1))
+                if not categorization or categorization["tool"] not in self.tools:
+                    continue
+                return RouteMatch(rule, categorization["tool"], categorization["test_name"])
+
+            tool_input = rule.build_input(match, normalized)
+            if tool_input:
+                return RouteMatch(rule, rule.tool_name, tool_input)
+        return None
+
+    async def dispatch(self, route: RouteMatch) -> str:
+        """Invoke the matched tool directly, bypassing the LLM"""
+        start = time.perf_counter()
+        try:
+            return await self.tools[route.tool_name].arun(route.tool_input)
+        finally:
+            with self._lock:
+                self._stats["dispatch_ms_total"] += (time.perf_counter() - start) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss report for the fast path"""
+        with self._lock:
+            hits = self._stats["hits"]
+            misses = self._stats["misses"]
+            total = hits + misses
+            return {
+                "enabled": self.enabled,
+                "total_requests": total,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "miss_rate": round(misses / total, 4) if total else 0.0,
+                "avg_dispatch_ms": round(self._stats["dispatch_ms_total"] / hits, 2) if hits else 0.0,
+                "hits_by_rule": dict(self._stats["rules"]),
+                "rules": [
+                    {"priority": rule.priority, "name": rule.name, "tool": rule.tool_name or "categorized"}
+                    for rule in self.rules
+                ],
+            }
@@ -1,11 +1,12 @@
 # tools/execute_bulk_mode.py
 
-import requests
 import random
 import re
 from langchain.tools import tool
 import os
 from dotenv import load_dotenv
+from tools.http_client import get_async_client, run_sync
+from tools.progress import report_progress
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 BASE_URL = os.getenv("HOST_BASE_URL")
 bulk_data_cache = {}
@@ -28,9 +29,16 @@ def bulk_mode_tool(testcase_name: str) -> str:
     BULK MODE EXECUTION ACTIVATED
     Step 1: Extract data and present options to user
     """
+    return run_sync(abulk_mode, testcase_name)
+
+async def abulk_mode(testcase_name: str) -> str:
+    """Async implementation of execute_bulk_mode"""
     try:
+        client = get_async_client()
+
         # --- 4.1 Get the Datasheet Name ---
-        resp = requests.post(f"{BASE_URL}/search-testcase", json={"testcase_name": testcase_name})
+        report_progress(f"Searching datasheet for '{testcase_name}'")
+        resp = await client.post(f"{BASE_URL}/search-testcase", json={"testcase_name": testcase_name})
         if resp.status_code != 200:
             return f"❌ Failed to search testcase: {resp.text}"
         
@@ -43,7 +51,8 @@ def bulk_mode_tool(testcase_name: str) -> str:
             return f"❌ Datasheet name not found for testcase '{testcase_name}'."
 
         # --- 4.2 Extract Data from Datasheet ---
-        resp = requests.post(f"{BASE_URL}/extract-data", json={"excel_file_name": datasheet_name})
+        report_progress(f"Extracting data from '{datasheet_name}'")
+        resp = await client.post(f"{BASE_URL}/extract-data", json={"excel_file_name": datasheet_name})
         if resp.status_code != 200:
             return f"❌ Failed to extract data: {resp.text}"
         
@@ -86,6 +95,8 @@ def bulk_mode_tool(testcase_name: str) -> str:
     except Exception as e:
         return f"❌ Error during bulk execution: {str(e)}"
 
+bulk_mode_tool.coroutine = abulk_mode
+
 # Global cache for bulk data (use proper storage in production)
 bulk_data_cache = {}
 
@@ -100,6 +111,10 @@ def bulk_mode_with_selection_tool(command: str) -> str:
     - execute bulk TestName range 7 15
     - execute bulk TestName custom Supplier__015,Supplier__016
     """
+    return run_sync(abulk_mode_with_selection, command)
+
+async def abulk_mode_with_selection(command: str) -> str:
+    """Async implementation of execute_bulk_mode_with_selection"""
     try:
         # Parse the command
         parts = command.strip().split()
@@ -154,12 +169,14 @@ def bulk_mode_with_selection_tool(command: str) -> str:
             return "❌ No values selected. Please check your selection criteria."
         
         # --- 4.3 Update reference IDs ---
+        report_progress(f"Updating {len(selected_values)} reference IDs", selected=len(selected_values))
         update_payload = {
             "testcase_name": testcase_name,
             "reference_ids": selected_values
         }
         
-        resp = requests.post(f"{BASE_URL}/update-reference-ids", json=update_payload)
+        client = get_async_client()
+        resp = await client.post(f"{BASE_URL}/update-reference-ids", json=update_payload)
         if resp.status_code != 200:
             return f"❌ Failed to update reference IDs: {resp.text}"
         
@@ -168,8 +185,9 @@ def bulk_mode_with_selection_tool(command: str) -> str:
             return f"❌ Failed to update reference IDs for '{testcase_name}'. Response: {update_result}"
         
         # --- 4.4 Trigger the test ---
+        report_progress(f"Triggering bulk test '{testcase_name}'")
         trigger_payload = {"test_name": testcase_name}
-        resp = requests.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
+        resp = await client.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
         if resp.status_code != 200:
             return f"❌ Failed to trigger test: {resp.text}"
         
@@ -194,3 +212,5 @@ def bulk_mode_with_selection_tool(command: str) -> str:
         return f"❌ Invalid number format: {str(e)}"
     except Exception as e:
         return f"❌ Error during bulk execution: {str(e)}"
+
+bulk_mode_with_selection_tool.coroutine = abulk_mode_with_selection
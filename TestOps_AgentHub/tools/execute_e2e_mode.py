@@ -1,12 +1,13 @@
 # tools/execute_e2e_mode.py
 
-import requests
+import httpx
 import json
 import os
 from langchain.tools import tool
 import os
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+from tools.http_client import get_async_client, run_sync
 BASE_URL = os.getenv("HOST_BASE_URL")
 
 @tool("execute_e2e_mode", return_direct=True)
@@ -15,6 +16,10 @@ def e2e_mode_tool(flow_name: str) -> str:
     END-TO-END MODE EXECUTION
     Finds the flow sequence from JSON and triggers all tests in sequence
     """
+    return run_sync(ae2e_mode, flow_name)
+
+async def ae2e_mode(flow_name: str) -> str:
+    """Async implementation of execute_e2e_mode"""
     try:
         # Load the JSON file from project root
         json_file_path = os.path.join(os.getcwd(), "test-data-source.json")
@@ -53,7 +58,7 @@ Please use one of the available flow names."""
         
         # Trigger the tests in sequence
         trigger_payload = {"test_name": test_names}
-        resp = requests.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
+        resp = await get_async_client().post(f"{BASE_URL}/trigger-test", json=trigger_payload)
         
         if resp.status_code != 200:
             return f"❌ Failed to trigger E2E flow '{flow_name}': {resp.text}"
@@ -88,7 +93,9 @@ Please check the flow configuration and try again."""
         return f"❌ test-data-source.json file not found in project root"
     except json.JSONDecodeError:
         return f"❌ Invalid JSON format in test-data-source.json"
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"❌ Network error while triggering E2E flow '{flow_name}': {str(e)}"
     except Exception as e:
         return f"❌ Error during E2E execution of '{flow_name}': {str(e)}"
+
+e2e_mode_tool.coroutine = ae2e_mode
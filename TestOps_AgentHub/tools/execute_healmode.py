@@ -1,13 +1,15 @@
 # tools/execute_healmode.py
 
-import requests
+import asyncio
+import httpx
 import json
 import os
-import time
 from langchain.tools import tool
-import os
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+from tools.http_client import get_async_client, run_sync
+from tools.job_queue import job_manager, format_job_ack
+from tools.progress import report_progress
 BASE_URL = os.getenv("HOST_BASE_URL")
 
 @tool("execute_heal_mode", return_direct=True)
@@ -17,6 +19,10 @@ def heal_mode_tool(testcase_name: str) -> str:
     Executes test cases with auto-healing capabilities for UI standard tests only
     Runs up to 5 iterations until test passes or requires human intervention
     """
+    return run_sync(aheal_mode, testcase_name)
+
+async def aheal_mode(testcase_name: str) -> str:
+    """Async implementation of execute_heal_mode"""
     try:
         # Load test data from JSON
         json_file_path = os.path.join(os.getcwd(), "test-data-source.json")
@@ -78,8 +84,14 @@ def heal_mode_tool(testcase_name: str) -> str:
 **Reason**: API tests need different validation mechanisms.
 **Recommendation**: Use standard mode execution."""
         
-        # Proceed with healing mode for UI standard tests
-        return execute_healing_iterations(testcase_name)
+        # Proceed with healing mode for UI standard tests - iterations run as a background job
+        job = job_manager.submit("execute_heal_mode", execute_healing_iterations, testcase_name,
+                                 metadata={"testcase_name": testcase_name})
+        return format_job_ack(job, "HEALING MODE ACTIVATED", {
+            "🎯 **Test Case**": testcase_name,
+            "🔄 **Max Iterations**": "5",
+            "🛠️ **Auto-Healing**": "Enabled",
+        })
         
     except FileNotFoundError:
         return f"❌ test-data-source.json file not found in project root"
@@ -88,7 +100,9 @@ def heal_mode_tool(testcase_name: str) -> str:
     except Exception as e:
         return f"❌ Error in healing mode validation: {str(e)}"
 
-def execute_healing_iterations(testcase_name: str) -> str:
+heal_mode_tool.coroutine = aheal_mode
+
+async def execute_healing_iterations(testcase_name: str) -> str:
     """
     Execute test with healing iterations (up to 5 attempts)
     """
@@ -103,16 +117,18 @@ def execute_healing_iterations(testcase_name: str) -> str:
 
 """
     
+    client = get_async_client()
     for iteration in range(1, max_iterations + 1):
         try:
             # Trigger the test
             trigger_payload = {"test_name": testcase_name}
-            resp = requests.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
+            resp = await client.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
             
             if resp.status_code != 200:
                 status = f"Iteration {iteration}: ❌ API Error (HTTP {resp.status_code})"
                 iteration_status.append(status)
                 healing_log += f"🔄 {status}\n"
+                report_progress(status, iteration=iteration, max_iterations=max_iterations)
                 continue
             
             try:
@@ -142,6 +158,7 @@ def execute_healing_iterations(testcase_name: str) -> str:
             if test_passed:
                 status = f"Iteration {iteration}: ✅ PASSED"
                 healing_log += f"🔄 {status}\n"
+                report_progress(status, iteration=iteration, max_iterations=max_iterations, passed=True)
                 healing_log += f"""
 🎉 **SUCCESS!** Test passed on iteration {iteration}
 
@@ -155,20 +172,23 @@ def execute_healing_iterations(testcase_name: str) -> str:
                 status = f"Iteration {iteration}: ❌ FAILED"
                 iteration_status.append(status)
                 healing_log += f"🔄 {status}\n"
+                report_progress(status, iteration=iteration, max_iterations=max_iterations, passed=False)
                 
                 # Add healing attempt message (except for last iteration)
                 if iteration < max_iterations:
                     healing_log += f"🛠️ Auto-healing in progress...\n"
-                    time.sleep(1)
+                    await asyncio.sleep(1)
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             status = f"Iteration {iteration}: ❌ Network Error"
             iteration_status.append(status)
             healing_log += f"🔄 {status}\n"
+            report_progress(status, iteration=iteration, max_iterations=max_iterations)
         except Exception as e:
             status = f"Iteration {iteration}: ❌ Error"
             iteration_status.append(status)
             healing_log += f"🔄 {status}\n"
+            report_progress(status, iteration=iteration, max_iterations=max_iterations)
     
     # All iterations failed
     healing_log += f"""
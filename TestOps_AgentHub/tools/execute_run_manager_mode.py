@@ -1,8 +1,10 @@
 import os
-import requests
 import re
 from langchain.tools import tool
 from dotenv import load_dotenv
+from tools.http_client import get_async_client, run_sync
+from tools.job_queue import job_manager, format_job_ack
+from tools.progress import report_progress
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 BASE_URL = os.getenv("HOST_BASE_URL")
@@ -66,20 +68,52 @@ def parse_test_results(stdout_text):
     except Exception:
         return f"📋 **Test execution completed** (Raw output parsing failed)\n💡 *Check detailed reports for full results*"
 
+async def run_selected_test_cases(valid_ids, invalid_ids) -> str:
+    """Update the run manager selection and run it (background job body)"""
+    client = get_async_client()
+    report_progress(f"Updating run manager with {len(valid_ids)} test cases")
+    put_resp = await client.put(
+        f"{BASE_URL}/updatetestcasesinrunmanager",
+        json={"test_case_ids": valid_ids}
+    )
+    if put_resp.status_code != 200:
+        return f"❌ Failed to update test cases: {put_resp.text}"
+
+    warning = ""
+    if invalid_ids:
+        warning = f"\n⚠️ *These IDs were not found and ignored: {', '.join(invalid_ids)}*\n"
+
+    report_progress("Triggering run manager execution")
+    trigger_resp = await client.post(f"{BASE_URL}/runtestmanager")
+    result = trigger_resp.json() if trigger_resp.status_code == 200 else {"stdout": trigger_resp.text}
+    clean_results = parse_test_results(result.get('stdout', str(result)))
+
+    return (
+        f"🚀 **RUN MANAGER EXECUTION COMPLETED!**\n"
+        f"📝 **Selected Test Cases**: {', '.join(valid_ids)}\n"
+        f"{warning}\n"
+        f"{clean_results}"
+    )
+
 @tool("execute_run_manager_mode", return_direct=True)
 def execute_run_manager_mode(command: str) -> str:
     """
     Conversational run manager tool supporting these entry commands (with/without 'with ...'):
     - run test manager/run run manager/execute/.../trigger test manager/run manager
     """
+    return run_sync(aexecute_run_manager_mode, command)
+
+async def aexecute_run_manager_mode(command: str) -> str:
+    """Async implementation of execute_run_manager_mode"""
     global run_manager_test_cases_cache
     try:
+        client = get_async_client()
         cmd = command.strip()
         entry_cmd = None
 
         # Step 1: If it's any of the entry commands, show all test case IDs
         if is_entry_command(cmd.lower()):
-            resp = requests.get(f"{BASE_URL}/runtestmanagerutil")
+            resp = await client.get(f"{BASE_URL}/runtestmanagerutil")
             if resp.status_code != 200:
                 return f"❌ Unable to retrieve test cases: {resp.text}"
             data = resp.json()
@@ -111,29 +145,14 @@ def execute_run_manager_mode(command: str) -> str:
             valid_ids = [tid for tid in selected_ids if tid in run_manager_test_cases_cache]
             invalid_ids = [tid for tid in selected_ids if tid not in run_manager_test_cases_cache]
 
-            put_resp = requests.put(
-                f"{BASE_URL}/updatetestcasesinrunmanager",
-                json={"test_case_ids": valid_ids}
-            )
-            if put_resp.status_code != 200:
-                return f"❌ Failed to update test cases: {put_resp.text}"
-
-            warning = ""
-            if invalid_ids:
-                warning = f"\n⚠️ *These IDs were not found and ignored: {', '.join(invalid_ids)}*\n"
-
-            trigger_resp = requests.post(f"{BASE_URL}/runtestmanager")
-            result = trigger_resp.json() if trigger_resp.status_code == 200 else {"stdout": trigger_resp.text}
-            clean_results = parse_test_results(result.get('stdout', str(result)))
-
-            output_text = (
-                f"🚀 **RUN MANAGER EXECUTION COMPLETED!**\n"
-                f"📝 **Selected Test Cases**: {', '.join(valid_ids)}\n"
-                f"{warning}\n"
-                f"{clean_results}"
-            )
+            # Update + trigger can take as long as the whole suite - run it as a background job
+            job = job_manager.submit("execute_run_manager_mode", run_selected_test_cases, valid_ids, invalid_ids,
+                                     metadata={"test_case_ids": valid_ids})
             run_manager_test_cases_cache = []
-            return output_text
+            return format_job_ack(job, "RUN MANAGER EXECUTION STARTED", {
+                "📝 **Selected Test Cases**": ", ".join(valid_ids) or "None",
+                "⚠️ **Ignored IDs**": ", ".join(invalid_ids) or "None",
+            })
 
         # Fallback
         return (
@@ -145,3 +164,5 @@ def execute_run_manager_mode(command: str) -> str:
 
     except Exception as e:
         return f"❌ Error in run manager tool: {str(e)}"
+
+execute_run_manager_mode.coroutine = aexecute_run_manager_mode
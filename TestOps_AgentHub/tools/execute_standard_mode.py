@@ -1,9 +1,11 @@
 # tools/execute_standard_mode.py
 
-import requests
+import httpx
 from langchain.tools import tool
 import os
 from dotenv import load_dotenv
+from tools.http_client import get_async_client, run_sync
+from tools.progress import report_progress
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 BASE_URL = os.getenv("HOST_BASE_URL")
@@ -20,10 +22,14 @@ def standard_mode_tool(testcase_name: str) -> str:
     
     For other tests: Direct trigger without preprocessing
     """
+    return run_sync(astandard_mode, testcase_name)
+
+async def astandard_mode(testcase_name: str) -> str:
+    """Async implementation of execute_standard_mode (awaited by LangChain's async path)"""
     try:
         # Special handling for Invoice creation UI test case
         if testcase_name == "Invoice creation UI":
-            return handle_invoice_creation_ui_discovery(testcase_name)
+            return await handle_invoice_creation_ui_discovery(testcase_name)
         # Future entity-driven tests can be added here
         # elif testcase_name == "AR Invoice UI":
         #     return handle_ar_invoice_ui_discovery(testcase_name)
@@ -31,20 +37,22 @@ def standard_mode_tool(testcase_name: str) -> str:
         #     return handle_purchase_order_ui_discovery(testcase_name)
         else:
             # Standard mode for other test cases - direct trigger
-            return execute_direct_trigger(testcase_name)
+            return await execute_direct_trigger(testcase_name)
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"❌ Network error while executing test '{testcase_name}': {str(e)}"
     except Exception as e:
         return f"❌ Error during execution of '{testcase_name}': {str(e)}"
 
-def handle_invoice_creation_ui_discovery(testcase_name: str) -> str:
+standard_mode_tool.coroutine = astandard_mode
+
+async def handle_invoice_creation_ui_discovery(testcase_name: str) -> str:
     """
     Handle the Invoice creation UI test case - Step 1: Show available suppliers
     """
     try:
         # Step 1: Get supplier list from /supplierInvoice/summary
-        supplier_resp = requests.get(f"{BASE_URL}/supplierInvoice/summary")
+        supplier_resp = await get_async_client().get(f"{BASE_URL}/supplierInvoice/summary")
         
         if supplier_resp.status_code != 200:
             return f"❌ Failed to get supplier list: {supplier_resp.text}"
@@ -96,13 +104,13 @@ Once you select a supplier, I'll update the invoice data and trigger the test ex
     except Exception as e:
         return f"❌ Error in supplier discovery process: {str(e)}"
 
-def execute_direct_trigger(testcase_name: str) -> str:
+async def execute_direct_trigger(testcase_name: str) -> str:
     """
     Execute direct test trigger for standard test cases
     """
     try:
         trigger_payload = {"test_name": testcase_name}
-        resp = requests.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
+        resp = await get_async_client().post(f"{BASE_URL}/trigger-test", json=trigger_payload)
         
         if resp.status_code != 200:
             return f"❌ Failed to trigger test '{testcase_name}': {resp.text}"
@@ -145,6 +153,10 @@ def standard_mode_with_selection_tool(command: str) -> str:
     - execute AR Invoice UI with TEST_Cons_001 (future)
     - execute Purchase Order UI with TEST_Vendor_005 (future)
     """
+    return run_sync(astandard_mode_with_selection, command)
+
+async def astandard_mode_with_selection(command: str) -> str:
+    """Async implementation of execute_standard_mode_with_selection"""
     try:
         # Parse the command
         command = command.strip()
@@ -162,7 +174,7 @@ def standard_mode_with_selection_tool(command: str) -> str:
         
         # Route to appropriate handler based on test case
         if testcase_part == "Invoice creation UI":
-            return handle_invoice_creation_execution(testcase_part, selected_entity)
+            return await handle_invoice_creation_execution(testcase_part, selected_entity)
         # Future handlers can be added here
         # elif testcase_part == "AR Invoice UI":
         #     return handle_ar_invoice_execution(testcase_part, selected_entity)
@@ -174,7 +186,9 @@ def standard_mode_with_selection_tool(command: str) -> str:
     except Exception as e:
         return f"❌ Error during standard execution with selection: {str(e)}"
 
-def handle_invoice_creation_execution(testcase_name: str, supplier_name: str) -> str:
+standard_mode_with_selection_tool.coroutine = astandard_mode_with_selection
+
+async def handle_invoice_creation_execution(testcase_name: str, supplier_name: str) -> str:
     """
     Handle Invoice creation UI execution with selected supplier
     """
@@ -191,7 +205,8 @@ def handle_invoice_creation_execution(testcase_name: str, supplier_name: str) ->
             return f"❌ Invalid supplier '{supplier_name}'. Available suppliers: {available}"
         
         # Step 1: Update supplier in invoice data
-        update_resp = requests.post(f"{BASE_URL}/updateSupplierInInvoice?Supplier={supplier_name}")
+        report_progress(f"Updating supplier '{supplier_name}' in invoice data")
+        update_resp = await get_async_client().post(f"{BASE_URL}/updateSupplierInInvoice?Supplier={supplier_name}")
         
         if update_resp.status_code != 200:
             return f"❌ Failed to update supplier '{supplier_name}': {update_resp.text}"
@@ -199,8 +214,9 @@ def handle_invoice_creation_execution(testcase_name: str, supplier_name: str) ->
         update_result = update_resp.json()
         
         # Step 2: Trigger the test after successful supplier update
+        report_progress(f"Triggering test '{testcase_name}'")
         trigger_payload = {"test_name": testcase_name}
-        trigger_resp = requests.post(f"{BASE_URL}/trigger-test", json=trigger_payload)
+        trigger_resp = await get_async_client().post(f"{BASE_URL}/trigger-test", json=trigger_payload)
         
         if trigger_resp.status_code != 200:
             return f"❌ Supplier updated successfully, but failed to trigger test: {trigger_resp.text}"
@@ -0,0 +1,129 @@
+# tools/http_client.py
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from tools.progress import report_progress
+
+# Same semantics as the old `requests` calls: no read timeout unless a call passes one
+DEFAULT_TIMEOUT = httpx.Timeout(None, connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")))
+DEFAULT_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Received chunks are handed to a worker thread (write + hash) in batches of about this size
+DOWNLOAD_WRITE_BYTES = 1024 * 1024
+# Report download progress every this many bytes
+DOWNLOAD_PROGRESS_BYTES = int(os.getenv("DOWNLOAD_PROGRESS_MB", "5")) * 1024 * 1024
+
+# One pooled client per event loop (an AsyncClient must not be shared across loops)
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Get the shared AsyncClient for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS, follow_redirects=True)
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Close the shared AsyncClient of the running event loop (app shutdown)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def run_sync(coroutine_fn, *args, **kwargs):
+    """
+    Run an async tool implementation from LangChain's sync path.
+    Uses a private event loop (and client) so it never blocks a running loop.
+    """
+    async def _runner():
+        try:
+            return await coroutine_fn(*args, **kwargs)
+        finally:
+            await close_async_client()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_runner())
+
+    # Called from inside a running loop - execute on a helper thread instead
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _runner()).result()
+
+
+async def download_to_file(method: str, url: str, dest_path: str, **request_kwargs) -> dict:
+    """
+    Stream a response body into dest_path without buffering it in memory.
+    Chunks go to a temp file in the same folder, which replaces dest_path atomically once the
+    body is complete (and matches Content-Length), so readers only ever see a whole file.
+    Returns {"status_code", "text"} for non-2xx responses (nothing is written),
+    otherwise {"status_code", "path", "bytes", "sha256"}.
+    """
+    async with get_async_client().stream(method, url, **request_kwargs) as response:
+        if not response.is_success:
+            await response.aread()
+            return {"status_code": response.status_code, "text": response.text}
+
+        folder = os.path.dirname(os.path.abspath(dest_path))
+        os.makedirs(folder, exist_ok=True)
+        name = os.path.basename(dest_path)
+        expected = response.headers.get("content-length")
+        expected = int(expected) if expected and expected.isdigit() and "content-encoding" not in response.headers else None
+
+        digest = hashlib.sha256()
+        written, next_report = 0, DOWNLOAD_PROGRESS_BYTES
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{name}.", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Disk writes and hashing run in a worker thread so the event loop keeps serving
+                pending, pending_bytes = [], 0
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    pending.append(chunk)
+                    pending_bytes += len(chunk)
+                    written += len(chunk)
+                    if pending_bytes >= DOWNLOAD_WRITE_BYTES:
+                        await asyncio.to_thread(_write_chunks, f, digest, pending)
+                        pending, pending_bytes = [], 0
+                    if written >= next_report:
+                        next_report += DOWNLOAD_PROGRESS_BYTES
+                        total = f" of {expected / 1048576:.1f}" if expected else ""
+                        report_progress(f"Downloading {name}: {written / 1048576:.1f}{total} MB",
+                                        bytes=written, total_bytes=expected)
+                await asyncio.to_thread(_write_chunks, f, digest, pending, True)
+
+            if expected is not None and written != expected:
+                raise IOError(f"Incomplete download of {name}: got {written} of {expected} bytes")
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        return {"status_code": response.status_code, "path": dest_path, "bytes": written, "sha256": digest.hexdigest()}
+
+
+def _write_chunks(f, digest, chunks, final: bool = False):
+    """Append chunks to f and the running sha256 (worker thread); the final call also fsyncs"""
+    for chunk in chunks:
+        f.write(chunk)
+        digest.update(chunk)
+    if final:
+        f.flush()
+        os.fsync(f.fileno())
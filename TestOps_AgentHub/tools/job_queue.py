@@ -0,0 +1,302 @@
+# tools/job_queue.py
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.progress import progress_listener
+
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "200"))
+
+# Jobs submitted from the current request context (lets endpoints report the job ID)
+_submitted_jobs = contextvars.ContextVar("submitted_jobs", default=None)
+# Job whose coroutine is running in the current context
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class Job:
+    """A long-running tool call executed in the background"""
+
+    def __init__(self, name: str, metadata: Optional[Dict[str, Any]] = None, key: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.metadata = metadata or {}
+        self.key = key
+        self.queued_behind = None
+        self.result_file = None
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events: List[Dict[str, Any]] = []
+        self._callbacks: List[Callable[["Job"], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def _start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def add_event(self, message: str, data: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.events.append({
+                "seq": len(self.events) + 1,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "message": message,
+                "data": data or {},
+            })
+
+    def events_after(self, seq: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.events[seq:])
+
+    def set_result_file(self, path: str):
+        """Remember the file this job produced (served by /jobs/{id}/result-file)"""
+        stat = os.stat(path)
+        with self._lock:
+            self.result_file = {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def add_done_callback(self, callback: Callable[["Job"], None]):
+        """Call callback(job) once the job has finished (immediately if it already has)"""
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the job to finish without blocking the caller's event loop; False on timeout"""
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+
+        def _wake(_job):
+            loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+
+        self.add_done_callback(_wake)
+        try:
+            await asyncio.wait_for(finished, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Job {self.id} callback error: {e}")
+
+    def to_dict(self, include_events: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            info = {
+                "id": self.id,
+                "name": self.name,
+                "status": self.status,
+                "metadata": self.metadata,
+                "key": self.key,
+                "queued_behind": self.queued_behind,
+                "result": self.result,
+                "result_file": os.path.basename(self.result_file["path"]) if self.result_file else None,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration_seconds": round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None,
+                "event_count": len(self.events),
+                "last_event": self.events[-1] if self.events else None,
+            }
+            if include_events:
+                info["events"] = list(self.events)
+            return info
+
+
+class JobManager:
+    """
+    Background job queue for long-running tools.
+    Jobs run as coroutines on a dedicated event loop thread, so they never hold an
+    API worker or the uvicorn loop; at most `max_workers` jobs run at the same time.
+    Jobs submitted with the same key (e.g. one TDM template) run one after another, in order.
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, retention: int = JOB_RETENTION):
+        self.max_workers = max_workers
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        # key -> [asyncio.Lock, jobs holding or waiting for it], and the last job submitted per key
+        self._key_locks: Dict[str, list] = {}
+        self._last_by_key: Dict[str, Job] = {}
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._thread = threading.Thread(target=self._loop.run_forever, name="job-queue", daemon=True)
+            self._thread.start()
+
+    def submit(self, name: str, coroutine_fn, *args, metadata: Optional[Dict[str, Any]] = None,
+               key: Optional[str] = None, **kwargs) -> Job:
+        """
+        Queue coroutine_fn(*args, **kwargs) and return its Job immediately.
+        Jobs sharing a key are serialized; jobs with different keys run in parallel.
+        """
+        self._ensure_loop()
+        job = Job(name, metadata, key)
+        job.add_event("Job queued")
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            if key is not None:
+                previous = self._last_by_key.get(key)
+                if previous is not None and not previous.done:
+                    job.queued_behind = previous.id
+                    job.add_event(f"Waiting for job {previous.id} on the same {key}")
+                self._last_by_key[key] = job
+
+        submitted = _submitted_jobs.get()
+        if submitted is not None:
+            submitted.append(job)
+
+        asyncio.run_coroutine_threadsafe(self._run(job, coroutine_fn, args, kwargs), self._loop)
+        return job
+
+    async def _run(self, job: Job, coroutine_fn, args, kwargs):
+        if job.key is None:
+            await self._execute(job, coroutine_fn, args, kwargs)
+            return
+
+        # Runs on the job loop only, so the key table needs no extra locking
+        entry = self._key_locks.setdefault(job.key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order - same-key jobs run in submission order
+            async with entry[0]:
+                await self._execute(job, coroutine_fn, args, kwargs)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._key_locks[job.key]
+                with self._lock:
+                    if self._last_by_key.get(job.key) is job:
+                        del self._last_by_key[job.key]
+
+    async def _execute(self, job: Job, coroutine_fn, args, kwargs):
+        async with self._semaphore:
+            job._start()
+            job.add_event("Job started")
+            token = _current_job.set(job)
+            try:
+                with progress_listener(job.add_event):
+                    result = await coroutine_fn(*args, **kwargs)
+                job.add_event("Job completed")
+                job._finish("completed", result=result)
+            except asyncio.CancelledError:
+                job.add_event("Job cancelled")
+                job._finish("cancelled", error="Job was cancelled")
+                raise
+            except Exception as e:
+                job.add_event(f"Job failed: {e}")
+                job._finish("failed", error=str(e))
+            finally:
+                _current_job.reset(token)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        finished = [job for job in self._jobs.values() if job.done]
+        excess = len(self._jobs) - self.retention
+        for job in sorted(finished, key=lambda j: j.finished_at)[:max(excess, 0)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {}
+        for job in self.list_jobs():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"max_workers": self.max_workers, "status_counts": counts}
+
+    def shutdown(self):
+        """Stop the job loop (app shutdown)"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+
+@contextmanager
+def collect_submitted_jobs():
+    """Collect the jobs submitted by tools called inside this block"""
+    jobs: List[Job] = []
+    token = _submitted_jobs.set(jobs)
+    try:
+        yield jobs
+    finally:
+        _submitted_jobs.reset(token)
+
+
+def release_submitted_job(job: Job):
+    """Stop reporting a job to the current request (it finished inline and its result is the reply)"""
+    submitted = _submitted_jobs.get()
+    if submitted is not None and job in submitted:
+        submitted.remove(job)
+
+
+def attach_result_file(path: str):
+    """Record path as the output file of the job running in this context (no-op outside jobs)"""
+    job = _current_job.get()
+    if job is not None:
+        job.set_result_file(path)
+
+
+def format_job_ack(job: Job, title: str, details: Dict[str, str]) -> str:
+    """Chat reply for a tool call that was queued as a background job"""
+    lines = "\n".join(f"{label}: {value}" for label, value in details.items())
+    status = "Queued - running in the background"
+    if job.queued_behind:
+        status = f"Queued - starts after job `{job.queued_behind}` (same {job.key})"
+    return f"""⏳ **{title}**
+
+🆔 **Job ID**: `{job.id}`
+📊 **Status**: {status}
+{lines}
+
+🔍 **Track progress**: `/jobs/{job.id}` and `/jobs/{job.id}/events`
+📥 **Result file** (if any): `/jobs/{job.id}/result-file`
+💡 The final result will be posted here when the job finishes."""
+
+
+# Global instance
+job_manager = JobManager()
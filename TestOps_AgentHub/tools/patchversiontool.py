@@ -1,11 +1,12 @@
 # tools/patchversiontool.py
 
-import requests
+import httpx
 import json
 import os
 from langchain.tools import tool
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+from tools.http_client import get_async_client, run_sync
 BASE_URL = os.getenv("HOST_BASE_URL")
 
 # Global cache for patch versions and user selection state
@@ -18,6 +19,10 @@ def patch_version_tool(query: str) -> str:
     PATCH VERSION REPORT GENERATOR
     Handles patch report generation with version selection
     """
+    return run_sync(apatch_version, query)
+
+async def apatch_version(query: str) -> str:
+    """Async implementation of patch_version_generator"""
     try:
         # Load patch versions from JSON
         json_file_path = os.path.join(os.getcwd(), "test-data-source.json")
@@ -88,7 +93,7 @@ Please specify the version after 'version' keyword.
 **Usage**: `execute patch report version [VALID_VERSION]`"""
             
             # Generate the patch report
-            return generate_patch_report(requested_version)
+            return await generate_patch_report(requested_version)
         
         # If no version keyword found, show available versions
         return f"""📊 **PATCH VERSION REPORT GENERATOR**
@@ -107,13 +112,15 @@ Use command: `execute patch report version [VERSION]`"""
     except Exception as e:
         return f"❌ Error in patch version tool: {str(e)}"
 
-def generate_patch_report(version: str) -> str:
+patch_version_tool.coroutine = apatch_version
+
+async def generate_patch_report(version: str) -> str:
     """
     Generate patch report for the specified version
     """
     try:
         # Call the API endpoint
-        resp = requests.get(f"{BASE_URL}/run-patchreport/{version}")
+        resp = await get_async_client().get(f"{BASE_URL}/run-patchreport/{version}")
         
         if resp.status_code == 200:
             # Your API is working, so any 200 response means success
@@ -141,7 +148,7 @@ def generate_patch_report(version: str) -> str:
 
 Please verify the version and try again."""
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return f"❌ Network error while generating patch report for version {version}: {str(e)}"
     except Exception as e:
         return f"❌ Error generating patch report for version {version}: {str(e)}"
@@ -0,0 +1,26 @@
+# tools/progress.py
+
+import contextvars
+from contextlib import contextmanager
+
+# Callbacks interested in progress of the code running in the current context
+_listeners = contextvars.ContextVar("progress_listeners", default=())
+
+
+def report_progress(message: str, **data):
+    """Report a progress step (heal iteration, upload, batch...) to whoever is listening"""
+    for listener in _listeners.get():
+        try:
+            listener(message, data)
+        except Exception as e:
+            print(f"Progress listener error: {e}")
+
+
+@contextmanager
+def progress_listener(callback):
+    """Receive report_progress() calls made inside this block as callback(message, data)"""
+    token = _listeners.set(_listeners.get() + (callback,))
+    try:
+        yield
+    finally:
+        _listeners.reset(token)
@@ -0,0 +1,154 @@
+# tools/sheet_query.py
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DISTINCT_LIMIT = 100
+FILTER_OPS = ("eq", "ne", "contains", "not_contains", "starts_with", "gt", "gte", "lt", "lte", "in", "empty", "not_empty")
+AGGREGATES = ("count", "min", "max", "sum")
+
+def scalar(value: Any) -> Any:
+    """numpy/pandas scalar -> plain JSON-friendly Python value"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+        return None if isinstance(value, float) and np.isnan(value) else value
+    return value
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.astype("string").fillna("")
+
+def _typed_value(series: pd.Series, value: Any) -> Any:
+    """Coerce a filter value to the column's type so comparisons are numeric/chronological"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(value)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return float(value)
+    return str(value)
+
+def _sort_key(series: pd.Series) -> pd.Series:
+    """Order mixed object columns by (type rank, value): numbers first, then the text form of everything else"""
+    if series.dtype != object:
+        return series
+    return series.map(
+        lambda v: None if pd.isna(v) else (0, float(v)) if isinstance(v, (int, float, np.number)) else (1, str(v)),
+        na_action="ignore",
+    )
+
+def filter_mask(df: pd.DataFrame, column: str, op: str, value: Any = None) -> pd.Series:
+    """Vectorized boolean mask for one column filter"""
+    if column not in df.columns:
+        raise KeyError(f"Columns not found: {column}")
+    if op not in FILTER_OPS:
+        raise ValueError(f"Unknown filter op '{op}' (expected one of {', '.join(FILTER_OPS)})")
+    series = df[column]
+
+    if op == "empty":
+        return series.isna() | (_text(series).str.strip() == "")
+    if op == "not_empty":
+        return ~(series.isna() | (_text(series).str.strip() == ""))
+    if op in ("contains", "not_contains"):
+        mask = _text(series).str.contains(str(value), case=False, regex=False)
+        return ~mask if op == "not_contains" else mask
+    if op == "starts_with":
+        return _text(series).str.lower().str.startswith(str(value).lower())
+    if op == "in":
+        values = value if isinstance(value, list) else [value]
+        return _text(series).isin([str(v) for v in values])
+
+    try:
+        typed = _typed_value(series, value)
+    except (TypeError, ValueError):
+        typed = str(value)
+    target = _text(series) if isinstance(typed, str) else series
+
+    if op == "eq":
+        result = target == typed
+    elif op == "ne":
+        result = target != typed
+    elif op == "gt":
+        result = target > typed
+    elif op == "gte":
+        result = target >= typed
+    elif op == "lt":
+        result = target < typed
+    else:
+        result = target <= typed
+    return result.fillna(op == "ne").astype(bool)
+
+def search_mask(df: pd.DataFrame, term: str) -> pd.Series:
+    """Rows where any column contains term (case insensitive)"""
+    mask = pd.Series(False, index=df.index)
+    for column in df.columns:
+        mask |= _text(df[column]).str.contains(term, case=False, regex=False)
+    return mask
+
+def aggregate(series: pd.Series, functions: List[str]) -> Dict[str, Any]:
+    result = {}
+    numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    for function in functions:
+        if function not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{function}' (expected one of {', '.join(AGGREGATES)})")
+        if function == "count":
+            result["count"] = int(series.notna().sum())
+        elif function == "sum":
+            result["sum"] = scalar(series.sum()) if numeric else None
+        else:
+            values = series.dropna()
+            if not numeric and not pd.api.types.is_datetime64_any_dtype(series):
+                values = values.astype(str)
+            result[function] = scalar(getattr(values, function)()) if len(values) else None
+    return result
+
+def distinct_values(series: pd.Series, limit: int = DISTINCT_LIMIT) -> Dict[str, Any]:
+    counts = series.dropna().value_counts()
+    return {
+        "total": int(len(counts)),
+        "values": [{"value": scalar(value), "count": int(count)} for value, count in counts.head(limit).items()],
+    }
+
+def run_query(df: pd.DataFrame, filters: Optional[List[Dict[str, Any]]] = None, search: Optional[str] = None,
+              sort: Optional[List[Dict[str, Any]]] = None, columns: Optional[List[str]] = None,
+              distinct: Optional[List[str]] = None, aggregates: Optional[Dict[str, List[str]]] = None,
+              offset: int = 0, limit: Optional[int] = 100) -> Dict[str, Any]:
+    """
+    Filter, sort, aggregate and page a sheet with vectorized pandas operations.
+    Raises KeyError for unknown columns and ValueError for bad ops.
+    """
+    missing = [c for c in (columns or []) + (distinct or []) + list(aggregates or {}) + [s.get("column") for s in sort or []]
+               if c not in df.columns]
+    if missing:
+        raise KeyError(f"Columns not found: {', '.join(map(str, missing))}")
+
+    mask = pd.Series(True, index=df.index)
+    for condition in filters or []:
+        mask &= filter_mask(df, condition.get("column"), condition.get("op", "eq"), condition.get("value"))
+    if search:
+        mask &= search_mask(df, search)
+    matched = df[mask]
+
+    if sort:
+        matched = matched.sort_values(
+            by=[s["column"] for s in sort],
+            ascending=[str(s.get("direction", "asc")).lower() != "desc" for s in sort],
+            na_position="last",
+            kind="stable",
+            key=_sort_key,
+        )
+
+    page = matched.iloc[offset:] if limit is None else matched.iloc[offset:offset + limit]
+    if columns:
+        page = page[columns]
+
+    return {
+        "columns": list(page.columns),
+        "page": page,
+        "matched_rows": int(len(matched)),
+        "distinct": {column: distinct_values(matched[column]) for column in distinct or []},
+        "aggregates": {column: aggregate(matched[column], functions) for column, functions in (aggregates or {}).items()},
+    }
@@ -0,0 +1,256 @@
+# tools/tdm_rules.py
+
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from tools.tdm_store import tdm_store
+from tools.workbook_cache import load_sheet_frame, make_column_names, read_sheet_names
+
+# Clauses are split on ";", new lines and on "and"/"," when a new "<field> should|must" follows
+# (so "between 1000 and 5000" stays one clause)
+CLAUSE_SEPARATOR = re.compile(r"\s*(?:;|\n|,?\s+and\s+|,\s+)(?=\s*(?:(?!\band\b)[\w\-. ])+?\s+(?:should|must)\b)", re.IGNORECASE)
+# "should start with Test and end with X" - a second predicate for the same field
+PREDICATE_SEPARATOR = re.compile(r",?\s+and\s+(?=(?:start|begin|end|have|be)s?\s)", re.IGNORECASE)
+CLAUSE = re.compile(r"^(?P<field>.+?)\s+(?:should|must)\s+(?P<predicate>.+?)[.!]?$", re.IGNORECASE)
+NUMBER = r"-?\d[\d,]*(?:\.\d+)?"
+DATE = r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{4}"
+
+PREDICATES = [
+    ("prefix", re.compile(r"^(?:start|begin)s?\s+with\s+(?P<value>.+)$|^(?:have\s+(?:the\s+|a\s+)?prefix|be\s+prefixed\s+with)\s+(?P<value2>.+)$", re.IGNORECASE)),
+    ("suffix", re.compile(r"^ends?\s+with\s+(?P<value>.+)$|^(?:have\s+(?:the\s+|a\s+)?suffix|be\s+suffixed\s+with)\s+(?P<value2>.+)$", re.IGNORECASE)),
+    ("range", re.compile(rf"^be\s+(?:between|from|in\s+(?:the\s+)?range(?:\s+of)?)\s+(?P<low>{NUMBER})\s*(?:-|to|and)\s*(?P<high>{NUMBER})$", re.IGNORECASE)),
+    ("date_window", re.compile(rf"^be\s+(?:a\s+date\s+|dates\s+)?(?:between|from)\s+(?P<start>{DATE})\s+(?:and|to|-)\s+(?P<end>{DATE})$", re.IGNORECASE)),
+    ("date_recent", re.compile(r"^be\s+(?:within|in|from)\s+(?:the\s+)?(?:last|past)\s+(?P<count>\d+)\s+(?P<unit>day|week|month|year)s?$|^be\s+(?P<recent>recent)(?:\s+dates?)?$", re.IGNORECASE)),
+    ("unique", re.compile(r"^be\s+unique$", re.IGNORECASE)),
+    ("sequence", re.compile(r"^be\s+(?:sequential|a\s+sequence|incremental|auto[- ]?incremented)(?:\s+(?:starting\s+)?(?:from|at)\s+(?P<start>\S+))?(?:\s+(?:by|with\s+step|step)\s+(?P<step>\d+))?$", re.IGNORECASE)),
+    ("enum", re.compile(r"^be\s+(?:one\s+of|either|in)\s+(?P<values>.+)$", re.IGNORECASE)),
+]
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+RECENT_DAYS = 30
+
+
+def _clean(value: str) -> str:
+    return value.strip().strip("'\"`").strip()
+
+
+def _normalize_field(name: str) -> str:
+    """'the Invoice_ID field' -> 'invoiceid' (compared with normalized column names)"""
+    name = re.sub(r"^(?:the|all)\s+", "", str(name).strip(), flags=re.IGNORECASE)
+    name = re.sub(r"\s+(?:field|column|values?)$", "", name, flags=re.IGNORECASE)
+    return re.sub(r"[\W_]+", "", name.lower())
+
+
+def _parse_date(value: str) -> pd.Timestamp:
+    return pd.Timestamp(datetime.strptime(value, "%m/%d/%Y") if "/" in value else value)
+
+
+def _parse_predicate(predicate: str) -> Optional[Dict[str, Any]]:
+    for rule_type, pattern in PREDICATES:
+        match = pattern.match(predicate.strip())
+        if not match:
+            continue
+        groups = match.groupdict()
+        if rule_type in ("prefix", "suffix"):
+            return {"type": rule_type, "value": _clean(groups["value"] or groups["value2"])}
+        if rule_type == "range":
+            low, high = (float(groups[g].replace(",", "")) for g in ("low", "high"))
+            decimals = max(len(groups[g].partition(".")[2]) for g in ("low", "high"))
+            return {"type": "range", "low": min(low, high), "high": max(low, high), "decimals": decimals}
+        if rule_type == "date_window":
+            start, end = sorted((_parse_date(groups["start"]), _parse_date(groups["end"])))
+            return {"type": "date_window", "start": start, "end": end}
+        if rule_type == "date_recent":
+            days = RECENT_DAYS if groups["recent"] else int(groups["count"]) * UNIT_DAYS[groups["unit"].lower()]
+            end = pd.Timestamp(datetime.now().date())
+            return {"type": "date_window", "start": end - timedelta(days=days), "end": end}
+        if rule_type == "unique":
+            return {"type": "unique"}
+        if rule_type == "sequence":
+            return {"type": "sequence", "start": _clean(groups["start"] or "1"), "step": int(groups["step"] or 1)}
+        if rule_type == "enum":
+            values = [_clean(v) for v in re.split(r",|/|\bor\b", groups["values"].strip("[]() "))]
+            values = [v for v in values if v]
+            return {"type": "enum", "values": values} if len(values) > 1 else None
+    return None
+
+
+def parse_rules(feedback_text: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Field rules from edit feedback ("Invoice ID should start with ABC; Amount should be between 1000-5000").
+    A clause may chain predicates for its field ("should start with A and end with B").
+    Every clause has to be understood - otherwise None, and the edit goes to the TDM service.
+    """
+    rules = []
+    for clause in CLAUSE_SEPARATOR.split(feedback_text.strip()):
+        match = CLAUSE.match(clause.strip())
+        if not match:
+            return None
+        for predicate in PREDICATE_SEPARATOR.split(match.group("predicate")):
+            rule = _parse_predicate(predicate)
+            if rule is None:
+                return None
+            rule["field"] = match.group("field").strip()
+            rules.append(rule)
+    return rules or None
+
+
+def _apply_rule(series: pd.Series, rule: Dict[str, Any], rng: np.random.Generator) -> pd.Series:
+    """New values for one column; rows that already satisfy the rule are left as they are"""
+    rule_type = rule["type"]
+
+    if rule_type in ("prefix", "suffix"):
+        text = series.astype("string")
+        value = rule["value"]
+        ok = text.str.startswith(value) if rule_type == "prefix" else text.str.endswith(value)
+        fix = text.notna() & (text.str.strip() != "") & ~ok.fillna(False).astype(bool)
+        result = series.astype(object)
+        result[fix] = (value + text[fix]) if rule_type == "prefix" else (text[fix] + value)
+        return result
+
+    if rule_type == "range":
+        numbers = pd.to_numeric(series, errors="coerce").astype("Float64")
+        fix = (numbers.isna() | (numbers < rule["low"]) | (numbers > rule["high"])).fillna(True).astype(bool)
+        count = int(fix.sum())
+        if rule["decimals"] == 0:
+            draws = rng.integers(int(rule["low"]), int(rule["high"]) + 1, size=count)
+            numbers = numbers.astype("Int64") if numbers.dropna().mod(1).eq(0).all() else numbers
+        else:
+            draws = np.round(rng.uniform(rule["low"], rule["high"], size=count), rule["decimals"])
+        numbers[fix] = draws
+        return numbers
+
+    if rule_type == "date_window":
+        dates = pd.to_datetime(series, errors="coerce").copy()
+        fix = (dates.isna() | (dates < rule["start"]) | (dates > rule["end"])).astype(bool)
+        span = (rule["end"] - rule["start"]).days
+        dates[fix] = rule["start"] + pd.to_timedelta(rng.integers(0, span + 1, size=int(fix.sum())), unit="D")
+        return dates
+
+    if rule_type == "unique":
+        result = series.copy()
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            duplicated = result.duplicated(keep="first") & result.notna()
+            start = (result.max() if result.notna().any() else 0) + 1
+            result[duplicated] = np.arange(start, start + int(duplicated.sum()))
+            return result
+        result = result.astype("string")
+        for _ in range(3):
+            duplicated = result.duplicated(keep="first") & result.notna() & (result != "")
+            if not duplicated.any():
+                break
+            ordinal = result[duplicated].groupby(result[duplicated]).cumcount() + 2
+            result[duplicated] = result[duplicated] + "-" + ordinal.astype(str)
+        return result
+
+    if rule_type == "enum":
+        values = rule["values"]
+        fix = ~series.astype("string").fillna("").isin(values)
+        result = series.astype(object)
+        result[fix] = rng.choice(values, size=int(fix.sum()))
+        return result
+
+    # sequence: "1", "1000" or "INV0001" (prefix + zero padded number)
+    match = re.match(r"^(?P<prefix>.*?)(?P<digits>\d+)$", rule["start"])
+    if not match:
+        raise ValueError(f"Cannot start a sequence at '{rule['start']}'")
+    numbers = np.arange(len(series)) * rule["step"] + int(match.group("digits"))
+    if not match.group("prefix") and not match.group("digits").startswith("0"):
+        return pd.Series(numbers, index=series.index, dtype="Int64")
+    width = len(match.group("digits"))
+    return match.group("prefix") + pd.Series(numbers, index=series.index).astype(str).str.zfill(width)
+
+
+def _changed(before: pd.Series, after: pd.Series) -> int:
+    before, after = before.astype(object), after.astype(object)
+    both_missing = before.isna() & after.isna()
+    return int((~both_missing & (before.isna() | after.isna() | (before != after))).sum())
+
+
+def _cell_value(value: Any) -> Any:
+    """Rule output -> value openpyxl can store (None for blanks, Python scalars, datetime)"""
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def apply_rules(template_name: str, rules: List[Dict[str, Any]], seed: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Apply parsed rules to every sheet of the template's workbook that has the rule's column and
+    commit the result as a new version. New values are computed with vectorized pandas/NumPy
+    operations on the targeted columns only (read from the columnar sidecar); then just the cells
+    that changed are written into the original workbook, so every other cell, style, number format
+    and validation is kept as it was.
+    Returns None when a rule's field is not a column of any sheet or a targeted cell holds a formula
+    (let the TDM service handle it).
+    """
+    path = tdm_store.workbook_path(template_name)
+    frames = {name: load_sheet_frame(path, name) for name in read_sheet_names(path)}
+
+    targets = []
+    for rule in rules:
+        field = _normalize_field(rule["field"])
+        matches = [(sheetname, column) for sheetname, df in frames.items()
+                   for column in df.columns if _normalize_field(column) == field]
+        if not matches:
+            return None
+        targets.append((rule, matches))
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    columns = {}
+    applied = []
+    for rule, matches in targets:
+        changed = 0
+        for sheetname, column in matches:
+            before = columns.get((sheetname, column), frames[sheetname][column])
+            after = _apply_rule(before, rule, rng)
+            columns[(sheetname, column)] = after
+            changed += _changed(before, after)
+        applied.append({"field": rule["field"], "type": rule["type"],
+                        "columns": [f"{s}.{c}" for s, c in matches], "changed_cells": changed})
+    edit_ms = round((time.perf_counter() - started) * 1000)
+
+    workbook = load_workbook(path)
+    try:
+        updates = []
+        for (sheetname, column), after in columns.items():
+            sheet = workbook[sheetname]
+            header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            column_number = make_column_names(header).index(column) + 1
+            before = frames[sheetname][column].astype(object)
+            after = after.astype(object)
+            changed = ~(before.isna() & after.isna()) & (before.isna() | after.isna() | (before != after))
+            for position in np.flatnonzero(changed.to_numpy(dtype=bool)):
+                cell = sheet.cell(row=int(position) + 2, column=column_number)
+                if cell.data_type == "f":
+                    return None
+                updates.append((cell, _cell_value(after.iloc[position])))
+
+        for cell, value in updates:
+            cell.value = value
+            if isinstance(value, datetime) and cell.number_format == "General":
+                cell.number_format = "yyyy-mm-dd"
+        staging_path = tdm_store.staging_path(template_name)
+        workbook.save(staging_path)
+    finally:
+        workbook.close()
+    commit = tdm_store.commit(template_name, staging_path, "local rules")
+
+    return {
+        "rules": applied,
+        "changed_cells": sum(rule["changed_cells"] for rule in applied),
+        "rows": {sheetname: len(df) for sheetname, df in frames.items()},
+        "edit_ms": edit_ms,
+        "total_ms": round((time.perf_counter() - started) * 1000),
+        "store": commit,
+    }
@@ -0,0 +1,264 @@
+# tools/tdm_store.py
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+TDM_FOLDER = "TDM_files"
+# Versions kept per template (older ones are dropped and their objects garbage collected)
+TDM_STORE_HISTORY = int(os.getenv("TDM_STORE_HISTORY", "20"))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TdmStore:
+    """
+    Versioned, content-addressed store for TDM workbooks.
+    Every generated or edited workbook is saved once under its sha256 in .store/objects;
+    .store/manifest.json maps each template to its current version and history.
+    TDM_files/<template>.xlsx stays the file everyone reads: it is a hard link to the current
+    object (a copy where links are not supported), swapped in with an atomic rename, so
+    identical outputs cost no extra disk, rollbacks are a link + rename, and readers never
+    see a half-written workbook.
+    """
+
+    def __init__(self, folder: str = TDM_FOLDER, history: int = TDM_STORE_HISTORY):
+        self.folder = folder
+        self.history = history
+        self.store_dir = os.path.join(folder, ".store")
+        self.manifest_path = os.path.join(self.store_dir, "manifest.json")
+        self._lock = threading.Lock()
+
+    def _object_path(self, sha: str) -> str:
+        return os.path.join(self.store_dir, "objects", sha[:2], f"{sha}.xlsx")
+
+    def workbook_path(self, template_name: str) -> str:
+        return os.path.join(self.folder, f"{template_name}.xlsx")
+
+    def staging_path(self, template_name: str) -> str:
+        """Temp path to write a new version to before commit()"""
+        staging_dir = os.path.join(self.store_dir, "staging")
+        os.makedirs(staging_dir, exist_ok=True)
+        return os.path.join(staging_dir, f"{template_name}.{uuid.uuid4().hex[:12]}.xlsx")
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"templates": {}}
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _store_object(self, src_path: str, sha: str, move: bool) -> bool:
+        """Put a file under its hash; False if an identical object already existed"""
+        object_path = self._object_path(sha)
+        if os.path.exists(object_path):
+            if move:
+                os.remove(src_path)
+            return False
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        if move:
+            os.replace(src_path, object_path)
+        else:
+            tmp_path = f"{object_path}.{uuid.uuid4().hex[:8]}.tmp"
+            self._link_or_copy(src_path, tmp_path)
+            os.replace(tmp_path, object_path)
+        return True
+
+    @staticmethod
+    def _link_or_copy(src_path: str, dest_path: str):
+        try:
+            os.link(src_path, dest_path)
+        except OSError:
+            shutil.copyfile(src_path, dest_path)
+
+    def _checkout(self, template_name: str, sha: str):
+        """Point TDM_files/<template>.xlsx at an object (atomic rename)"""
+        target = self.workbook_path(template_name)
+        tmp_path = os.path.join(self.folder, f".{template_name}.{uuid.uuid4().hex[:8]}.checkout")
+        self._link_or_copy(self._object_path(sha), tmp_path)
+        os.replace(tmp_path, target)
+
+    def _adopt(self, manifest: Dict[str, Any], template_name: str) -> bool:
+        """
+        Record the working file as a version if the store has not seen it - a workbook that
+        predates the store, or one replaced outside it (manual upload, copied in by hand).
+        """
+        path = self.workbook_path(template_name)
+        if not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        entry = manifest["templates"].get(template_name)
+        if entry and entry["current"]:
+            object_path = self._object_path(entry["current"])
+            linked = os.path.exists(object_path) and os.path.samefile(path, object_path)
+            if linked and stat.st_mtime_ns == entry.get("mtime_ns"):
+                return False
+            sha = file_sha256(path)
+            if sha == entry["current"]:
+                return False
+            if linked:
+                # Written in place through the hard link - the stored object no longer matches its hash
+                os.remove(object_path)
+                entry["versions"] = [v for v in entry["versions"] if v["sha"] != entry["current"]]
+        else:
+            sha = file_sha256(path)
+
+        self._store_object(path, sha, move=False)
+        entry = manifest["templates"].setdefault(template_name, {"current": None, "versions": []})
+        entry["versions"] = [v for v in entry["versions"] if v["sha"] != sha]
+        entry["versions"].append({"sha": sha, "bytes": stat.st_size,
+                                  "source": "external change" if entry["current"] else "existing file",
+                                  "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds")})
+        entry["current"] = sha
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def commit(self, template_name: str, src_path: str, source: str = "") -> Dict[str, Any]:
+        """
+        Make src_path (moved into the store) the template's current version.
+        Returns {"sha", "path", "previous", "deduplicated", "unchanged"}: previous is the version it
+        replaced, deduplicated means an identical object was already stored, unchanged means it
+        already was the current version.
+        """
+        sha = file_sha256(src_path)
+        size = os.path.getsize(src_path)
+        with self._lock:
+            manifest = self._load_manifest()
+            self._adopt(manifest, template_name)
+            created = self._store_object(src_path, sha, move=True)
+
+            entry = manifest["templates"].setdefault(template_name, {"current": None, "versions": []})
+            previous = entry["current"]
+            unchanged = previous == sha
+            if not unchanged:
+                entry["versions"] = [v for v in entry["versions"] if v["sha"] != sha]
+                entry["versions"].append({"sha": sha, "bytes": size, "source": source,
+                                          "created_at": datetime.now().isoformat(timespec="seconds")})
+                entry["current"] = sha
+                entry["mtime_ns"] = os.stat(self._object_path(sha)).st_mtime_ns
+                dropped = entry["versions"][:-self.history]
+                entry["versions"] = entry["versions"][-self.history:]
+            else:
+                dropped = []
+            self._checkout(template_name, sha)
+            self._save_manifest(manifest)
+            self._collect(manifest, dropped)
+        self.clean_staging()
+
+        return {"sha": sha, "path": self.workbook_path(template_name), "previous": previous,
+                "deduplicated": not created, "unchanged": unchanged}
+
+    def _collect(self, manifest: Dict[str, Any], dropped: List[Dict[str, Any]]):
+        """Delete objects no template version refers to any more"""
+        referenced = {v["sha"] for entry in manifest["templates"].values() for v in entry["versions"]}
+        for version in dropped:
+            if version["sha"] not in referenced:
+                try:
+                    os.remove(self._object_path(version["sha"]))
+                except OSError:
+                    pass
+
+    def versions(self, template_name: str) -> Optional[Dict[str, Any]]:
+        """{"current", "versions": [newest first, each with "current" flag]} or None if untracked"""
+        with self._lock:
+            manifest = self._load_manifest()
+            if self._adopt(manifest, template_name):
+                self._save_manifest(manifest)
+        entry = manifest["templates"].get(template_name)
+        if entry is None:
+            return None
+        return {
+            "template": template_name,
+            "current": entry["current"],
+            "versions": [{**v, "current": v["sha"] == entry["current"]} for v in reversed(entry["versions"])],
+        }
+
+    @staticmethod
+    def _find_version(template_name: str, entry: Optional[Dict[str, Any]], version: str) -> str:
+        """sha for "current", "previous" (the version before the current one) or a sha prefix"""
+        if entry is None:
+            raise KeyError(f"Template '{template_name}' has no versions")
+        shas = [v["sha"] for v in entry["versions"]]
+        if version == "current" and entry["current"]:
+            return entry["current"]
+        if version == "previous":
+            position = shas.index(entry["current"]) if entry["current"] in shas else len(shas)
+            if position == 0:
+                raise KeyError(f"'{template_name}' has no version before the current one")
+            return shas[position - 1]
+        matches = [sha for sha in shas if sha.startswith(version)]
+        if len(matches) != 1:
+            raise KeyError(f"Version '{version}' {'is ambiguous' if matches else 'not found'} for '{template_name}'")
+        return matches[0]
+
+    def version_path(self, template_name: str, version: str = "current") -> Tuple[str, str]:
+        """(sha, stored object path) of a version - see _find_version. Raises KeyError when unknown."""
+        with self._lock:
+            manifest = self._load_manifest()
+            if self._adopt(manifest, template_name):
+                self._save_manifest(manifest)
+        sha = self._find_version(template_name, manifest["templates"].get(template_name), version)
+        return sha, self._object_path(sha)
+
+    def rollback(self, template_name: str, version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Make an earlier version current - the one before the current version, or the version whose
+        sha starts with `version`. Raises KeyError for unknown templates/versions.
+        """
+        with self._lock:
+            manifest = self._load_manifest()
+            self._adopt(manifest, template_name)
+            entry = manifest["templates"].get(template_name)
+            target = self._find_version(template_name, entry, version or "previous")
+
+            # Objects are shared with the working file through hard links - make sure nobody wrote into it
+            if file_sha256(self._object_path(target)) != target:
+                raise ValueError(f"Stored version {target[:12]} of '{template_name}' is corrupted")
+            self._checkout(template_name, target)
+            entry["current"] = target
+            entry["mtime_ns"] = os.stat(self._object_path(target)).st_mtime_ns
+            self._save_manifest(manifest)
+
+        return {"sha": target, "path": self.workbook_path(template_name)}
+
+    def current_path(self, template_name: str) -> Optional[str]:
+        """TDM_files/<template>.xlsx if the store tracks the template, else None"""
+        entry = self._load_manifest()["templates"].get(template_name)
+        return self.workbook_path(template_name) if entry and entry["current"] else None
+
+    def clean_staging(self, max_age: float = 3600):
+        """Remove staging files left behind by interrupted writes"""
+        staging_dir = os.path.join(self.store_dir, "staging")
+        if not os.path.isdir(staging_dir):
+            return
+        cutoff = time.time() - max_age
+        for name in os.listdir(staging_dir):
+            path = os.path.join(staging_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+# Global instance
+tdm_store = TdmStore()
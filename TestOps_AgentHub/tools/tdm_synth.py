@@ -0,0 +1,311 @@
+# tools/tdm_synth.py
+
+import json
+import os
+import datetime
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # optional - CSV output falls back to pandas
+    pa = pa_csv = None
+
+from tools.tdm_store import tdm_store
+from tools.workbook_cache import load_sheet_frame, read_sheet_names, sheet_cache
+from tools.workbook_merge import write_workbook
+
+TDM_FOLDER = "TDM_files"
+SCHEMA_DIR = os.path.join(TDM_FOLDER, ".schemas")
+SYNTH_CSV_DIR = os.path.join(TDM_FOLDER, "synthetic")
+# Columns with at most this many distinct values (or this share of rows) are drawn as categories
+CATEGORICAL_MAX_VALUES = 50
+CATEGORICAL_MAX_RATIO = 0.05
+# Sheets this small that are not the main sheet are copied as-is (lookups, instructions)
+LOOKUP_MAX_ROWS = 20
+# Rows profiled per column (uniqueness and foreign keys always use the whole column)
+PROFILE_SAMPLE_ROWS = 100000
+XLSX_MAX_ROWS = 1048575
+PATTERN = re.compile(r"^(?P<prefix>\D*?)(?P<digits>\d+)(?P<suffix>\D*)$")
+SAFE_FILENAME = re.compile(r"[^\w.-]+")
+# Bumped when learn_schema changes; cached schemas of another version are relearned
+SCHEMA_VERSION = 2
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def _profile_column(series: pd.Series) -> Dict[str, Any]:
+    """Type, format, cardinality and key-ness of one column"""
+    values = series.dropna()
+    if pd.api.types.is_string_dtype(series) or series.dtype == object:
+        values = values[values.astype(str).str.strip() != ""]
+    profile = {"null_rate": round(1 - len(values) / len(series), 4) if len(series) else 0.0,
+               "unique": bool(len(values) == len(series) and values.is_unique)}
+    if values.empty:
+        return {**profile, "kind": "empty"}
+
+    sample = values.iloc[:PROFILE_SAMPLE_ROWS]
+    if pd.api.types.is_bool_dtype(series):
+        return {**profile, **_categorical(sample)}
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        has_time = bool((sample != sample.dt.normalize()).any())
+        return {**profile, "kind": "date_range", "min": values.min().isoformat(), "max": values.max().isoformat(),
+                "has_time": has_time}
+
+    if pd.api.types.is_numeric_dtype(series):
+        numbers = sample.astype("float64")
+        integral = bool((numbers % 1 == 0).all())
+        if integral and profile["unique"] and len(values) > 1:
+            steps = np.diff(values.astype("int64").to_numpy())
+            if (steps == steps[0]).all() and steps[0] != 0:
+                return {**profile, "kind": "sequence", "start": int(values.iloc[0]), "step": int(steps[0])}
+        if values.nunique() <= min(CATEGORICAL_MAX_VALUES, max(2, int(len(values) * CATEGORICAL_MAX_RATIO))) and not profile["unique"]:
+            return {**profile, **_categorical(sample)}
+        decimals = 0 if integral else int(min(6, numbers.map(lambda v: len(repr(v).partition(".")[2])).max()))
+        return {**profile, "kind": "number_range", "min": float(values.min()), "max": float(values.max()),
+                "decimals": decimals}
+
+    text = sample.astype(str)
+    parts = text.str.extract(PATTERN)
+    if parts["digits"].notna().all() and parts["prefix"].nunique() == 1 and parts["suffix"].nunique() == 1:
+        numbers = values.astype(str).str.extract(PATTERN)["digits"].astype("int64")
+        return {**profile, "kind": "pattern", "prefix": parts["prefix"].iloc[0], "suffix": parts["suffix"].iloc[0],
+                "width": int(parts["digits"].str.len().min()), "min": int(numbers.min()), "max": int(numbers.max())}
+    if not profile["unique"] and text.nunique() <= max(CATEGORICAL_MAX_VALUES, int(len(text) * CATEGORICAL_MAX_RATIO)):
+        return {**profile, **_categorical(sample)}
+    return {**profile, "kind": "text", "samples": [str(v) for v in text.drop_duplicates().iloc[:1000]]}
+
+
+def _categorical(sample: pd.Series) -> Dict[str, Any]:
+    counts = sample.value_counts(normalize=True)
+    return {"kind": "categorical", "values": [_json_value(v) for v in counts.index],
+            "weights": [round(float(w), 6) for w in counts.to_numpy()]}
+
+
+def learn_schema(path: str) -> Dict[str, Any]:
+    """
+    Column schemas of a TDM workbook: per column kind (sequence, pattern, number/date range,
+    categorical, text), null rate and uniqueness; plus foreign keys - columns whose values all
+    appear in a unique column of another sheet. Small sheets are lookups (copied as-is) unless
+    they are parents: referenced by a foreign key or keyed by a sequence/pattern column.
+    """
+    sheets = {name: load_sheet_frame(path, name) for name in read_sheet_names(path)}
+    main_rows = max((len(df) for df in sheets.values()), default=0)
+    schema = {"version": SCHEMA_VERSION, "source": os.path.basename(path), "sheets": {}}
+
+    for sheetname, df in sheets.items():
+        schema["sheets"][sheetname] = {
+            "rows": len(df),
+            "columns": {str(column): _profile_column(df[column]) for column in df.columns},
+        }
+
+    # Foreign keys: non-unique columns whose values are a subset of another sheet's unique column
+    keys = [(sheetname, column) for sheetname, sheet in schema["sheets"].items()
+            for column, profile in sheet["columns"].items() if profile["unique"]]
+    referenced = set()
+    for sheetname, df in sheets.items():
+        for column, profile in schema["sheets"][sheetname]["columns"].items():
+            if profile["unique"] or profile["kind"] == "empty":
+                continue
+            values = df[column].dropna()
+            for parent_sheet, parent_column in keys:
+                if parent_sheet == sheetname:
+                    continue
+                if values.isin(sheets[parent_sheet][parent_column]).all():
+                    profile["foreign_key"] = {"sheet": parent_sheet, "column": parent_column}
+                    referenced.add(parent_sheet)
+                    break
+
+    for sheetname, df in sheets.items():
+        sheet = schema["sheets"][sheetname]
+        keyed = any(profile["unique"] and profile["kind"] in ("sequence", "pattern")
+                    for profile in sheet["columns"].values())
+        sheet["lookup"] = (len(df) <= LOOKUP_MAX_ROWS and len(df) < main_rows
+                           and sheetname not in referenced and not keyed)
+        if sheet["lookup"]:
+            copy = df.astype(object).where(df.notna(), None)
+            sheet["data"] = [[_json_value(v) for v in row] for row in copy.itertuples(index=False, name=None)]
+    return schema
+
+
+def get_schema(template_name: str, refresh: bool = False) -> Dict[str, Any]:
+    """Learned schema of a template's workbook, cached in TDM_files/.schemas"""
+    path = os.path.join(TDM_FOLDER, f"{template_name}.xlsx")
+    schema_path = os.path.join(SCHEMA_DIR, f"{template_name}.json")
+    digest = sheet_cache.content_hash(path)
+
+    if not refresh and os.path.exists(schema_path):
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        # Still valid for the workbook it was learned from, or one this engine wrote from it
+        if schema.get("version") == SCHEMA_VERSION and digest in (schema.get("source_hash"), schema.get("generated_hash")):
+            return schema
+
+    schema = learn_schema(path)
+    schema["source_hash"] = digest
+    _save_schema(template_name, schema)
+    return schema
+
+
+def _save_schema(template_name: str, schema: Dict[str, Any]):
+    os.makedirs(SCHEMA_DIR, exist_ok=True)
+    schema_path = os.path.join(SCHEMA_DIR, f"{template_name}.json")
+    with open(f"{schema_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=1)
+    os.replace(f"{schema_path}.tmp", schema_path)
+
+
+def _generate_column(profile: Dict[str, Any], rows: int, rng: np.random.Generator,
+                     parents: Dict[str, pd.DataFrame]) -> Any:
+    """Vectorized values for one column"""
+    kind = profile["kind"]
+    if "foreign_key" in profile:
+        parent = parents[profile["foreign_key"]["sheet"]][profile["foreign_key"]["column"]].to_numpy()
+        return parent[rng.integers(0, len(parent), size=rows)]
+    if kind == "empty":
+        return np.full(rows, None, dtype=object)
+    if kind == "sequence":
+        return np.arange(rows, dtype="int64") * profile["step"] + profile["start"]
+    if kind == "pattern":
+        if profile["unique"]:
+            numbers = np.arange(rows, dtype="int64") + profile["min"]
+        else:
+            numbers = rng.integers(profile["min"], profile["max"] + 1, size=rows)
+        return np.char.mod(f"{profile['prefix'].replace('%', '%%')}%0{profile['width']}d{profile['suffix'].replace('%', '%%')}", numbers)
+    if kind == "number_range":
+        if profile["decimals"] == 0:
+            if profile["unique"]:
+                return np.arange(rows, dtype="int64") + int(profile["min"])
+            return rng.integers(int(profile["min"]), int(profile["max"]) + 1, size=rows)
+        return np.round(rng.uniform(profile["min"], profile["max"], size=rows), profile["decimals"])
+    if kind == "date_range":
+        start, end = pd.Timestamp(profile["min"]), pd.Timestamp(profile["max"])
+        if profile["has_time"]:
+            seconds = rng.integers(0, int((end - start).total_seconds()) + 1, size=rows)
+            return start + pd.to_timedelta(seconds, unit="s")
+        days = rng.integers(0, (end - start).days + 1, size=rows)
+        return start + pd.to_timedelta(days, unit="D")
+    if kind == "categorical":
+        weights = np.asarray(profile["weights"], dtype="float64")
+        values = np.asarray(profile["values"], dtype=object)
+        return values[rng.choice(len(values), size=rows, p=weights / weights.sum())]
+    # text: observed values; unique columns get a running number so they stay unique
+    samples = np.asarray(profile["samples"], dtype=object)
+    drawn = samples[rng.integers(0, len(samples), size=rows)].astype(str)
+    if profile["unique"]:
+        return np.char.add(np.char.add(drawn, "-"), np.arange(1, rows + 1).astype(str))
+    return drawn
+
+
+def generate_frames(schema: Dict[str, Any], rows: int, seed: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """
+    DataFrames for every sheet: the largest sheet gets `rows` rows, other data sheets keep their
+    original ratio to it, lookup sheets are copied. Parent sheets are generated before the sheets
+    whose foreign keys point at them.
+    """
+    rng = np.random.default_rng(seed)
+    sheets = schema["sheets"]
+    main_rows = max((sheet["rows"] for sheet in sheets.values()), default=0) or 1
+
+    order, pending = [], list(sheets)
+    while pending:
+        for sheetname in pending:
+            parents = {p["foreign_key"]["sheet"] for p in sheets[sheetname]["columns"].values() if "foreign_key" in p}
+            if parents <= set(order) | {sheetname}:
+                order.append(sheetname)
+                pending.remove(sheetname)
+                break
+        else:
+            order.extend(pending)  # cycle - generate in workbook order
+            break
+
+    frames = {}
+    for sheetname in order:
+        sheet = sheets[sheetname]
+        columns = list(sheet["columns"])
+        if sheet["lookup"]:
+            frames[sheetname] = pd.DataFrame(sheet.get("data", []), columns=columns)
+            continue
+        count = max(1, round(rows * sheet["rows"] / main_rows))
+        data = {}
+        for column, profile in sheet["columns"].items():
+            if "foreign_key" in profile and profile["foreign_key"]["sheet"] not in frames:
+                # Parent not generated yet (foreign key cycle) - generate from the column's own kind
+                profile = {key: value for key, value in profile.items() if key != "foreign_key"}
+            values = _generate_column(profile, count, rng, frames)
+            series = pd.Series(values)
+            if profile["null_rate"] and not profile["unique"] and "foreign_key" not in profile:
+                series = series.where(rng.random(count) >= profile["null_rate"])
+            data[column] = series
+        frames[sheetname] = pd.DataFrame(data, columns=columns)
+    return {sheetname: frames[sheetname] for sheetname in sheets}
+
+
+def _write_csv(df: pd.DataFrame, path: str):
+    """pyarrow's multi-threaded CSV writer when installed, pandas otherwise"""
+    if pa is not None:
+        try:
+            pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), path)
+            return
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass  # mixed-type column
+    df.to_csv(path, index=False)
+
+
+def synthesize(template_name: str, rows: int, output_format: str = "xlsx", seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Generate rows for a template without the TDM service, from the schema learned from its workbook.
+    xlsx becomes the template's new version in the TDM store (streamed through a write_only workbook);
+    csv writes one file per sheet to TDM_files/synthetic/<template>/. Sheets over the xlsx row limit force csv.
+    """
+    started = time.perf_counter()
+    schema = get_schema(template_name)
+    frames = generate_frames(schema, rows, seed)
+    generate_ms = round((time.perf_counter() - started) * 1000)
+
+    if output_format == "xlsx" and max(len(df) for df in frames.values()) > XLSX_MAX_ROWS:
+        output_format = "csv"
+
+    if output_format == "csv":
+        folder = os.path.join(SYNTH_CSV_DIR, template_name)
+        os.makedirs(folder, exist_ok=True)
+        files = []
+        for sheetname, df in frames.items():
+            filepath = os.path.join(folder, SAFE_FILENAME.sub("_", sheetname) + ".csv")
+            _write_csv(df, f"{filepath}.tmp")
+            os.replace(f"{filepath}.tmp", filepath)
+            files.append(filepath)
+    else:
+        staging_path = tdm_store.staging_path(template_name)
+        write_workbook(frames, staging_path)
+        filepath = tdm_store.commit(template_name, staging_path, "offline engine")["path"]
+        schema["generated_hash"] = sheet_cache.store(filepath, frames)
+        _save_schema(template_name, schema)
+        files = [filepath]
+
+    return {
+        "files": files,
+        "format": output_format,
+        "rows": {sheetname: len(df) for sheetname, df in frames.items()},
+        "generate_ms": generate_ms,
+        "total_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+
+def local_templates() -> List[str]:
+    """Templates that have a workbook in TDM_files to learn from"""
+    if not os.path.isdir(TDM_FOLDER):
+        return []
+    return sorted(f[:-5] for f in os.listdir(TDM_FOLDER) if f.endswith(".xlsx") and not f.startswith((".", "~$")))
@@ -0,0 +1,231 @@
+# tools/template_catalog.py
+
+import asyncio
+import heapq
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from tools.http_client import get_async_client, run_sync
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+TDM_BASE_URL = os.getenv("TDM_BASE_URL")
+TDM_TEMPLATE_USER = "TDM User"
+# Catalog is fresh for this long; after that it is served stale while refreshing in the background
+TEMPLATE_CATALOG_TTL = float(os.getenv("TEMPLATE_CATALOG_TTL", "300"))
+# Past this age callers wait for a refresh instead (the stale copy is still used if it fails)
+TEMPLATE_CATALOG_MAX_STALE = float(os.getenv("TEMPLATE_CATALOG_MAX_STALE", "3600"))
+TEMPLATE_CATALOG_FETCH_TIMEOUT = float(os.getenv("TEMPLATE_CATALOG_FETCH_TIMEOUT", "10"))
+# On a miss, refetch the catalog if it is older than this (a template may have just been added)
+TEMPLATE_MISS_MAX_AGE = float(os.getenv("TEMPLATE_MISS_MAX_AGE", "30"))
+# Fuzzy matches scoring below this are treated as "not found"
+TEMPLATE_MATCH_MIN_SCORE = float(os.getenv("TEMPLATE_MATCH_MIN_SCORE", "0.45"))
+# Only this many trigram candidates are scored in full
+TEMPLATE_MATCH_CANDIDATES = 50
+
+
+def normalize_template_name(name: str) -> str:
+    """Lowercase, punctuation/underscores as spaces, single spaces ("Supplier_Site-v2" -> "supplier site v2")"""
+    return " ".join(re.sub(r"[\W_]+", " ", str(name).lower()).split())
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TemplateMatchIndex:
+    """
+    Lookup structure over one catalog snapshot: normalized names in a dict for exact hits,
+    a trigram inverted index for fuzzy hits. Candidates are ranked by trigram (Dice)
+    similarity, boosted when one name contains the other as whole words.
+    """
+
+    def __init__(self, templates: List[str]):
+        self.templates = list(templates)
+        self._normalized = [normalize_template_name(t) for t in self.templates]
+        self._exact: Dict[str, int] = {}
+        self._compact: Dict[str, int] = {}
+        self._grams: List[set] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for index, normalized in enumerate(self._normalized):
+            self._exact.setdefault(normalized, index)
+            self._compact.setdefault(normalized.replace(" ", ""), index)
+            grams = _trigrams(normalized)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].append(index)
+
+    def _score(self, query: str, query_grams: set, index: int, shared: int) -> float:
+        name = self._normalized[index]
+        score = 2.0 * shared / (len(query_grams) + len(self._grams[index]))
+        shorter, longer = sorted((query, name), key=len)
+        if shorter and f" {shorter} " in f" {longer} ":
+            score = max(score, 0.5 + 0.5 * len(shorter) / len(longer))
+        return score
+
+    def candidates(self, template_name: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Best (template, score) pairs, highest score first"""
+        query = normalize_template_name(template_name)
+        if not query:
+            return []
+        if query in self._exact:
+            return [(self.templates[self._exact[query]], 1.0)]
+        compact = query.replace(" ", "")
+        if compact in self._compact:
+            return [(self.templates[self._compact[compact]], 0.99)]
+
+        query_grams = _trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+        top = heapq.nlargest(TEMPLATE_MATCH_CANDIDATES, shared.items(), key=lambda item: (item[1], -item[0]))
+        scored = [(self._score(query, query_grams, index, count), index) for index, count in top]
+        # Ties: shorter name, then catalog order
+        scored.sort(key=lambda item: (-item[0], len(self._normalized[item[1]]), item[1]))
+        return [(self.templates[index], round(score, 3)) for score, index in scored[:limit]]
+
+    def match(self, template_name: str, min_score: float = TEMPLATE_MATCH_MIN_SCORE) -> Optional[str]:
+        best = self.candidates(template_name, limit=1)
+        return best[0][0] if best and best[0][1] >= min_score else None
+
+
+class TemplateCatalog:
+    """
+    Shared cache of the TDM service's template list (used by the generator and the editor).
+    Concurrent callers share one in-flight fetch, even across event loops (single-flight);
+    an expired catalog is returned immediately while one background refresh runs.
+    """
+
+    def __init__(self, base_url: Optional[str] = TDM_BASE_URL, ttl: float = TEMPLATE_CATALOG_TTL,
+                 max_stale: float = TEMPLATE_CATALOG_MAX_STALE):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._templates: Optional[List[str]] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[Future] = None
+        self._lock = threading.Lock()
+        self._fetch_count = 0
+        self._last_error: Optional[str] = None
+        self._index = TemplateMatchIndex([])
+
+    def age(self) -> float:
+        return time.time() - self._fetched_at if self._templates is not None else float("inf")
+
+    async def _fetch(self) -> List[str]:
+        templates_url = f"{self.base_url}/templates/{TDM_TEMPLATE_USER}"
+        response = await get_async_client().get(templates_url, timeout=TEMPLATE_CATALOG_FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.json().get("templates", [])
+
+    async def _refresh(self) -> List[str]:
+        """Fetch once for everyone: the first caller fetches, the others await its result"""
+        with self._lock:
+            inflight = self._inflight
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight = Future()
+
+        if not leader:
+            return await asyncio.wrap_future(inflight)
+
+        try:
+            templates = await self._fetch()
+            # The match index is rebuilt only when the catalog actually changed
+            index = self._index if templates == self._index.templates else TemplateMatchIndex(templates)
+            with self._lock:
+                self._index = index
+                self._templates, self._fetched_at = templates, time.time()
+                self._fetch_count += 1
+                self._last_error = None
+            inflight.set_result(templates)
+            return templates
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+            inflight.set_exception(e)
+            # Nobody else may be waiting - don't let the future log an unretrieved exception
+            inflight.exception()
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._inflight is not None:
+                return
+
+        def _run():
+            try:
+                run_sync(self._refresh)
+            except Exception as e:
+                print(f"Template catalog background refresh failed: {e}")
+
+        threading.Thread(target=_run, name="template-catalog-refresh", daemon=True).start()
+
+    async def get_templates(self, max_age: Optional[float] = None) -> List[str]:
+        """
+        Available templates.
+        max_age forces a (shared) refetch when the cached copy is older - e.g. after a miss.
+        Raises only when the service is unreachable and nothing has been cached yet.
+        """
+        age = self.age()
+        if self._templates is not None and age <= (self.ttl if max_age is None else max_age):
+            return self._templates
+
+        if self._templates is not None and max_age is None and age <= self.max_stale:
+            # Stale-while-revalidate
+            self._refresh_in_background()
+            return self._templates
+
+        try:
+            return await self._refresh()
+        except Exception:
+            if self._templates is not None:
+                return self._templates
+            raise
+
+    async def match(self, template_name: str) -> Tuple[Optional[str], List[str]]:
+        """(best matching template or None, available templates) in a single catalog lookup"""
+        available_templates = await self.get_templates()
+        matched = self._index.match(template_name)
+        if not matched and self.age() > TEMPLATE_MISS_MAX_AGE:
+            available_templates = await self.get_templates(max_age=TEMPLATE_MISS_MAX_AGE)
+            matched = self._index.match(template_name)
+        return matched, available_templates
+
+    def suggest(self, template_name: str, limit: int = 3) -> List[str]:
+        """Closest templates for a "did you mean" hint (from the cached catalog, never fetches)"""
+        return [template for template, _ in self._index.candidates(template_name, limit)]
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "templates": len(self._templates or []),
+            "indexed_trigrams": len(self._index._postings),
+            "age_seconds": round(self.age(), 1) if self._templates is not None else None,
+            "ttl_seconds": self.ttl,
+            "fetch_count": self._fetch_count,
+            "refreshing": self._inflight is not None,
+            "last_error": self._last_error,
+        }
+
+
+def find_matching_template(template_name: str, available_templates: list) -> Optional[str]:
+    """Best match of template_name in an arbitrary list (builds a throwaway index)"""
+    return TemplateMatchIndex(available_templates).match(template_name)
+
+
+# Global instance
+template_catalog = TemplateCatalog()
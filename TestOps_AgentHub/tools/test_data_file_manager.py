@@ -1,16 +1,17 @@
 # tools/test_data_file_manager.py
 
-import requests
+import asyncio
 import json
 import os
 import shutil
 import glob
 from pathlib import Path
 from langchain.tools import tool
-import pandas as pd
 
 import os
 from dotenv import load_dotenv
+from tools.http_client import get_async_client, run_sync
+from tools.workbook_cache import workbook_cache
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 BASE_URL = os.getenv("HOST_BASE_URL")
 
@@ -31,6 +32,10 @@ def test_data_file_manager_tool(query: str) -> str:
     Manages test data file operations including updating, adding, and replacing test data files.
     Handles specific templates for Invoice and Supplier test cases with sheet renaming logic.
     """
+    return run_sync(atest_data_file_manager, query)
+
+async def atest_data_file_manager(query: str) -> str:
+    """Async implementation of test_data_file_manager (workbook processing runs off the event loop)"""
     try:
         query_lower = query.lower()
         
@@ -90,9 +95,9 @@ You can generate it by asking:
         
         # Process the template based on type
         if template_name == "td_oracle_erp_new_invoice_const_amt_template":
-            result = process_invoice_template(template_path, test_case_name)
+            result = await process_invoice_template(template_path, test_case_name)
         elif template_name == "td_oracle_erp_new_supplier_template":
-            result = process_supplier_template(template_path, test_case_name)
+            result = await process_supplier_template(template_path, test_case_name)
         else:
             return f"❌ Unknown template type: {template_name}"
         
@@ -101,6 +106,8 @@ You can generate it by asking:
     except Exception as e:
         return f"❌ Error in Test Data File Manager: {str(e)}"
 
+test_data_file_manager_tool.coroutine = atest_data_file_manager
+
 def extract_test_case_name(query: str) -> str:
     """Extract test case name from user query"""
     # Look for "for" keyword to find test case name
@@ -131,21 +138,25 @@ def find_template_file(template_name: str) -> str:
     if not os.path.exists(tdm_files_path):
         return None
     
+    # The exact workbook (the current version in the TDM store) wins over prefixed look-alikes
+    exact_path = os.path.join(tdm_files_path, f"{template_name}.xlsx")
+    if os.path.exists(exact_path):
+        return exact_path
+    
     # Look for files that start with template name
     pattern = os.path.join(tdm_files_path, f"{template_name}*")
     matching_files = glob.glob(pattern)
     
-    # Filter for Excel files only
-    excel_files = [f for f in matching_files if f.endswith(('.xlsx', '.xlsm'))]
+    # Filter for Excel files only (sorted, so the pick does not depend on directory order)
+    excel_files = sorted(f for f in matching_files if f.endswith(('.xlsx', '.xlsm')))
     
     return excel_files[0] if excel_files else None
 
-def process_invoice_template(template_path: str, test_case_name: str) -> str:
+async def process_invoice_template(template_path: str, test_case_name: str) -> str:
     """Process invoice template with stage renaming logic"""
     try:
-        # Read Excel file to get sheet names
-        excel_file = pd.ExcelFile(template_path)
-        sheet_names = excel_file.sheet_names
+        # Sheet names from the workbook metadata cache (no full parse)
+        sheet_names = (await asyncio.to_thread(workbook_cache.get, template_path))["sheets"]
         
         # Find the single stage header and line sheets (whatever stage number they have)
         stage_header = None
@@ -161,13 +172,13 @@ def process_invoice_template(template_path: str, test_case_name: str) -> str:
             return f"❌ Could not find stage Header and Line sheets in {os.path.basename(template_path)}. Found sheets: {sheet_names}"
         
         # Create new workbook with renamed sheets
-        new_file_path = create_processed_invoice_file_simple(template_path, stage_header, stage_line)
+        new_file_path = await asyncio.to_thread(create_processed_invoice_file_simple, template_path, stage_header, stage_line)
         
         if not new_file_path:
             return f"❌ Failed to process invoice template"
         
         # Upload the processed file with EXACT filename
-        upload_result = upload_file_to_endpoint(new_file_path, "invoicedata.xlsx")
+        upload_result = await upload_file_to_endpoint(new_file_path, "invoicedata.xlsx")
         
         # Clean up temporary file
         if os.path.exists(new_file_path):
@@ -192,12 +203,11 @@ def process_invoice_template(template_path: str, test_case_name: str) -> str:
     except Exception as e:
         return f"❌ Error processing invoice template: {str(e)}"
 
-def process_supplier_template(template_path: str, test_case_name: str) -> str:
+async def process_supplier_template(template_path: str, test_case_name: str) -> str:
     """Process supplier template with header renaming logic"""
     try:
-        # Read Excel file to get sheet names  
-        excel_file = pd.ExcelFile(template_path)
-        sheet_names = excel_file.sheet_names
+        # Sheet names from the workbook metadata cache (no full parse)
+        sheet_names = (await asyncio.to_thread(workbook_cache.get, template_path))["sheets"]
         
         # Find the single stage header sheet (whatever stage number it has)
         stage_header = None
@@ -211,13 +221,13 @@ def process_supplier_template(template_path: str, test_case_name: str) -> str:
             return f"❌ Could not find stage Header sheet in {os.path.basename(template_path)}. Found sheets: {sheet_names}"
         
         # Create new workbook with renamed sheet
-        new_file_path = create_processed_supplier_file_simple(template_path, stage_header)
+        new_file_path = await asyncio.to_thread(create_processed_supplier_file_simple, template_path, stage_header)
         
         if not new_file_path:
             return f"❌ Failed to process supplier template"
         
         # Upload the processed file with EXACT filename
-        upload_result = upload_file_to_endpoint(new_file_path, "SupplierImportTemplate.xlsx")
+        upload_result = await upload_file_to_endpoint(new_file_path, "SupplierImportTemplate.xlsx")
         
         # Clean up temporary file
         if os.path.exists(new_file_path):
@@ -395,20 +405,20 @@ def create_processed_supplier_file(template_path: str, max_stage: int) -> str:
         print(f"Error creating processed supplier file: {e}")
         return None
 
-def upload_file_to_endpoint(file_path: str, target_filename: str) -> bool:
+async def upload_file_to_endpoint(file_path: str, target_filename: str) -> bool:
     """Upload file using the file upload endpoint with exact target filename"""
     try:
         with open(file_path, 'rb') as file:
             # Use the exact target filename for upload
-            files = {'file': (target_filename, file, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
-            response = requests.post(f"{BASE_URL}/upload-excel", files=files)
-            
-            if response.status_code == 200:
-                print(f"✅ Successfully uploaded: {target_filename}")
-                return True
-            else:
-                print(f"❌ Upload failed: {response.status_code} - {response.text}")
-                return False
+            files = {'file': (target_filename, file.read(), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+        response = await get_async_client().post(f"{BASE_URL}/upload-excel", files=files)
+        
+        if response.status_code == 200:
+            print(f"✅ Successfully uploaded: {target_filename}")
+            return True
+        else:
+            print(f"❌ Upload failed: {response.status_code} - {response.text}")
+            return False
                 
     except Exception as e:
         print(f"Upload error: {e}")
@@ -1,28 +1,29 @@
 # tools/test_manager_overview.py
 
 import os
-import requests
+import httpx
 from langchain.tools import Tool
 import json
 import re
 from typing import Dict, Any, List
 import os
 from dotenv import load_dotenv
+from tools.http_client import get_async_client, run_sync
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 class TestManagerProcessor:
     def __init__(self):
         self.api_base_url = os.getenv("HOST_BASE_URL")
     
-    def get_test_manager_data(self):
+    async def get_test_manager_data(self):
         """Get test manager overview data from API endpoint"""
         try:
-            response = requests.get(f"{self.api_base_url}/testmanageroverview", timeout=30)
+            response = await get_async_client().get(f"{self.api_base_url}/testmanageroverview", timeout=30)
             if response.status_code == 200:
                 return response.json()
             else:
                 print(f"API Error: {response.status_code} - {response.text}")
                 return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Error calling API: {e}")
             return None
         except Exception as e:
@@ -314,6 +315,10 @@ class TestManagerProcessor:
 
     def process_test_manager_query(self, query: str) -> str:
         """Main method to process test manager queries with dynamic responses"""
+        return run_sync(self.aprocess_test_manager_query, query)
+
+    async def aprocess_test_manager_query(self, query: str) -> str:
+        """Async implementation of process_test_manager_query"""
         try:
             # Check if query is related to test/run manager
             manager_keywords = [
@@ -331,7 +336,7 @@ class TestManagerProcessor:
                 return f"I understand you're asking about: **\"{query}\"**\n\nThis seems to be related to test management. Let me help you with test manager information, scheduled tests, or test configurations. Could you please rephrase your question to include terms like 'test manager', 'scheduled tests', or 'test overview'?"
             
             # Get test manager data from API
-            data = self.get_test_manager_data()
+            data = await self.get_test_manager_data()
             if not data:
                 return "❌ **Unable to fetch test manager data** from the API endpoint.\n\n🔧 Please ensure the test manager service is running at `http://localhost:port/testmanageroverview`\n\n💡 **Try again in a moment** or contact your system administrator."
             
@@ -418,5 +423,6 @@ test_manager_overview_tool = Tool(
     The tool analyzes the user's specific question and provides contextual, conversational responses
     instead of static formatted output. Each response is tailored to what the user actually asked for.
     """,
-    func=test_manager_instance.process_test_manager_query
+    func=test_manager_instance.process_test_manager_query,
+    coroutine=test_manager_instance.aprocess_test_manager_query
 )
@@ -0,0 +1,594 @@
+# tools/workbook_cache.py
+
+import os
+import json
+import shutil
+import numbers
+import datetime
+import hashlib
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # optional - sidecars fall back to pickle
+    feather = None
+
+SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHEET_CACHE_DIR = os.getenv("SHEET_CACHE_DIR", os.path.join(BASE_DIR, "TDM_files", ".sheet_cache"))
+SHEET_CACHE_MAX_BYTES = int(os.getenv("SHEET_CACHE_MAX_MB", "512")) * 1024 * 1024
+SIDECAR_MANIFEST = "manifest.json"
+# Bumped when the sidecar contents change meaning; older entries are rebuilt
+SIDECAR_VERSION = 2
+# Feather column holding the per-cell type tags of a mixed-type column
+MIXED_TYPE_COLUMN = "__type__:{}"
+
+def read_sheet_names(path: str) -> List[str]:
+    """
+    Sheet names in workbook order.
+    For xlsx only xl/workbook.xml is parsed (a few KB), never the sheet data.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zip_ref, zip_ref.open("xl/workbook.xml") as workbook_xml:
+            return [
+                element.get("name")
+                for _, element in ET.iterparse(workbook_xml)
+                if element.tag == f"{SPREADSHEET_NS}sheet"
+            ]
+    # Legacy .xls (BIFF) - no XML to peek at
+    with pd.ExcelFile(path) as xls:
+        return list(xls.sheet_names)
+
+def make_column_names(header: Sequence[Any]) -> List[str]:
+    """Header cells -> column names, following pandas ("Unnamed: N", "name.1" for duplicates)"""
+    names, seen = [], {}
+    for index, value in enumerate(header):
+        name = f"Unnamed: {index}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _cell(value: Any) -> Any:
+    return "" if value is None else value
+
+def read_sheet_window(path: str, sheetname: str, offset: int = 0, limit: Optional[int] = None,
+                      columns: Optional[List[str]] = None) -> Tuple[List[str], List[Dict[str, Any]], int, int]:
+    """
+    Rows [offset, offset + limit) of a sheet as records, optionally projected to `columns`.
+    Served from the columnar sidecar when the workbook has one; otherwise the sheet is streamed
+    (memory bounded by the window) and the sidecar is built in the background for next time.
+    Returns (columns, rows, total_rows, total_columns). Raises KeyError for unknown sheets/columns.
+    """
+    cached = sheet_cache.load(path, sheetname, columns, offset, limit)
+    if cached is not None:
+        window, all_columns, total_rows = cached
+        return list(window.columns), to_records(window), total_rows, len(all_columns)
+
+    sheet_cache.build_async(path)
+    return stream_sheet_window(path, sheetname, offset, limit, columns)
+
+def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """JSON-ready records with blanks as "" (nullable integer columns stay integers)"""
+    return python_values(df, "").to_dict(orient="records")
+
+def python_values(df: pd.DataFrame, blank: Any = None) -> pd.DataFrame:
+    """Object frame of plain Python cell values (datetime, not Timestamp - as openpyxl returns them)"""
+    values = df.astype(object)
+    for index, dtype in enumerate(df.dtypes):
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            values.iloc[:, index] = pd.Series(df.iloc[:, index].dt.to_pydatetime(), index=df.index, dtype=object)
+    return values.where(df.notna(), blank)
+
+def stream_sheet_window(path: str, sheetname: str, offset: int = 0, limit: Optional[int] = None,
+                        columns: Optional[List[str]] = None) -> Tuple[List[str], List[Dict[str, Any]], int, int]:
+    """
+    Window read straight from the workbook.
+    xlsx sheets are streamed with openpyxl read_only. Row bounds and the total come from the rows
+    actually in the sheet XML - the <dimension> element is often missing or stale in generated files.
+    """
+    if not zipfile.is_zipfile(path):
+        return _read_legacy_window(path, sheetname, offset, limit, columns)
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheetname not in workbook.sheetnames:
+            raise KeyError(f"Worksheet {sheetname}")
+        sheet = workbook[sheetname]
+        # A stale <dimension> would pad or cut the streamed rows
+        sheet.reset_dimensions()
+
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return [], [], 0, 0
+        all_columns = make_column_names(header)
+        selected = _select_columns(all_columns, columns)
+
+        stop = None if limit is None else offset + limit
+        records, seen, total_rows = [], 0, 0
+        for row in rows:
+            if seen >= offset and (stop is None or seen < stop):
+                records.append({name: _cell(row[index]) if index < len(row) else "" for name, index in selected})
+            seen += 1
+            if any(value is not None for value in row):
+                total_rows = seen
+        # Trailing empty rows are not data (pandas drops them too)
+        records = records[:max(total_rows - offset, 0)]
+        return [name for name, _ in selected], records, total_rows, len(all_columns)
+    finally:
+        workbook.close()
+
+def iter_sheet_rows(path: str, sheetname: str, columns: Optional[List[str]] = None,
+                    chunk_size: int = 5000) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    (column names, row tuples) for a whole sheet without materializing it.
+    Uses the sidecar when present (converted chunk_size rows at a time), otherwise streams the
+    workbook with openpyxl read_only. Sheet and column errors raise before iteration starts.
+    Blank cells are None.
+    """
+    batches = sheet_cache.iter_batches(path, sheetname, columns, chunk_size)
+    if batches is not None:
+        names, frames = batches
+
+        def _frame_rows():
+            for chunk in frames:
+                yield from python_values(chunk).itertuples(index=False, name=None)
+
+        return names, _frame_rows()
+
+    sheet_cache.build_async(path)
+    if not zipfile.is_zipfile(path):
+        df = pd.read_excel(path, sheet_name=sheetname)
+        df.columns = [str(c) for c in df.columns]
+        if columns:
+            df = df[[name for name, _ in _select_columns(list(df.columns), columns)]]
+        return list(df.columns), python_values(df).itertuples(index=False, name=None)
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheetname not in workbook.sheetnames:
+            raise KeyError(f"Worksheet {sheetname}")
+        sheet = workbook[sheetname]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        selected = _select_columns(make_column_names(header or ()), columns)
+    except Exception:
+        workbook.close()
+        raise
+
+    def _sheet_rows():
+        try:
+            for row in rows:
+                yield tuple(row[index] if index < len(row) else None for _, index in selected)
+        finally:
+            workbook.close()
+
+    return [name for name, _ in selected], _sheet_rows()
+
+# Mixed-type sidecar columns are stored as text plus a type tag per cell
+_TAG_ENCODERS = {
+    "str": str,
+    "bool": str,
+    "int": lambda v: str(int(v)),
+    "float": lambda v: repr(float(v)),
+    "datetime": lambda v: v.isoformat(),
+    "date": lambda v: v.isoformat(),
+    "time": lambda v: v.isoformat(),
+    "timedelta": lambda v: repr(v.total_seconds()),
+}
+_TAG_DECODERS = {
+    "str": str,
+    "bool": lambda v: v == "True",
+    "int": int,
+    "float": float,
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "time": datetime.time.fromisoformat,
+    "timedelta": lambda v: datetime.timedelta(seconds=float(v)),
+}
+
+def _type_tag(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, numbers.Integral):
+        return "int"
+    if isinstance(value, numbers.Real):
+        return "float"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    if isinstance(value, datetime.date):
+        return "date"
+    if isinstance(value, datetime.time):
+        return "time"
+    if isinstance(value, datetime.timedelta):
+        return "timedelta"
+    return "str"
+
+def _is_blank(value: Any) -> bool:
+    return value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value)
+
+# Columns holding a single cell type get the matching nullable dtype (exact, nothing inferred)
+_TAG_DTYPES = {"int": "Int64", "float": "Float64", "bool": "boolean"}
+
+def read_workbook_frames(path: str) -> Dict[str, pd.DataFrame]:
+    """
+    Every sheet as a DataFrame holding the cell values openpyxl read_only streams (the same values
+    stream_sheet_window returns), so cached reads match cold reads. Columns are object dtype except
+    single-type int/float/bool/datetime columns, which get nullable dtypes; pandas infers nothing.
+    """
+    if not zipfile.is_zipfile(path):
+        # Legacy .xls - openpyxl cannot read it
+        sheets = pd.read_excel(path, sheet_name=None, dtype_backend="numpy_nullable")
+        return {name: df.set_axis([str(c) for c in df.columns], axis=1) for name, df in sheets.items()}
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        frames = {}
+        for sheetname in workbook.sheetnames:
+            sheet = workbook[sheetname]
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+            columns = make_column_names(next(rows, None) or ())
+            data, filled = [], 0
+            for row in rows:
+                data.append(tuple(row[index] if index < len(row) else None for index in range(len(columns))))
+                if any(value is not None for value in row):
+                    filled = len(data)
+            # Trailing empty rows are not data (same rule as stream_sheet_window)
+            frames[sheetname] = _typed_frame(pd.DataFrame(data[:filled], columns=columns, dtype=object))
+        return frames
+    finally:
+        workbook.close()
+
+def _typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    for index, name in enumerate(df.columns):
+        values = df.iloc[:, index]
+        tags = {_type_tag(v) for v in values if not _is_blank(v)}
+        if len(tags) != 1:
+            continue
+        tag = tags.pop()
+        if tag in _TAG_DTYPES:
+            df[name] = pd.array([None if _is_blank(v) else v for v in values], dtype=_TAG_DTYPES[tag])
+        elif tag == "datetime":
+            df[name] = pd.to_datetime(values)
+    return df
+
+def _select_columns(all_columns: List[str], columns: Optional[List[str]]) -> List[Tuple[str, int]]:
+    if not columns:
+        return [(name, index) for index, name in enumerate(all_columns)]
+    positions = {name: index for index, name in enumerate(all_columns)}
+    missing = [name for name in columns if name not in positions]
+    if missing:
+        raise KeyError(f"Columns not found: {', '.join(missing)}")
+    return [(name, positions[name]) for name in columns]
+
+def _read_legacy_window(path, sheetname, offset, limit, columns):
+    """.xls fallback - pandas can still skip and cap rows"""
+    header = pd.read_excel(path, sheet_name=sheetname, nrows=0)
+    all_columns = [str(c) for c in header.columns]
+    selected = _select_columns(all_columns, columns)
+    indexes = sorted({index for _, index in selected})
+    df = pd.read_excel(path, sheet_name=sheetname, skiprows=range(1, offset + 1), nrows=limit, usecols=indexes)
+    df.columns = [all_columns[index] for index in indexes]
+    df = df[[name for name, _ in selected]]
+    with pd.ExcelFile(path) as xls:
+        total_rows = xls.book.sheet_by_name(sheetname).nrows - 1
+    return list(df.columns), df.fillna("").to_dict(orient="records"), total_rows, len(all_columns)
+
+class WorkbookMetadataCache:
+    """Sheet names of the TDM workbooks, keyed on (path, mtime, size) so unchanged files are never reopened"""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Dict[str, Any]:
+        stat = os.stat(path)
+        key = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and entry["key"] == key:
+            return entry["meta"]
+
+        meta = {
+            "sheets": read_sheet_names(path),
+            "size": stat.st_size,
+            "modified": stat.st_mtime
+        }
+        with self._lock:
+            self._entries[path] = {"key": key, "meta": meta}
+        return meta
+
+    def prune(self, existing_paths):
+        """Forget files that are gone"""
+        existing = set(existing_paths)
+        with self._lock:
+            for path in [p for p in self._entries if p not in existing]:
+                del self._entries[path]
+
+class SheetSidecarCache:
+    """
+    Columnar copies of TDM workbook sheets, keyed by the workbook's content hash.
+    A workbook is parsed once; later reads memory-map the per-sheet Feather file (pickle
+    when pyarrow is not installed) instead of parsing xlsx XML. Least recently used
+    entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = SHEET_CACHE_DIR, max_bytes: int = SHEET_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.format = "feather" if feather is not None else "pickle"
+        self._hashes: Dict[str, Tuple[Tuple[float, int], str]] = {}
+        self._building = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheet-cache")
+
+    def content_hash(self, path: str) -> str:
+        """sha256 of the workbook, remembered per (mtime, size) so unchanged files are hashed once"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            memo = self._hashes.get(path)
+        if memo and memo[0] == key:
+            return memo[1]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        with self._lock:
+            self._hashes[path] = (key, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _entry_dir(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest)
+
+    def _read_manifest(self, digest: str) -> Optional[Dict[str, Any]]:
+        manifest_path = os.path.join(self._entry_dir(digest), SIDECAR_MANIFEST)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("version") == SIDECAR_VERSION else None
+
+    def _open(self, path: str, sheetname: str,
+              columns: Optional[List[str]] = None) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        (Arrow table or DataFrame, manifest sheet entry) for a cached sheet, or None if not cached yet.
+        Feather sidecars are memory-mapped; nothing is converted to pandas here.
+        """
+        digest = self.content_hash(path)
+        manifest = self._read_manifest(digest)
+        if manifest is None:
+            return None
+
+        sheet = manifest["sheets"].get(sheetname)
+        if sheet is None:
+            raise KeyError(f"Worksheet {sheetname}")
+        if columns:
+            missing = [name for name in columns if name not in sheet["columns"]]
+            if missing:
+                raise KeyError(f"Columns not found: {', '.join(missing)}")
+
+        sidecar = os.path.join(self._entry_dir(digest), sheet["file"])
+        try:
+            if manifest["format"] == "feather" and feather is not None:
+                mixed = sheet.get("mixed", [])
+                selected = None
+                if columns:
+                    selected = list(columns) + [MIXED_TYPE_COLUMN.format(name) for name in columns if name in mixed]
+                source = feather.read_table(sidecar, columns=selected, memory_map=True)
+            elif manifest["format"] == "pickle":
+                source = pd.read_pickle(sidecar)
+                if columns:
+                    source = source[columns]
+            else:
+                return None
+        except (OSError, ValueError) as e:
+            print(f"Sheet cache entry unreadable for {path}: {e}")
+            return None
+
+        # Last use drives eviction
+        os.utime(os.path.join(self._entry_dir(digest), SIDECAR_MANIFEST))
+        return source, sheet
+
+    def _to_frame(self, source: Any, sheet: Dict[str, Any]) -> pd.DataFrame:
+        """Arrow table, slice or record batch -> DataFrame with mixed-type columns restored"""
+        if isinstance(source, pd.DataFrame):
+            return source.reset_index(drop=True)
+        df = source.to_pandas()
+        for name in sheet.get("mixed", []):
+            tag_column = MIXED_TYPE_COLUMN.format(name)
+            if tag_column in df.columns:
+                df[name] = [
+                    None if _is_blank(tag) else _TAG_DECODERS[tag](value)
+                    for value, tag in zip(df[name], df[tag_column])
+                ]
+                df = df.drop(columns=tag_column)
+        return df
+
+    def load(self, path: str, sheetname: str, columns: Optional[List[str]] = None, offset: int = 0,
+             limit: Optional[int] = None) -> Optional[Tuple[pd.DataFrame, List[str], int]]:
+        """
+        (rows [offset, offset + limit) as a DataFrame, all column names, total rows) from the
+        sidecar, or None if not cached yet. Only the window is converted to pandas.
+        """
+        opened = self._open(path, sheetname, columns)
+        if opened is None:
+            return None
+        source, sheet = opened
+        if isinstance(source, pd.DataFrame):
+            total_rows = len(source)
+            window = source.iloc[offset:] if limit is None else source.iloc[offset:offset + limit]
+        else:
+            total_rows = source.num_rows
+            window = source.slice(offset, limit)
+        return self._to_frame(window, sheet), sheet["columns"], total_rows
+
+    def iter_batches(self, path: str, sheetname: str, columns: Optional[List[str]] = None,
+                     chunk_size: int = 5000) -> Optional[Tuple[List[str], Iterator[pd.DataFrame]]]:
+        """
+        (column names, DataFrames of at most chunk_size rows) from the sidecar, or None if not cached yet.
+        Feather sidecars are converted one Arrow record batch at a time, so memory stays bounded.
+        """
+        opened = self._open(path, sheetname, columns)
+        if opened is None:
+            return None
+        source, sheet = opened
+        names = list(columns) if columns else list(sheet["columns"])
+
+        def _frames():
+            if isinstance(source, pd.DataFrame):
+                for start in range(0, len(source), chunk_size):
+                    yield source.iloc[start:start + chunk_size]
+                return
+            for batch in source.to_batches(max_chunksize=chunk_size):
+                yield self._to_frame(batch, sheet)
+
+        return names, _frames()
+
+    def _to_columnar(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+        """
+        Arrow needs one type per column: cells of mixed object columns are stored as text with a
+        type tag column next to them, so loads return the same types the workbook holds.
+        Returns (frame to write, names of the tagged columns).
+        """
+        df = df.reset_index(drop=True)
+        mixed = []
+        for name in list(df.columns):
+            if df[name].dtype == object:
+                tags = [None if _is_blank(v) else _type_tag(v) for v in df[name]]
+                if len({tag for tag in tags if tag is not None}) > 1:
+                    df[name] = [None if tag is None else _TAG_ENCODERS[tag](v) for v, tag in zip(df[name], tags)]
+                    df[MIXED_TYPE_COLUMN.format(name)] = tags
+                    mixed.append(name)
+        return df, mixed
+
+    def build(self, path: str) -> Optional[str]:
+        """Parse the workbook once and write one sidecar per sheet; returns the content hash"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        digest = self.content_hash(path)
+        if self._read_manifest(digest) is not None:
+            return digest
+
+        sheets = read_workbook_frames(path)
+        after = os.stat(path)
+        if (after.st_mtime, after.st_size) != (stat.st_mtime, stat.st_size):
+            # Overwritten while parsing - the content no longer matches the hash
+            return None
+
+        self._publish(path, digest, sheets)
+        return digest
+
+    def store(self, path: str, sheets: Dict[str, pd.DataFrame]) -> str:
+        """Cache frames just written to path (saves re-parsing a workbook this process produced)"""
+        digest = self.content_hash(path)
+        if self._read_manifest(digest) is None:
+            self._publish(os.path.abspath(path), digest, sheets)
+        return digest
+
+    def _publish(self, path: str, digest: str, sheets: Dict[str, pd.DataFrame]):
+        entry_dir = self._entry_dir(digest)
+        tmp_dir = f"{entry_dir}.tmp{threading.get_ident()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        manifest = {"version": SIDECAR_VERSION, "source": os.path.basename(path), "format": self.format, "sheets": {}}
+        for index, (sheetname, df) in enumerate(sheets.items()):
+            df = df.set_axis([str(c) for c in df.columns], axis=1)
+            filename = f"sheet_{index}.{self.format}"
+            entry = {"file": filename, "columns": list(df.columns), "rows": len(df)}
+            if self.format == "feather":
+                columnar, entry["mixed"] = self._to_columnar(df)
+                columnar.to_feather(os.path.join(tmp_dir, filename))
+            else:
+                df.reset_index(drop=True).to_pickle(os.path.join(tmp_dir, filename))
+            manifest["sheets"][sheetname] = entry
+        with open(os.path.join(tmp_dir, SIDECAR_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        # Publish the complete entry atomically (replacing an entry of an older sidecar version)
+        if os.path.exists(entry_dir) and self._read_manifest(digest) is None:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, entry_dir)
+        self.evict()
+
+    def build_async(self, path: str):
+        """Build the sidecar in the background (at most one build per workbook at a time)"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._building:
+                return
+            self._building.add(path)
+
+        def _run():
+            try:
+                self.build(path)
+            except Exception as e:
+                print(f"Sheet cache build failed for {path}: {e}")
+            finally:
+                with self._lock:
+                    self._building.discard(path)
+
+        self._executor.submit(_run)
+
+    def invalidate(self, path: str):
+        """Drop the sidecar of a workbook that is about to be (or was just) overwritten"""
+        path = os.path.abspath(path)
+        with self._lock:
+            memo = self._hashes.pop(path, None)
+        if memo:
+            shutil.rmtree(self._entry_dir(memo[1]), ignore_errors=True)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries, total = [], 0
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            manifest_path = os.path.join(entry_dir, SIDECAR_MANIFEST)
+            if not os.path.isfile(manifest_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(manifest_path), size, entry_dir))
+            total += size
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+# Global instances
+workbook_cache = WorkbookMetadataCache()
+sheet_cache = SheetSidecarCache()
+
+def load_sheet_frame(path: str, sheetname: str) -> pd.DataFrame:
+    """Whole sheet as a DataFrame - from the sidecar, building it first if needed"""
+    cached = sheet_cache.load(path, sheetname)
+    if cached is None and sheet_cache.build(path):
+        cached = sheet_cache.load(path, sheetname)
+    if cached is not None:
+        return cached[0]
+    # File changed mid-build - read it directly this time
+    sheets = read_workbook_frames(path)
+    if sheetname not in sheets:
+        raise KeyError(f"Worksheet {sheetname}")
+    return sheets[sheetname]
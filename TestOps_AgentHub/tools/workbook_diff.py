@@ -0,0 +1,173 @@
+# tools/workbook_diff.py
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tools.workbook_cache import load_sheet_frame, read_sheet_names
+from tools.workbook_merge import KEY_COLUMN_PATTERN
+
+# Changed cells listed per sheet as examples
+DIFF_SAMPLES = 10
+# A key column is only used when at least this share of the rows keep their key
+# (an edit that rewrites the keys themselves is diffed by row position instead)
+DIFF_MIN_KEY_OVERLAP = 0.5
+
+
+def _key_values(series: pd.Series) -> pd.Index:
+    """Key column as a hashable index; numbers compare as numbers (1 == 1.0), everything else as text"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.Index(pd.to_numeric(series).astype("float64"))
+    return pd.Index(series.astype("string"))
+
+
+def _align(old: pd.DataFrame, new: pd.DataFrame) -> Tuple[Optional[str], np.ndarray, np.ndarray]:
+    """
+    (key column or None, old positions, new positions) of matching rows.
+    Rows are matched with a hash join (Index.get_indexer) on the identifier-like column, unique and
+    non-blank in both versions, that keeps the most keys; by position when there is none.
+    """
+    best = None
+    for column in old.columns:
+        if column not in new.columns or not KEY_COLUMN_PATTERN.search(column):
+            continue
+        if old[column].isna().any() or new[column].isna().any():
+            continue
+        old_keys, new_keys = _key_values(old[column]), _key_values(new[column])
+        if not (old_keys.is_unique and new_keys.is_unique):
+            continue
+        old_positions = old_keys.get_indexer(new_keys)
+        matched = old_positions >= 0
+        if best is None or matched.sum() > best[1].sum():
+            best = (column, matched, old_positions)
+
+    if best is not None and best[1].sum() >= DIFF_MIN_KEY_OVERLAP * min(len(old), len(new)):
+        column, matched, old_positions = best
+        return column, old_positions[matched], np.flatnonzero(matched)
+
+    common = np.arange(min(len(old), len(new)))
+    return None, common, common
+
+
+def _changed_mask(old_values: np.ndarray, new_values: np.ndarray) -> np.ndarray:
+    """Elementwise "cell differs" over two object arrays with blanks as None"""
+    old_blank = pd.isna(old_values)
+    new_blank = pd.isna(new_values)
+    differs = np.asarray(old_values != new_values, dtype=bool)
+    return (old_blank != new_blank) | (~old_blank & ~new_blank & differs)
+
+
+def _plain(value: Any) -> Any:
+    """JSON-friendly cell value for samples"""
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def diff_frames(old: pd.DataFrame, new: pd.DataFrame, samples: int = DIFF_SAMPLES) -> Dict[str, Any]:
+    """Added/removed rows and columns and changed cells between two versions of one sheet"""
+    key, old_positions, new_positions = _align(old, new)
+    if key is None:
+        removed_rows = max(len(old) - len(new), 0)
+        added_rows = max(len(new) - len(old), 0)
+    else:
+        removed_rows = len(old) - len(old_positions)
+        added_rows = len(new) - len(new_positions)
+
+    new_columns = set(new.columns)
+    common_columns = [column for column in old.columns if column in new_columns]
+    result = {
+        "key": key,
+        "rows": {"old": len(old), "new": len(new)},
+        "rows_added": added_rows,
+        "rows_removed": removed_rows,
+        "rows_changed": 0,
+        "cells_changed": 0,
+        "columns_added": [column for column in new.columns if column not in set(old.columns)],
+        "columns_removed": [column for column in old.columns if column not in new_columns],
+        "changed_columns": {},
+        "samples": [],
+    }
+
+    row_changed = np.zeros(len(new_positions), dtype=bool)
+    for column in common_columns:
+        old_values = old[column].to_numpy(dtype=object, na_value=None)[old_positions]
+        new_values = new[column].to_numpy(dtype=object, na_value=None)[new_positions]
+        changed = _changed_mask(old_values, new_values)
+        count = int(changed.sum())
+        if not count:
+            continue
+        row_changed |= changed
+        result["changed_columns"][column] = count
+        result["cells_changed"] += count
+        for index in np.flatnonzero(changed)[:max(samples - len(result["samples"]), 0)]:
+            row = int(new_positions[index])
+            result["samples"].append({
+                "row": _plain(new[key].iat[row]) if key else row + 2,
+                "column": column,
+                "old": _plain(old_values[index]),
+                "new": _plain(new_values[index]),
+            })
+
+    result["rows_changed"] = int(row_changed.sum())
+    return result
+
+
+def diff_workbooks(old_path: str, new_path: str, samples: int = DIFF_SAMPLES) -> Dict[str, Any]:
+    """
+    Sheet by sheet diff of two workbooks, computed on the columnar sidecar frames with vectorized
+    comparisons (no cell-by-cell openpyxl walk). Rows are matched on a key column where there is one;
+    sample "row" values are keys, or spreadsheet row numbers when rows are matched by position.
+    """
+    started = time.perf_counter()
+    old_sheets, new_sheets = read_sheet_names(old_path), read_sheet_names(new_path)
+    sheets = {}
+    for sheetname in new_sheets:
+        if sheetname not in old_sheets:
+            sheets[sheetname] = {"status": "added", "rows": {"old": 0, "new": len(load_sheet_frame(new_path, sheetname))}}
+            continue
+        sheet = diff_frames(load_sheet_frame(old_path, sheetname), load_sheet_frame(new_path, sheetname), samples)
+        changed = sheet["cells_changed"] or sheet["rows_added"] or sheet["rows_removed"] \
+            or sheet["columns_added"] or sheet["columns_removed"]
+        sheets[sheetname] = {"status": "changed" if changed else "unchanged", **sheet}
+    for sheetname in old_sheets:
+        if sheetname not in new_sheets:
+            sheets[sheetname] = {"status": "removed", "rows": {"old": len(load_sheet_frame(old_path, sheetname)), "new": 0}}
+
+    compared = [sheet for sheet in sheets.values() if "cells_changed" in sheet]
+    return {
+        "sheets": sheets,
+        "totals": {
+            field: sum(sheet[field] for sheet in compared)
+            for field in ("rows_added", "rows_removed", "rows_changed", "cells_changed")
+        },
+        "diff_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+
+def format_diff_summary(diff: Dict[str, Any], max_sheets: int = 5) -> List[str]:
+    """Chat reply lines: one per changed sheet, with the most changed columns"""
+    lines = []
+    changed = [(name, sheet) for name, sheet in diff["sheets"].items() if sheet["status"] != "unchanged"]
+    for sheetname, sheet in changed[:max_sheets]:
+        if sheet["status"] != "changed":
+            lines.append(f"- **{sheetname}**: sheet {sheet['status']}")
+            continue
+        parts = [f"{sheet['cells_changed']} cells in {sheet['rows_changed']} rows changed"]
+        if sheet["rows_added"]:
+            parts.append(f"{sheet['rows_added']} rows added")
+        if sheet["rows_removed"]:
+            parts.append(f"{sheet['rows_removed']} rows removed")
+        if sheet["columns_added"] or sheet["columns_removed"]:
+            parts.append(f"columns +{len(sheet['columns_added'])}/-{len(sheet['columns_removed'])}")
+        top = sorted(sheet["changed_columns"].items(), key=lambda item: -item[1])[:3]
+        if top:
+            parts.append("mostly " + ", ".join(f"{column} ({count})" for column, count in top))
+        lines.append(f"- **{sheetname}**: " + "; ".join(parts))
+    if len(changed) > max_sheets:
+        lines.append(f"- ... and {len(changed) - max_sheets} more sheets")
+    return lines
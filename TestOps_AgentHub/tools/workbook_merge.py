@@ -0,0 +1,172 @@
+# tools/workbook_merge.py
+
+import os
+import re
+import hashlib
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+from tools.workbook_cache import make_column_names
+
+# Header words that mark a column as a record key ("Invoice ID", "SUPPLIER_NUMBER", "Site Code"...)
+KEY_COLUMN_PATTERN = re.compile(r"(^|[\W_])(id|number|num|no|code|key)$", re.IGNORECASE)
+# Examples of duplicate keys quoted in the collision error
+DUPLICATE_SAMPLES = 5
+
+
+def write_workbook(sheets: Dict[str, pd.DataFrame], dest_path: str, chunk_size: int = 10000):
+    """
+    Write DataFrames as sheets of dest_path through a write_only workbook (values only),
+    replacing dest_path atomically. Noticeably faster than DataFrame.to_excel for large sheets.
+    """
+    folder = os.path.dirname(os.path.abspath(dest_path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(dest_path)}.", suffix=".write")
+    os.close(fd)
+
+    output = Workbook(write_only=True)
+    try:
+        for sheetname, df in sheets.items():
+            out_sheet = output.create_sheet(sheetname)
+            out_sheet.append([str(c) for c in df.columns])
+            for start in range(0, len(df), chunk_size):
+                chunk = df.iloc[start:start + chunk_size].astype(object)
+                for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+                    out_sheet.append(row)
+        output.save(tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        output.close()
+
+
+def _iter_sheet(workbook, sheetname: str):
+    sheet = workbook[sheetname]
+    # Generated shards often carry a missing or stale <dimension>
+    sheet.reset_dimensions()
+    return sheet.iter_rows(values_only=True)
+
+
+def _sheet_fingerprints(path: str) -> Dict[str, str]:
+    """sha256 of every sheet's cell values, streamed (one row in memory at a time)"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        fingerprints = {}
+        for sheetname in workbook.sheetnames:
+            digest = hashlib.sha256()
+            for row in _iter_sheet(workbook, sheetname):
+                digest.update(repr(row).encode("utf-8"))
+            fingerprints[sheetname] = digest.hexdigest()
+        return fingerprints
+    finally:
+        workbook.close()
+
+
+def merge_workbooks(shard_paths: List[str], dest_path: str) -> Dict[str, Any]:
+    """
+    Concatenate shard workbooks (same template, generated separately) into dest_path.
+    Shards are streamed with openpyxl read_only and written with a write_only workbook, so memory
+    holds one row at a time (plus the key sets). Values only - cell styles are not copied.
+
+    Every sheet whose contents differ between shards is generated data and is concatenated
+    (header sheets and child sheets alike, whatever their row counts); sheets identical in all
+    shards (lookups, instructions) are copied once. Identifier-like columns that are unique within
+    the first shard must stay unique across shards: a collision raises ValueError rather than
+    writing a workbook with duplicate keys. Headers must match between shards (ValueError otherwise).
+    The output replaces dest_path atomically.
+    """
+    first = load_workbook(shard_paths[0], read_only=True, data_only=True)
+    try:
+        sheetnames = list(first.sheetnames)
+    finally:
+        first.close()
+
+    fingerprints = [_sheet_fingerprints(path) for path in shard_paths]
+    data_sheets = {
+        name for name in sheetnames
+        if len({shard.get(name) for shard in fingerprints}) > 1
+    }
+
+    folder = os.path.dirname(os.path.abspath(dest_path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(dest_path)}.", suffix=".merge")
+    os.close(fd)
+
+    output = Workbook(write_only=True)
+    stats = {"sheets": {}}
+    try:
+        for sheetname in sheetnames:
+            out_sheet = output.create_sheet(sheetname)
+            header, key_columns, seen, duplicates = None, {}, {}, {}
+            rows_written = 0
+            shards = shard_paths if sheetname in data_sheets else shard_paths[:1]
+
+            for shard_number, shard_path in enumerate(shards):
+                shard = load_workbook(shard_path, read_only=True, data_only=True)
+                try:
+                    if sheetname not in shard.sheetnames:
+                        raise ValueError(f"Shard {shard_number + 1} has no sheet '{sheetname}'")
+                    rows = _iter_sheet(shard, sheetname)
+                    shard_header = next(rows, None)
+
+                    if header is None:
+                        header = shard_header
+                        if header is None:
+                            break
+                        out_sheet.append(header)
+                        names = make_column_names(header)
+                        key_columns = {index: name for index, name in enumerate(names) if KEY_COLUMN_PATTERN.search(name)}
+                        seen = {index: set() for index in key_columns}
+                    elif tuple(shard_header or ()) != tuple(header):
+                        raise ValueError(f"Shard {shard_number + 1} sheet '{sheetname}' has different columns")
+
+                    for row in rows:
+                        out_sheet.append(row)
+                        rows_written += 1
+                        for index in list(seen):
+                            value = row[index] if index < len(row) else None
+                            if value is None or value == "":
+                                continue
+                            if value not in seen[index]:
+                                seen[index].add(value)
+                            elif shard_number == 0:
+                                # Repeats within one shard - not a key column after all
+                                del seen[index]
+                            else:
+                                found = duplicates.setdefault(key_columns[index], {"count": 0, "examples": []})
+                                found["count"] += 1
+                                if len(found["examples"]) < DUPLICATE_SAMPLES:
+                                    found["examples"].append(value)
+                finally:
+                    shard.close()
+
+            checked = [key_columns[index] for index in seen]
+            collisions = {column: found for column, found in duplicates.items() if column in checked}
+            if collisions:
+                details = "; ".join(
+                    f"{column}: {found['count']} (e.g. {', '.join(str(v) for v in found['examples'])})"
+                    for column, found in collisions.items()
+                )
+                raise ValueError(f"Shards repeat keys of sheet '{sheetname}' - {details}")
+            stats["sheets"][sheetname] = {"rows": rows_written, "merged": sheetname in data_sheets}
+            if checked:
+                stats["sheets"][sheetname]["key_columns"] = checked
+
+        output.save(tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        output.close()
+
+    return stats
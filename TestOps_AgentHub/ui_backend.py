@@ -20,13 +20,17 @@ from tools.execute_bulk_mode import bulk_mode_tool, bulk_mode_with_selection_too
 from tools.execute_e2e_mode import e2e_mode_tool
 from tools.testcase_categorizer import categorizer
 from tools.execute_run_manager_mode import execute_run_manager_mode
+from tools.command_router import CommandRouter
+from tools.http_client import close_async_client
+from tools.job_queue import job_manager
 
 # Import endpoint routers
 from endpoints.reports import router as reports_router
 from endpoints.testdata import router as testdata_router
-from endpoints.mcp_agent import router as agent_router, set_agent_and_categorizer
+from endpoints.mcp_agent import router as agent_router, set_agent_and_categorizer, set_command_router
 from endpoints.categorization import router as categorization_router, set_categorizer
 from endpoints.system import router as system_router, set_tools
+from endpoints.jobs import router as jobs_router
 
 # Load environment variables
 load_dotenv()
@@ -42,6 +46,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Shared async HTTP client used by every tool - closed on shutdown
+app.add_event_handler("shutdown", close_async_client)
+app.add_event_handler("shutdown", job_manager.shutdown)
+
 # ---------------------------
 # LLM + Agent Setup
 # ---------------------------
@@ -50,7 +58,8 @@ llm = AzureChatOpenAI(
     api_key=os.getenv("AZURE_OPENAI_API_KEY"),
     azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
     api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    temperature=0
+    temperature=0,
+    streaming=True  # token callbacks for /mcp-agent/stream
 )
 
 # Enhanced tools list
@@ -189,6 +198,7 @@ agent = initialize_agent(
 
 # Set up endpoint dependencies
 set_agent_and_categorizer(agent, categorizer)
+set_command_router(CommandRouter(enhanced_tools, categorizer))
 set_categorizer(categorizer)
 set_tools(enhanced_tools)
 
@@ -198,6 +208,7 @@ app.include_router(testdata_router)
 app.include_router(agent_router)
 app.include_router(categorization_router)
 app.include_router(system_router)
+app.include_router(jobs_router)
 
 if __name__ == "__main__":
     import uvicorn